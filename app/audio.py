@@ -0,0 +1,105 @@
+import io
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+
+TELEPHONY_RATE = 8000
+
+# Output formats for synthesized files: (sample rate or None to keep the
+# model's, WAV subtype). Telephony is what Twilio plays on the line anyway:
+# 8 kHz 8-bit mu-law, about 6x smaller than 24 kHz 16-bit PCM.
+OUTPUT_FORMATS: Dict[str, Tuple[Optional[int], str]] = {
+    "telephony": (TELEPHONY_RATE, "ULAW"),
+    "preview": (None, "PCM_16"),
+}
+
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 32635
+
+
+def lowpass_kernel(cutoff: float, taps: int = 63) -> np.ndarray:
+    # Windowed-sinc FIR; cutoff is a fraction of the input sample rate.
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    if src_rate == dst_rate or samples.size == 0:
+        return samples
+    if dst_rate < src_rate:
+        samples = np.convolve(samples, lowpass_kernel(0.5 * dst_rate / src_rate), mode="same")
+    n_out = int(round(samples.size * dst_rate / src_rate))
+    positions = np.arange(n_out) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def mulaw_encode(samples: np.ndarray) -> bytes:
+    pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype(np.int32)
+    sign = np.where(pcm < 0, 0x80, 0)
+    # Negative samples round away from zero, as in the reference G.711 coder.
+    magnitude = np.where(pcm < 0, -(pcm >> 2) << 2, pcm)
+    magnitude = np.minimum(magnitude, _MULAW_CLIP) + _MULAW_BIAS
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    encoded = ~(sign | (exponent << 4) | mantissa) & 0xFF
+    return encoded.astype(np.uint8).tobytes()
+
+
+# Resamples consecutive PCM chunks to 8 kHz mu-law, carrying filter and phase
+# state across chunks so there are no seams at chunk boundaries.
+class MulawStreamEncoder:
+    def __init__(self, src_rate: int, dst_rate: int = TELEPHONY_RATE, taps: int = 63):
+        self.step = src_rate / dst_rate
+        self._kernel = lowpass_kernel(0.5 * dst_rate / src_rate, taps) if dst_rate < src_rate else None
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._phase = 0.0
+
+    def encode(self, samples: np.ndarray) -> bytes:
+        x = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if self._kernel is not None:
+            padded = np.concatenate([self._history, x])
+            x = np.convolve(padded, self._kernel, mode="valid").astype(np.float32)
+            self._history = padded[padded.size - self._history.size:]
+
+        buf = np.concatenate([self._pending, x])
+        if buf.size < 2:
+            self._pending = buf
+            return b""
+        positions = np.arange(self._phase, buf.size - 1, self.step)
+        out = np.interp(positions, np.arange(buf.size), buf)
+        next_pos = positions[-1] + self.step if positions.size else self._phase
+        consumed = min(int(next_pos), buf.size - 1)
+        self._pending = buf[consumed:]
+        self._phase = next_pos - consumed
+        return mulaw_encode(out)
+
+
+def _prepare(samples: np.ndarray, rate: int, output_format: str) -> Tuple[np.ndarray, int, str]:
+    target_rate, subtype = OUTPUT_FORMATS[output_format]
+    if target_rate is not None and target_rate != rate:
+        samples, rate = resample(samples, rate, target_rate), target_rate
+    return np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0), rate, subtype
+
+
+def write_audio(path: str, samples: np.ndarray, rate: int, output_format: str = "preview") -> None:
+    samples, rate, subtype = _prepare(samples, rate, output_format)
+    sf.write(path, samples, rate, subtype=subtype)
+
+
+def encode_audio(samples: np.ndarray, rate: int, output_format: str = "preview") -> bytes:
+    # The same WAV write_audio produces, in memory
+    samples, rate, subtype = _prepare(samples, rate, output_format)
+    buf = io.BytesIO()
+    sf.write(buf, samples, rate, subtype=subtype, format="WAV")
+    return buf.getvalue()
+
+
+def transcode(path: str, output_format: str) -> None:
+    # Rewrites an existing file in place in the given output format
+    samples, rate = sf.read(path, dtype="float32", always_2d=True)
+    write_audio(path, samples.mean(axis=1), rate, output_format)
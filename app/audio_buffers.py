@@ -0,0 +1,104 @@
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AudioBuffer:
+    data: bytes
+    etag: str
+    duration: float
+
+
+# Recently synthesized call audio, served by /audio/{name} straight from
+# memory while the file is written to disk behind it (for transcripts and
+# the archive). Bounded by AUDIO_BUFFER_MB, least recently used out first;
+# a buffer still waiting for its disk write stays reachable until written.
+_lock = threading.Lock()
+_buffers: "OrderedDict[str, AudioBuffer]" = OrderedDict()
+_bytes = 0
+_unwritten: Dict[str, AudioBuffer] = {}
+_queue: "queue.Queue[Tuple[str, AudioBuffer]]" = queue.Queue()
+_thread: Optional[threading.Thread] = None
+
+
+def _evict_locked() -> None:
+    global _bytes
+    limit = settings.audio_buffer_mb * 1024 * 1024
+    while _buffers and _bytes > limit:
+        _, evicted = _buffers.popitem(last=False)
+        _bytes -= len(evicted.data)
+
+
+def _write(path: str, buffer: AudioBuffer) -> None:
+    part_path = path + ".part"
+    with open(part_path, "wb") as f:
+        f.write(buffer.data)
+    os.replace(part_path, path)
+
+
+def _run() -> None:
+    while True:
+        path, buffer = _queue.get()
+        name = os.path.basename(path)
+        try:
+            _write(path, buffer)
+        except OSError:
+            logger.exception("Writing %s failed", path)
+            try:
+                os.remove(path + ".part")
+            except OSError:
+                pass
+        finally:
+            with _lock:
+                _unwritten.pop(name, None)
+            _queue.task_done()
+
+
+def _ensure_writer() -> None:
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="audio-writer", daemon=True)
+            _thread.start()
+
+
+def publish(path: str, data: bytes, duration: float) -> AudioBuffer:
+    # Makes the audio servable now and queues the write to path
+    global _bytes
+    name = os.path.basename(path)
+    buffer = AudioBuffer(data=data, etag=f'"{os.path.splitext(name)[0]}"', duration=duration)
+    with _lock:
+        _buffers[name] = buffer
+        _bytes += len(data)
+        _unwritten[name] = buffer
+        _evict_locked()
+    _ensure_writer()
+    _queue.put((path, buffer))
+    return buffer
+
+
+def get(name: str) -> Optional[AudioBuffer]:
+    with _lock:
+        buffer = _buffers.get(name)
+        if buffer is not None:
+            _buffers.move_to_end(name)
+            return buffer
+        return _unwritten.get(name)
+
+
+def duration(path: str) -> Optional[float]:
+    buffer = get(os.path.basename(path))
+    return buffer.duration if buffer is not None else None
+
+
+def flush() -> None:
+    _queue.join()
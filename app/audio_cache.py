@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.settings import TTS_CACHE_DIR, settings
+from app.utils import new_audio_file
+
+
+_cache_lock = threading.Lock()
+# key -> (size in bytes, last use); rebuilt from the directory on first use
+_index: Optional[Dict[str, Tuple[int, float]]] = None
+_total_bytes = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def reference_fingerprint(ref_wav_path: str) -> str:
+    st = os.stat(ref_wav_path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def cache_key(voice_name: str, ref_wav_path: str, text: str, language: str, model_version: str, output_format: str) -> str:
+    payload = json.dumps(
+        [voice_name, reference_fingerprint(ref_wav_path), text, language, model_version, output_format],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _paths(key: str) -> Tuple[str, str]:
+    name = f"{key}.wav"
+    return os.path.join(TTS_CACHE_DIR, name), f"/static/audio/cache/{name}"
+
+
+def _load_index() -> Dict[str, Tuple[int, float]]:
+    global _index, _total_bytes
+    if _index is None:
+        _index, _total_bytes = {}, 0
+        for entry in os.scandir(TTS_CACHE_DIR):
+            if entry.is_file() and entry.name.endswith(".wav"):
+                st = entry.stat()
+                _index[entry.name[:-4]] = (st.st_size, st.st_mtime)
+                _total_bytes += st.st_size
+    return _index
+
+
+def lookup(key: str) -> Optional[Tuple[str, str]]:
+    path, rel_url = _paths(key)
+    with _cache_lock:
+        index = _load_index()
+        if key in index and os.path.exists(path):
+            index[key] = (index[key][0], time.time())
+            _stats["hits"] += 1
+            return path, rel_url
+        _stats["misses"] += 1
+        return None
+
+
+def _evict_locked(index: Dict[str, Tuple[int, float]]) -> None:
+    global _total_bytes
+    limit = settings.tts_cache_max_mb * 1024 * 1024
+    for key, (size, _) in sorted(index.items(), key=lambda kv: kv[1][1]):
+        if _total_bytes <= limit:
+            break
+        try:
+            os.remove(_paths(key)[0])
+        except OSError:
+            pass
+        del index[key]
+        _total_bytes -= size
+        _stats["evictions"] += 1
+
+
+def store(key: str, src_path: str) -> Tuple[str, str]:
+    global _total_bytes
+    path, rel_url = _paths(key)
+    shutil.move(src_path, path)
+    size = os.path.getsize(path)
+    with _cache_lock:
+        index = _load_index()
+        previous = index.get(key)
+        if previous is not None:
+            _total_bytes -= previous[0]
+        index[key] = (size, time.time())
+        _total_bytes += size
+        _evict_locked(index)
+    return path, rel_url
+
+
+def copy_out(path: str, stem: str = "out") -> Tuple[str, str]:
+    # A file of its own under static/audio for cached audio that a call or
+    # transcript keeps pointing at; eviction then only drops the cache's
+    # name. Hard-linked when possible, so it costs no space.
+    out_path, rel_url = new_audio_file(stem=stem)
+    with _cache_lock:
+        try:
+            os.link(path, out_path)
+        except OSError:
+            shutil.copyfile(path, out_path)
+    return out_path, rel_url
+
+
+def stats() -> Dict[str, int]:
+    with _cache_lock:
+        index = _load_index()
+        return {**_stats, "entries": len(index), "bytes": _total_bytes}
@@ -0,0 +1,95 @@
+import os
+import re
+from typing import Optional, Tuple, Union
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+from app import audio_buffers
+from app.settings import AUDIO_OUT_DIR
+
+router = APIRouter()
+
+AUDIO_NAME = re.compile(r"[A-Za-z0-9_-]+\.wav")
+# Names are unique per synthesis, so a response never changes
+CACHE_CONTROL = "public, max-age=86400, immutable"
+RANGE_HEADER = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # (start, end inclusive) for a single "bytes=" range; None serves the
+    # whole body (no header, or several ranges). Raises ValueError if the
+    # range can't be satisfied.
+    if not header:
+        return None
+    match = RANGE_HEADER.fullmatch(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        raise ValueError(header)
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    # If-None-Match is "*" or a comma-separated list of tags; weak
+    # comparison, so W/"x" matches "x"
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+@router.api_route("/{name}", methods=["GET", "HEAD"])
+async def audio(name: str, request: Request):
+    if not AUDIO_NAME.fullmatch(name):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    buffer = audio_buffers.get(name)
+    if buffer is not None:
+        data: Union[bytes, memoryview] = memoryview(buffer.data)
+        etag = buffer.etag
+    else:
+        # Evicted from memory (or written by a remote model worker)
+        data = await run_in_threadpool(_read, os.path.join(AUDIO_OUT_DIR, name))
+        if data is None:
+            raise HTTPException(status_code=404, detail="Audio not found")
+        etag = f'"{os.path.splitext(name)[0]}"'
+
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = len(data)
+    if_range = request.headers.get("if-range")
+    try:
+        byte_range = _byte_range(request.headers.get("range"), size) if if_range in (None, etag) else None
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    status_code = 200
+    if byte_range is not None:
+        start, end = byte_range
+        data = data[start:end + 1]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        status_code = 206
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(data))
+        return Response(status_code=status_code, headers=headers, media_type="audio/wav")
+    return Response(content=data, status_code=status_code, headers=headers, media_type="audio/wav")
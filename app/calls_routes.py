@@ -1,20 +1,72 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
 from fastapi.responses import PlainTextResponse
 
-from app.db import list_calls, get_transcript
+from app.db import list_calls, get_transcript, get_turn_metrics, next_calls_cursor, next_search_cursor, run_db, search_calls
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 500
+
 
 @router.get("")
-async def calls():
-    return list_calls()
+async def calls(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    try:
+        items = await run_db(list_calls, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    next_cursor = next_calls_cursor(items, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+# Must stay above the /{call_id} routes
+@router.get("/search")
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    try:
+        items = await run_db(search_calls, q, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    next_cursor = next_search_cursor(items, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+@router.get("/{call_id}/transcript")
+async def transcript_page(
+    call_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+):
+    items = await run_db(get_transcript, call_id, after_id=after, limit=limit)
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = str(items[-1]["id"])
+    return items
 
 
 @router.get("/{call_id}/transcript.txt", response_class=PlainTextResponse)
 async def transcript(call_id: str):
-    items = get_transcript(call_id)
+    items = await run_db(get_transcript, call_id)
     if not items:
         raise HTTPException(status_code=404, detail="Not found")
     text = "\n".join([f"{t['role']}: {t['text']}" for t in items])
-    return text
\ No newline at end of file
+    return text
+
+
+@router.get("/{call_id}/metrics")
+async def turn_metrics(call_id: str):
+    # Per-turn stage timings in ms, oldest first
+    return await run_db(get_turn_metrics, call_id)
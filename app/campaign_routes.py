@@ -0,0 +1,83 @@
+from typing import Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+
+from app import campaigns
+from app.db import campaign_progress, get_campaign, list_campaigns, run_db, set_campaign_status
+from app.settings import settings
+
+router = APIRouter()
+
+MAX_ERRORS_REPORTED = 20
+
+
+@router.post("")
+async def create_campaign(
+    name: str = Form(...),
+    numbers: UploadFile = File(...),
+    voice_name: Optional[str] = Form(None),
+    initial_message: Optional[str] = Form(None),
+    cps: float = Form(settings.campaign_cps),
+    max_concurrent: int = Form(settings.campaign_max_concurrent),
+):
+    if cps <= 0 or max_concurrent < 1:
+        raise HTTPException(status_code=400, detail="cps must be > 0 and max_concurrent >= 1")
+    try:
+        text = (await numbers.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8")
+    rows, errors = campaigns.parse_csv(text, voice_name, initial_message)
+    voices = await campaigns.known_voices()
+    errors += sorted({f"unknown voice: {r['voice_name']}" for r in rows if r["voice_name"] not in voices})
+    if errors:
+        raise HTTPException(status_code=400, detail=errors[:MAX_ERRORS_REPORTED])
+    if not rows:
+        raise HTTPException(status_code=400, detail="CSV has no rows")
+    campaign_id = await campaigns.create(name, rows, cps, max_concurrent)
+    return {"id": campaign_id, "queued": len(rows)}
+
+
+@router.get("")
+async def campaigns_list():
+    return await run_db(list_campaigns)
+
+
+@router.get("/{campaign_id}")
+async def progress(campaign_id: str):
+    campaign = await run_db(get_campaign, campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    stats = await run_db(campaign_progress, campaign_id)
+    span = stats.pop("span_seconds") or 0.0
+    # Average dial rate over the campaign, and over the last minute
+    stats["dials_per_second"] = round(stats["dialed"] / span, 3) if span > 0 else None
+    stats["dials_last_minute"] = stats.pop("last_minute") or 0
+    return {**campaign, **stats}
+
+
+async def _set_status(campaign_id: str, status: str, allowed_from: tuple) -> dict:
+    campaign = await run_db(get_campaign, campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    if campaign["status"] not in allowed_from:
+        raise HTTPException(status_code=409, detail=f"Campaign is {campaign['status']}")
+    await run_db(set_campaign_status, campaign_id, status)
+    return {"id": campaign_id, "status": status}
+
+
+@router.post("/{campaign_id}/pause")
+async def pause(campaign_id: str):
+    return await _set_status(campaign_id, "paused", ("running",))
+
+
+@router.post("/{campaign_id}/resume")
+async def resume(campaign_id: str):
+    result = await _set_status(campaign_id, "running", ("paused",))
+    campaigns.start(campaign_id)
+    return result
+
+
+@router.post("/{campaign_id}/cancel")
+async def cancel(campaign_id: str):
+    # Live calls carry on; only queued numbers are dropped
+    return await _set_status(campaign_id, "cancelled", ("running", "paused"))
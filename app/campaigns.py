@@ -0,0 +1,183 @@
+import asyncio
+import csv
+import io
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from app.db import (
+    campaign_greetings,
+    claim_campaign_calls,
+    count_active_campaign_calls,
+    create_campaign,
+    get_campaign,
+    list_campaigns,
+    list_voices,
+    reap_stale_campaign_calls,
+    run_db,
+    set_campaign_status,
+    update_campaign_call,
+)
+from app.inference import InferenceBusy, run_cached_synthesis
+from app.settings import settings
+from app.telephony import TwilioError, dial
+
+logger = logging.getLogger(__name__)
+
+NUMBER_COLUMNS = ("to_number", "phone", "number")
+IDLE_POLL_SECONDS = 1.0
+GREETING_RETRY_SECONDS = 2.0
+GREETING_ATTEMPTS = 5
+REAP_INTERVAL_SECONDS = 30.0
+
+_dialers: Dict[str, asyncio.Task] = {}
+
+
+def parse_csv(text: str, default_voice: Optional[str], default_message: Optional[str]) -> Tuple[List[Dict[str, Optional[str]]], List[str]]:
+    # Columns: to_number (or phone/number), voice_name, initial_message; the
+    # last two fall back to the campaign defaults. Returns (rows, errors).
+    reader = csv.DictReader(io.StringIO(text))
+    fields = {(f or "").strip().lower(): f for f in reader.fieldnames or []}
+    number_col = next((fields[c] for c in NUMBER_COLUMNS if c in fields), None)
+    if number_col is None:
+        return [], [f"CSV needs one of the columns: {', '.join(NUMBER_COLUMNS)}"]
+    voice_col, message_col = fields.get("voice_name"), fields.get("initial_message")
+
+    rows, errors = [], []
+    for line, record in enumerate(reader, start=2):
+        number = (record.get(number_col) or "").strip()
+        voice = ((record.get(voice_col) or "").strip() if voice_col else "") or default_voice
+        message = ((record.get(message_col) or "").strip() if message_col else "") or default_message
+        if not number:
+            errors.append(f"line {line}: missing number")
+        elif not voice:
+            errors.append(f"line {line}: missing voice_name")
+        else:
+            rows.append({"to_number": number, "voice_name": voice, "initial_message": message or None})
+    return rows, errors
+
+
+async def create(name: str, rows: List[Dict[str, Optional[str]]], cps: float, max_concurrent: int) -> str:
+    campaign_id = uuid.uuid4().hex
+    await run_db(create_campaign, campaign_id, name, cps, max_concurrent, rows)
+    start(campaign_id)
+    return campaign_id
+
+
+async def known_voices() -> set:
+    return {v["name"] for v in await run_db(list_voices)}
+
+
+async def _presynthesize_greetings(campaign_id: str) -> None:
+    # Greetings are rendered once per (voice, message) into the audio cache,
+    # so /twilio/answer plays them without waiting on XTTS per call.
+    for greeting in await run_db(campaign_greetings, campaign_id):
+        for _ in range(GREETING_ATTEMPTS):
+            try:
+                await run_cached_synthesis(
+                    greeting["initial_message"],
+                    greeting["voice_name"],
+                    greeting["ref_wav_path"],
+                    output_format="telephony",
+                )
+                break
+            except InferenceBusy:
+                await asyncio.sleep(GREETING_RETRY_SECONDS)
+            except Exception:
+                logger.exception("Pre-synthesizing a greeting for voice %s failed", greeting["voice_name"])
+                break
+
+
+async def _dial_one(row: Dict[str, Optional[str]]) -> None:
+    try:
+        call_id, _ = await dial(row["to_number"], row["voice_name"], row["initial_message"])
+    except TwilioError as exc:
+        await run_db(update_campaign_call, row["id"], "failed", error=str(exc))
+    except Exception as exc:
+        logger.exception("Dialing campaign call %s failed", row["id"])
+        await run_db(update_campaign_call, row["id"], "failed", error=f"{type(exc).__name__}: {exc}")
+    else:
+        await run_db(update_campaign_call, row["id"], "in_progress", call_id=call_id)
+
+
+_reaped_at = 0.0
+
+
+async def _reap_stale() -> None:
+    # Shared by every dialer in the process, at most every REAP_INTERVAL_SECONDS
+    global _reaped_at
+    if time.monotonic() - _reaped_at < REAP_INTERVAL_SECONDS:
+        return
+    _reaped_at = time.monotonic()
+    reaped = await run_db(
+        reap_stale_campaign_calls, settings.campaign_dial_timeout_seconds, settings.campaign_call_timeout_seconds
+    )
+    if reaped:
+        logger.info("Released %d stale campaign calls", reaped)
+
+
+async def _run(campaign_id: str) -> None:
+    campaign = await run_db(get_campaign, campaign_id)
+    if campaign is None:
+        return
+    await _presynthesize_greetings(campaign_id)
+
+    # Dials are started at most cps per second and only while fewer than
+    # max_concurrent calls are dialing or live; calls free their slot when
+    # Twilio's status callback reports them finished. Both limits are kept
+    # in the database, so they hold however many processes run the campaign.
+    pending: set = set()
+    while True:
+        campaign = await run_db(get_campaign, campaign_id)
+        if campaign is None or campaign["status"] != "running":
+            break
+        await _reap_stale()
+        rows, wait = await run_db(claim_campaign_calls, campaign_id, 1, campaign["max_concurrent"])
+        if rows:
+            task = asyncio.ensure_future(_dial_one(rows[0]))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            continue
+        if wait > 0:
+            await asyncio.sleep(min(wait, IDLE_POLL_SECONDS))
+            continue
+        # Nothing left to claim, or at max_concurrent
+        if not pending and await run_db(count_active_campaign_calls, campaign_id) == 0:
+            await run_db(set_campaign_status, campaign_id, "completed")
+            break
+        await asyncio.sleep(IDLE_POLL_SECONDS)
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _forget(campaign_id: str, task: asyncio.Task) -> None:
+    if _dialers.get(campaign_id) is task:
+        del _dialers[campaign_id]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Dialer for campaign %s stopped", campaign_id, exc_info=task.exception())
+
+
+def start(campaign_id: str) -> None:
+    task = _dialers.get(campaign_id)
+    if task is not None and not task.done():
+        return
+    task = asyncio.ensure_future(_run(campaign_id))
+    _dialers[campaign_id] = task
+    task.add_done_callback(lambda t: _forget(campaign_id, t))
+
+
+async def resume_all() -> None:
+    # Called at startup in every app process: picks running campaigns back
+    # up after a restart. Dials still in flight in a sibling process are
+    # left alone; ones orphaned by a dead process are reaped once stale.
+    for campaign in await run_db(list_campaigns):
+        if campaign["status"] == "running":
+            start(campaign["id"])
+
+
+async def stop_all() -> None:
+    tasks = list(_dialers.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
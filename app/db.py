@@ -1,30 +1,96 @@
+import asyncio
+import base64
+import functools
+import html
+import json
 import os
+import re
 import sqlite3
 import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-from app.settings import DB_PATH
+from app import metrics, voice_store
+from app.settings import DB_PATH, settings
 
-_db_lock = threading.Lock()
+# One long-lived connection per thread; WAL lets readers run alongside the
+# single writer, so there is no process-wide lock around queries. A
+# thread's connection is closed when the thread goes away (threadpool and
+# handler threads come and go), the rest at shutdown.
+_local = threading.local()
+_connections: Set[sqlite3.Connection] = set()
+_connections_lock = threading.Lock()
+_generation = 0
+_db_executor = ThreadPoolExecutor(max_workers=max(1, settings.db_workers), thread_name_prefix="db")
 
 
 def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30.0, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{settings.db_cache_kb}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA foreign_keys=ON")
     return conn
 
 
+def _thread_connection() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "generation", None) != _generation:
+        conn = _connect()
+        with _connections_lock:
+            _connections.add(conn)
+            _local.conn, _local.generation = conn, _generation
+        weakref.finalize(threading.current_thread(), _discard_connection, conn)
+    return conn
+
+
+def _discard_connection(conn: sqlite3.Connection) -> None:
+    with _connections_lock:
+        _connections.discard(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def close_connections() -> None:
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _connections.clear()
+
+
 @contextmanager
 def db_cursor():
-    with _db_lock:
-        conn = _connect()
-        try:
-            cur = conn.cursor()
-            yield cur
-            conn.commit()
-        finally:
-            conn.close()
+    conn = _thread_connection()
+    cur = conn.cursor()
+    try:
+        yield cur
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+async def run_db(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_db_executor, functools.partial(fn, *args, **kwargs))
+    finally:
+        metrics.record_db(getattr(fn, "__name__", "db"), time.perf_counter() - started)
 
 
 def init_db() -> None:
@@ -65,6 +131,210 @@ def init_db() -> None:
             );
             """
         )
+        _migrate(cur)
+
+
+SEARCH_TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+# Schema migrations: MIGRATIONS[i] upgrades PRAGMA user_version i -> i + 1.
+# Append new steps; never edit or reorder existing ones.
+
+def _migration_indexes_and_call_stats(cur: sqlite3.Cursor) -> None:
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_call_id ON transcripts(call_id, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_calls_created_at ON calls(created_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_voices_created_at ON voices(created_at)")
+    cur.execute("ALTER TABLE calls ADD COLUMN turn_count INTEGER NOT NULL DEFAULT 0")
+    cur.execute("ALTER TABLE calls ADD COLUMN last_activity_at TIMESTAMP")
+    cur.execute(
+        """
+        UPDATE calls SET
+            turn_count = (SELECT COUNT(*) FROM transcripts t WHERE t.call_id = calls.id),
+            last_activity_at = COALESCE(
+                (SELECT MAX(t.created_at) FROM transcripts t WHERE t.call_id = calls.id), updated_at
+            )
+        """
+    )
+
+
+def _migration_campaigns(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS campaigns (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            cps REAL NOT NULL,
+            max_concurrent INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS campaign_calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id TEXT NOT NULL REFERENCES campaigns(id) ON DELETE CASCADE,
+            to_number TEXT NOT NULL,
+            voice_name TEXT NOT NULL,
+            initial_message TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            call_id TEXT,
+            error TEXT,
+            dialed_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_campaign_calls_status ON campaign_calls(campaign_id, status, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_campaign_calls_call_id ON campaign_calls(call_id)")
+
+
+def _migration_call_greeting_audio(cur: sqlite3.Cursor) -> None:
+    cur.execute("ALTER TABLE calls ADD COLUMN greeting_audio_path TEXT")
+
+
+def _migration_summary_jobs(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS summary_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            call_id TEXT UNIQUE NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_summary_jobs_status ON summary_jobs(status, id)")
+    cur.execute("ALTER TABLE calls ADD COLUMN summary_status TEXT")
+    cur.execute("UPDATE calls SET summary_status = 'done' WHERE summary IS NOT NULL")
+
+
+def _migration_transcript_audio_index(cur: sqlite3.Cursor) -> None:
+    # Lets the retention sweeper map expired files back to transcript rows
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_audio_path ON transcripts(audio_path)")
+
+
+def _migration_turn_metrics(cur: sqlite3.Cursor) -> None:
+    # One row per caller turn; stages holds {stage: ms} as JSON
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS turn_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            call_id TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            total_ms REAL NOT NULL,
+            stages TEXT NOT NULL,
+            tokens INTEGER NOT NULL DEFAULT 0,
+            tokens_per_second REAL,
+            tts_rtf REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_turn_metrics_call_id ON turn_metrics(call_id, id)")
+
+
+def _migration_search_index(cur: sqlite3.Cursor) -> None:
+    # Full-text search over transcript lines and call summaries: external
+    # content FTS5 tables (the text isn't stored twice) kept in sync by
+    # triggers. Only UPDATEs of text/summary touch the index.
+    cur.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5("
+        f"text, content='transcripts', content_rowid='id', tokenize='{SEARCH_TOKENIZER}')"
+    )
+    cur.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS calls_fts USING fts5("
+        f"summary, content='calls', content_rowid='rowid', tokenize='{SEARCH_TOKENIZER}')"
+    )
+    for trigger in (
+        """
+        CREATE TRIGGER IF NOT EXISTS transcripts_fts_insert AFTER INSERT ON transcripts BEGIN
+            INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS transcripts_fts_delete AFTER DELETE ON transcripts BEGIN
+            INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS transcripts_fts_update AFTER UPDATE OF text ON transcripts BEGIN
+            INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS calls_fts_insert AFTER INSERT ON calls BEGIN
+            INSERT INTO calls_fts(rowid, summary) VALUES (new.rowid, new.summary);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS calls_fts_delete AFTER DELETE ON calls BEGIN
+            INSERT INTO calls_fts(calls_fts, rowid, summary) VALUES ('delete', old.rowid, old.summary);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS calls_fts_update AFTER UPDATE OF summary ON calls BEGIN
+            INSERT INTO calls_fts(calls_fts, rowid, summary) VALUES ('delete', old.rowid, old.summary);
+            INSERT INTO calls_fts(rowid, summary) VALUES (new.rowid, new.summary);
+        END
+        """,
+    ):
+        cur.execute(trigger)
+    # Backfill existing rows
+    cur.execute("INSERT INTO transcripts_fts(transcripts_fts) VALUES ('rebuild')")
+    cur.execute("INSERT INTO calls_fts(calls_fts) VALUES ('rebuild')")
+
+
+def _migration_campaign_next_dial(cur: sqlite3.Cursor) -> None:
+    # Unix time before which no process may start another dial (cps pacing)
+    cur.execute("ALTER TABLE campaigns ADD COLUMN next_dial_at REAL")
+
+
+def _migration_transcript_segments(cur: sqlite3.Cursor) -> None:
+    # A reply played as several audio segments is stored one row per
+    # segment; rows after the first carry segment > 0 and are not turns
+    cur.execute("ALTER TABLE transcripts ADD COLUMN segment INTEGER NOT NULL DEFAULT 0")
+
+
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _migration_indexes_and_call_stats,
+    _migration_campaigns,
+    _migration_call_greeting_audio,
+    _migration_summary_jobs,
+    _migration_transcript_audio_index,
+    _migration_turn_metrics,
+    _migration_search_index,
+    _migration_campaign_next_dial,
+    _migration_transcript_segments,
+]
+
+
+def _migrate(cur: sqlite3.Cursor) -> None:
+    cur.execute("PRAGMA user_version")
+    version = cur.fetchone()[0]
+    for i, migration in enumerate(MIGRATIONS[version:], start=version):
+        migration(cur)
+        cur.execute(f"PRAGMA user_version = {i + 1}")
+
+
+# Keyset cursors are opaque to clients: base64 of the last row's sort key.
+
+def encode_cursor(*key: Any) -> str:
+    raw = "\x1f".join(str(k) for k in key)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> List[str]:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("\x1f")
+    except Exception:
+        raise ValueError("Invalid cursor")
 
 
 # Voices
@@ -75,6 +345,7 @@ def upsert_voice(name: str, ref_wav_path: str) -> None:
             "INSERT OR REPLACE INTO voices(name, ref_wav_path) VALUES(?, ?)",
             (name, ref_wav_path),
         )
+    voice_store.invalidate(ref_wav_path)
 
 
 def list_voices() -> List[Dict[str, Any]]:
@@ -92,7 +363,11 @@ def get_voice(name: str) -> Optional[Dict[str, Any]]:
 
 def delete_voice(name: str) -> None:
     with db_cursor() as cur:
+        cur.execute("SELECT ref_wav_path FROM voices WHERE name = ?", (name,))
+        row = cur.fetchone()
         cur.execute("DELETE FROM voices WHERE name = ?", (name,))
+    if row:
+        voice_store.invalidate(row["ref_wav_path"])
 
 
 # Calls and transcripts
@@ -105,6 +380,21 @@ def create_call(call_id: str, to_number: str, voice_name: str, initial_message:
         )
 
 
+def get_call(call_id: str) -> Optional[Dict[str, Any]]:
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT id, to_number, voice_name, initial_message, status, greeting_audio_path FROM calls WHERE id = ?",
+            (call_id,),
+        )
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+
+def set_call_greeting(call_id: str, audio_path: str) -> None:
+    with db_cursor() as cur:
+        cur.execute("UPDATE calls SET greeting_audio_path = ? WHERE id = ?", (audio_path, call_id))
+
+
 def update_call_status(call_id: str, status: str) -> None:
     with db_cursor() as cur:
         cur.execute(
@@ -121,26 +411,454 @@ def complete_call_with_summary(call_id: str, summary: str) -> None:
         )
 
 
-def append_transcript(call_id: str, role: str, text: str, audio_path: str | None = None) -> None:
+def append_transcript(call_id: str, role: str, text: str, audio_path: str | None = None, segment: int = 0) -> None:
+    with db_cursor() as cur:
+        cur.execute(
+            "INSERT INTO transcripts(call_id, role, text, audio_path, segment) VALUES(?, ?, ?, ?, ?)",
+            (call_id, role, text, audio_path, segment),
+        )
+        cur.execute(
+            "UPDATE calls SET turn_count = turn_count + ?, last_activity_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (0 if segment else 1, call_id),
+        )
+
+
+def insert_turn_metrics(row: Dict[str, Any]) -> None:
     with db_cursor() as cur:
         cur.execute(
-            "INSERT INTO transcripts(call_id, role, text, audio_path) VALUES(?, ?, ?, ?)",
-            (call_id, role, text, audio_path),
+            "INSERT INTO turn_metrics(call_id, mode, outcome, total_ms, stages, tokens, tokens_per_second, tts_rtf)"
+            " VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                row["call_id"],
+                row["mode"],
+                row["outcome"],
+                row["total_ms"],
+                json.dumps(row["stages_ms"]),
+                row["tokens"],
+                row["tokens_per_second"],
+                row["tts_rtf"],
+            ),
         )
 
 
-def get_transcript(call_id: str) -> List[Dict[str, Any]]:
+def get_turn_metrics(call_id: str) -> List[Dict[str, Any]]:
     with db_cursor() as cur:
         cur.execute(
-            "SELECT role, text, audio_path, created_at FROM transcripts WHERE call_id = ? ORDER BY id ASC",
+            "SELECT id, mode, outcome, total_ms, stages, tokens, tokens_per_second, tts_rtf, created_at"
+            " FROM turn_metrics WHERE call_id = ? ORDER BY id ASC",
             (call_id,),
         )
+        rows = [dict(r) for r in cur.fetchall()]
+    for row in rows:
+        row["stages_ms"] = json.loads(row.pop("stages"))
+    return rows
+
+
+def transcript_audio_owners(paths: List[str]) -> Dict[str, List[Tuple[int, str]]]:
+    # audio_path -> [(transcript id, call id)] for the given files
+    owners: Dict[str, List[Tuple[int, str]]] = {}
+    with db_cursor() as cur:
+        for i in range(0, len(paths), 500):
+            batch = paths[i:i + 500]
+            cur.execute(
+                f"SELECT id, call_id, audio_path FROM transcripts WHERE audio_path IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            for row in cur.fetchall():
+                owners.setdefault(row["audio_path"], []).append((row["id"], row["call_id"]))
+    return owners
+
+
+def set_transcript_audio_paths(updates: List[Tuple[Optional[str], int]]) -> None:
+    # (new audio_path, transcript id) pairs
+    with db_cursor() as cur:
+        cur.executemany("UPDATE transcripts SET audio_path = ? WHERE id = ?", updates)
+
+
+def get_transcript(call_id: str, after_id: int | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+    sql = "SELECT id, role, text, audio_path, segment, created_at FROM transcripts WHERE call_id = ?"
+    params: List[Any] = [call_id]
+    if after_id is not None:
+        sql += " AND id > ?"
+        params.append(after_id)
+    sql += " ORDER BY id ASC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with db_cursor() as cur:
+        cur.execute(sql, params)
+        return [dict(r) for r in cur.fetchall()]
+
+
+def list_calls(limit: int | None = None, cursor: str | None = None) -> List[Dict[str, Any]]:
+    sql = (
+        "SELECT id, to_number, voice_name, status, summary, summary_status, turn_count, last_activity_at, created_at"
+        " FROM calls"
+    )
+    params: List[Any] = []
+    if cursor:
+        created_at, call_id = decode_cursor(cursor)
+        sql += " WHERE (created_at, id) < (?, ?)"
+        params.extend([created_at, call_id])
+    sql += " ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with db_cursor() as cur:
+        cur.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
 
 
-def list_calls() -> List[Dict[str, Any]]:
+def next_calls_cursor(items: List[Dict[str, Any]], limit: int | None) -> Optional[str]:
+    if not items or limit is None or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last["created_at"], last["id"])
+
+# Search
+
+SEARCH_WORD = re.compile(r"\w+", re.UNICODE)
+# snippet() marks matches with these; the stored text around them is escaped
+# for the caller's markup before they are swapped for the highlight tags
+SNIPPET_START, SNIPPET_END = "\x02", "\x03"
+
+
+def fts_query(text: str) -> str:
+    # Caller input is matched as plain words (all of them, the last as a
+    # prefix), so quotes or FTS5 operators in it can't cause syntax errors
+    words = SEARCH_WORD.findall(text)
+    if not words:
+        raise ValueError("Empty search")
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_calls(
+    query: str,
+    limit: int = 20,
+    cursor: str | None = None,
+    highlight: Tuple[str, str] = ("<mark>", "</mark>"),
+    escape: Callable[[str], str] = html.escape,
+) -> List[Dict[str, Any]]:
+    # Calls ranked by their best bm25 hit across transcript lines and the
+    # summary (lower is better). Snippets are only built for the page.
+    # Pages continue after (score, call_id); scores shift slightly as new
+    # rows are indexed, so a page boundary may repeat or skip a call then.
+    match = fts_query(query)
+    sql = """
+        WITH hits AS (
+            SELECT t.call_id AS call_id, bm25(transcripts_fts) AS score, 'transcript' AS source, t.id AS hit_id
+            FROM transcripts_fts JOIN transcripts t ON t.id = transcripts_fts.rowid
+            WHERE transcripts_fts MATCH :match
+            UNION ALL
+            SELECT c.id, bm25(calls_fts), 'summary', c.rowid
+            FROM calls_fts JOIN calls c ON c.rowid = calls_fts.rowid
+            WHERE calls_fts MATCH :match
+        ), ranked AS (
+            SELECT call_id, MIN(score) AS score, source, hit_id, COUNT(*) AS matches FROM hits GROUP BY call_id
+        )
+        SELECT r.call_id AS id, r.score, r.source, r.hit_id, r.matches,
+               c.to_number, c.voice_name, c.status, c.created_at
+        FROM ranked r JOIN calls c ON c.id = r.call_id
+    """
+    params: Dict[str, Any] = {"match": match, "limit": limit}
+    if cursor:
+        score, call_id = decode_cursor(cursor)
+        sql += " WHERE r.score > :score OR (r.score = :score AND r.call_id > :call_id)"
+        params.update(score=float(score), call_id=call_id)
+    sql += " ORDER BY r.score ASC, r.call_id ASC LIMIT :limit"
+
+    with db_cursor() as cur:
+        cur.execute(sql, params)
+        items = [dict(r) for r in cur.fetchall()]
+        for source, table in (("transcript", "transcripts_fts"), ("summary", "calls_fts")):
+            ids = [item["hit_id"] for item in items if item["source"] == source]
+            if not ids:
+                continue
+            cur.execute(
+                f"SELECT rowid, snippet({table}, 0, ?, ?, '…', 16) FROM {table}"
+                f" WHERE {table} MATCH ? AND rowid IN ({','.join('?' * len(ids))})",
+                [SNIPPET_START, SNIPPET_END, match, *ids],
+            )
+            snippets = dict(cur.fetchall())
+            for item in items:
+                if item["source"] == source:
+                    item["snippet"] = _render_snippet(snippets.get(item["hit_id"]), highlight, escape)
+    for item in items:
+        hit_id = item.pop("hit_id")
+        item["transcript_id"] = hit_id if item["source"] == "transcript" else None
+    return items
+
+
+def _render_snippet(snippet: Optional[str], highlight: Tuple[str, str], escape: Callable[[str], str]) -> Optional[str]:
+    # Caller speech and LLM summaries are untrusted; only the highlight is markup
+    if snippet is None:
+        return None
+    return escape(snippet).replace(SNIPPET_START, highlight[0]).replace(SNIPPET_END, highlight[1])
+
+
+def next_search_cursor(items: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    if len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(repr(last["score"]), last["id"])
+
+
+# Campaigns: a persistent queue of outbound calls drained by app.campaigns
+
+CAMPAIGN_ACTIVE_STATUSES = ("dialing", "in_progress")
+# Final CallStatus values, as stored in calls.status
+CALL_TERMINAL_STATUSES = ("completed", "busy", "no-answer", "failed", "canceled")
+
+
+def create_campaign(campaign_id: str, name: str, cps: float, max_concurrent: int, rows: List[Dict[str, Any]]) -> None:
+    with db_cursor() as cur:
+        cur.execute(
+            "INSERT INTO campaigns(id, name, cps, max_concurrent) VALUES(?, ?, ?, ?)",
+            (campaign_id, name, cps, max_concurrent),
+        )
+        cur.executemany(
+            "INSERT INTO campaign_calls(campaign_id, to_number, voice_name, initial_message) VALUES(?, ?, ?, ?)",
+            [(campaign_id, r["to_number"], r["voice_name"], r.get("initial_message")) for r in rows],
+        )
+
+
+def get_campaign(campaign_id: str) -> Optional[Dict[str, Any]]:
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT id, name, status, cps, max_concurrent, created_at, finished_at FROM campaigns WHERE id = ?",
+            (campaign_id,),
+        )
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+
+def list_campaigns() -> List[Dict[str, Any]]:
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT id, name, status, cps, max_concurrent, created_at, finished_at FROM campaigns ORDER BY created_at DESC"
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def set_campaign_status(campaign_id: str, status: str) -> None:
+    with db_cursor() as cur:
+        finished = status in ("completed", "cancelled")
+        cur.execute(
+            "UPDATE campaigns SET status = ?, finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP END WHERE id = ?",
+            (status, finished, campaign_id),
+        )
+        if status == "cancelled":
+            # Live calls carry on; numbers not yet dialed never will be
+            cur.execute(
+                "UPDATE campaign_calls SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP "
+                "WHERE campaign_id = ? AND status = 'queued'",
+                (campaign_id,),
+            )
+
+
+def campaign_greetings(campaign_id: str) -> List[Dict[str, Any]]:
+    with db_cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT cc.voice_name, cc.initial_message, v.ref_wav_path
+            FROM campaign_calls cc JOIN voices v ON v.name = cc.voice_name
+            WHERE cc.campaign_id = ? AND cc.status = 'queued' AND cc.initial_message IS NOT NULL
+            """,
+            (campaign_id,),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def count_active_campaign_calls(campaign_id: str) -> int:
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT COUNT(*) FROM campaign_calls WHERE campaign_id = ? AND status IN (?, ?)",
+            (campaign_id, *CAMPAIGN_ACTIVE_STATUSES),
+        )
+        return cur.fetchone()[0]
+
+
+def claim_campaign_calls(
+    campaign_id: str, limit: int, max_concurrent: int, now: float | None = None
+) -> Tuple[List[Dict[str, Any]], float]:
+    # Moves up to limit queued rows to 'dialing' and returns them with the
+    # seconds to wait before the next claim (0 unless held back by cps).
+    # Never goes over max_concurrent active rows or the campaign's cps,
+    # across every process dialing it: the pacing slot is reserved first,
+    # which takes SQLite's write lock, and the claim is one statement, so
+    # no two dialers can claim the same row or the same slot.
+    now = time.time() if now is None else now
+    with db_cursor() as cur:
+        cur.execute(
+            "UPDATE campaigns SET next_dial_at = MAX(COALESCE(next_dial_at, 0), ?) + ? / cps "
+            "WHERE id = ? AND COALESCE(next_dial_at, 0) <= ?",
+            (now, limit, campaign_id, now),
+        )
+        if cur.rowcount == 0:
+            cur.execute("SELECT next_dial_at FROM campaigns WHERE id = ?", (campaign_id,))
+            row = cur.fetchone()
+            return [], max(0.0, row["next_dial_at"] - now) if row and row["next_dial_at"] else 0.0
+        cur.execute(
+            """
+            UPDATE campaign_calls SET status = 'dialing', dialed_at = CURRENT_TIMESTAMP
+            WHERE id IN (
+                SELECT id FROM campaign_calls WHERE campaign_id = ? AND status = 'queued' ORDER BY id
+                LIMIT MAX(0, MIN(?, ? - (
+                    SELECT COUNT(*) FROM campaign_calls WHERE campaign_id = ? AND status IN (?, ?)
+                )))
+            ) AND status = 'queued'
+            RETURNING id, to_number, voice_name, initial_message
+            """,
+            (campaign_id, limit, max_concurrent, campaign_id, *CAMPAIGN_ACTIVE_STATUSES),
+        )
+        rows = sorted((dict(r) for r in cur.fetchall()), key=lambda r: r["id"])
+        if len(rows) < limit:
+            # Hand back the slots nothing was dialed in
+            cur.execute(
+                "UPDATE campaigns SET next_dial_at = next_dial_at - ? / cps WHERE id = ?",
+                (limit - len(rows), campaign_id),
+            )
+        return rows, 0.0
+
+
+def update_campaign_call(row_id: int, status: str, call_id: str | None = None, error: str | None = None) -> None:
+    with db_cursor() as cur:
+        cur.execute(
+            "UPDATE campaign_calls SET status = ?, call_id = COALESCE(?, call_id), error = ?, "
+            "finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP END WHERE id = ? AND status = 'dialing'",
+            (status, call_id, error, status not in CAMPAIGN_ACTIVE_STATUSES, row_id),
+        )
+
+
+def finish_campaign_call(call_id: str, status: str) -> None:
+    with db_cursor() as cur:
+        cur.execute(
+            "UPDATE campaign_calls SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE call_id = ? AND status = 'in_progress'",
+            (status, call_id),
+        )
+
+
+def reap_stale_campaign_calls(dial_timeout_seconds: int, call_timeout_seconds: int) -> int:
+    # Frees concurrency slots held by rows nothing will update any more:
+    # - live rows whose call already ended (the status callback arrived
+    #   before the dialer stored the call_id) take the call's status;
+    # - rows left 'dialing' by a dead process fail after the dial timeout.
+    #   They may or may not have reached Twilio; failing them is safer than
+    #   dialing the number twice;
+    # - live rows with no status callback fail after the call timeout.
+    with db_cursor() as cur:
+        cur.execute(
+            """
+            UPDATE campaign_calls SET
+                status = (SELECT c.status FROM calls c WHERE c.id = campaign_calls.call_id),
+                finished_at = CURRENT_TIMESTAMP
+            WHERE status = 'in_progress' AND call_id IN (SELECT id FROM calls WHERE status IN (?, ?, ?, ?, ?))
+            """,
+            CALL_TERMINAL_STATUSES,
+        )
+        reaped = cur.rowcount
+        cur.execute(
+            "UPDATE campaign_calls SET status = 'failed', error = 'dial timed out', finished_at = CURRENT_TIMESTAMP "
+            "WHERE status = 'dialing' AND dialed_at < datetime('now', ?)",
+            (f"-{int(dial_timeout_seconds)} seconds",),
+        )
+        reaped += cur.rowcount
+        cur.execute(
+            "UPDATE campaign_calls SET status = 'failed', error = 'no final call status', finished_at = CURRENT_TIMESTAMP "
+            "WHERE status = 'in_progress' AND dialed_at < datetime('now', ?)",
+            (f"-{int(call_timeout_seconds)} seconds",),
+        )
+        return reaped + cur.rowcount
+
+
+def campaign_progress(campaign_id: str) -> Dict[str, Any]:
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT status, COUNT(*) AS n FROM campaign_calls WHERE campaign_id = ? GROUP BY status",
+            (campaign_id,),
+        )
+        counts = {r["status"]: r["n"] for r in cur.fetchall()}
+        cur.execute(
+            """
+            SELECT
+                SUM(dialed_at >= datetime('now', '-60 seconds')) AS last_minute,
+                MIN(dialed_at) AS first_dialed,
+                MAX(dialed_at) AS last_dialed,
+                (julianday(MAX(dialed_at)) - julianday(MIN(dialed_at))) * 86400.0 AS span_seconds,
+                COUNT(dialed_at) AS dialed
+            FROM campaign_calls WHERE campaign_id = ?
+            """,
+            (campaign_id,),
+        )
+        rate = dict(cur.fetchone())
+    return {"counts": counts, "total": sum(counts.values()), **rate}
+
+
+# Post-call summaries: jobs are persisted so a restart picks them up again
+
+def enqueue_summary_job(call_id: str) -> None:
+    with db_cursor() as cur:
+        cur.execute("INSERT OR IGNORE INTO summary_jobs(call_id) VALUES(?)", (call_id,))
+        cur.execute(
+            "UPDATE calls SET status = 'completed', summary_status = 'pending', updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (call_id,),
+        )
+
+
+def claim_summary_job() -> Optional[Dict[str, Any]]:
+    # One statement, so workers in other processes can't claim the same job
+    with db_cursor() as cur:
+        cur.execute(
+            """
+            UPDATE summary_jobs SET status = 'running', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = (SELECT id FROM summary_jobs WHERE status = 'queued' ORDER BY id LIMIT 1) AND status = 'queued'
+            RETURNING id, call_id, attempts
+            """
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        cur.execute("UPDATE calls SET summary_status = 'running' WHERE id = ?", (row["call_id"],))
+        return dict(row)
+
+
+def touch_summary_job(job_id: int) -> None:
+    # Heartbeat between LLM steps, so a long job isn't mistaken for a stale one
+    with db_cursor() as cur:
+        cur.execute("UPDATE summary_jobs SET updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'running'", (job_id,))
+
+
+def finish_summary_job(job_id: int, call_id: str, summary: str) -> None:
+    complete_call_with_summary(call_id, summary)
+    with db_cursor() as cur:
+        cur.execute("UPDATE summary_jobs SET status = 'done', error = NULL, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (job_id,))
+        cur.execute("UPDATE calls SET summary_status = 'done' WHERE id = ?", (call_id,))
+
+
+def release_summary_job(job_id: int, call_id: str, error: str | None, failed: bool, count_attempt: bool = True) -> None:
+    # Puts a job back in the queue, or marks it failed for good. Jobs put
+    # back only because the LLM was busy don't use up an attempt.
+    status = "failed" if failed else "queued"
+    with db_cursor() as cur:
+        cur.execute(
+            "UPDATE summary_jobs SET status = ?, error = ?, attempts = attempts - ?, updated_at = CURRENT_TIMESTAMP"
+            " WHERE id = ?",
+            (status, error, 0 if count_attempt else 1, job_id),
+        )
+        cur.execute("UPDATE calls SET summary_status = ? WHERE id = ?", ("failed" if failed else "pending", call_id))
+
+
+def requeue_stale_summary_jobs(stale_seconds: int) -> int:
+    # Running jobs with no heartbeat for stale_seconds belonged to a worker
+    # that died; ones other processes are still running are left alone.
     with db_cursor() as cur:
         cur.execute(
-            "SELECT id, to_number, voice_name, status, summary, created_at FROM calls ORDER BY created_at DESC"
+            "UPDATE summary_jobs SET status = 'queued', updated_at = CURRENT_TIMESTAMP "
+            "WHERE status = 'running' AND updated_at < datetime('now', ?) RETURNING call_id",
+            (f"-{int(stale_seconds)} seconds",),
         )
-        return [dict(r) for r in cur.fetchall()]
\ No newline at end of file
+        call_ids = [(r["call_id"],) for r in cur.fetchall()]
+        cur.executemany("UPDATE calls SET summary_status = 'pending' WHERE id = ? AND summary_status = 'running'", call_ids)
+        return len(call_ids)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app import audio_cache
+from app.db import get_call, run_db, set_call_greeting
+from app.inference import run_cached_synthesis
+from app.utils import audio_rel_url
+
+logger = logging.getLogger(__name__)
+
+# Greeting renders started at dial time, by call id. A finished render is
+# recorded on the calls row and dropped from here.
+_pending: Dict[str, asyncio.Task] = {}
+
+
+async def _render(call_id: str, text: str, voice_name: str, ref_wav_path: str) -> Optional[Tuple[str, str]]:
+    try:
+        cached_path, _ = await run_cached_synthesis(
+            text, voice_name, ref_wav_path, language="en", output_format="telephony"
+        )
+        # The call row and its transcript keep this path after the cache
+        # entry may have been evicted
+        out_path, rel_url = await run_in_threadpool(audio_cache.copy_out, cached_path, "greeting")
+    except Exception as exc:
+        # Busy or not-ready TTS included: answer falls back to <Say>
+        logger.warning("Greeting for call %s not pre-rendered: %s", call_id, exc)
+        return None
+    await run_db(set_call_greeting, call_id, out_path)
+    return out_path, rel_url
+
+
+def start(call_id: str, text: Optional[str], voice: Optional[Dict[str, str]]) -> None:
+    if not text or not voice or not voice.get("ref_wav_path"):
+        return
+    task = asyncio.ensure_future(_render(call_id, text, voice["name"], voice["ref_wav_path"]))
+    _pending[call_id] = task
+    task.add_done_callback(lambda _: _pending.pop(call_id, None))
+
+
+async def wait(call_id: str, timeout: float) -> Optional[Tuple[str, str]]:
+    # (out_path, rel_url) of the greeting if it is ready within timeout
+    task = _pending.get(call_id)
+    if task is not None:
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            return None
+    # Rendered earlier, or by another process
+    call = await run_db(get_call, call_id)
+    path = call.get("greeting_audio_path") if call else None
+    if path and os.path.exists(path):
+        return path, audio_rel_url(path)
+    return None
@@ -0,0 +1,251 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+import soundfile as sf
+
+from app.llm_context import ConversationContext
+from app import audio_buffers, metrics, model_lifecycle
+from app.model_backend import get_llm, prepare_voice, synthesize_cached, synthesize_to_wav
+from app.settings import settings
+from app.voice_store import Conditioning
+
+
+class InferenceBusy(Exception):
+    pass
+
+
+class ModelsNotReady(InferenceBusy):
+    # Raised while a model is still loading (or failed to load), so callers
+    # take the same fallback they use when the pool is full
+    pass
+
+
+class InferencePool:
+    def __init__(self, name: str, workers: int, max_queue: int, ready: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self.ready = ready
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"{name}-worker")
+        self.limit = max(1, workers) + max(0, max_queue)
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._inflight -= 1
+            if self._inflight == 0:
+                self._idle.notify_all()
+
+    def _check_ready(self) -> None:
+        if self.ready is not None and not self.ready():
+            raise ModelsNotReady(f"{self.name} model is not ready")
+
+    def _admit_locked(self) -> None:
+        if self._inflight >= self.limit:
+            raise InferenceBusy(f"{self.name} queue is full")
+        self._inflight += 1
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        self._check_ready()
+        with self._lock:
+            self._admit_locked()
+        return self._dispatch(fn, *args, **kwargs)
+
+    def submit_when_idle(self, max_wait: float, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        # Low-priority work (call summaries): takes a slot only once the pool
+        # has drained, or after max_wait so it can't starve on a busy server.
+        # The check and the slot are taken under one lock, so it never jumps
+        # ahead of work that was already waiting.
+        self._check_ready()
+        with self._idle:
+            self._idle.wait_for(lambda: self._inflight == 0, timeout=max_wait)
+            self._admit_locked()
+        return self._dispatch(fn, *args, **kwargs)
+
+    def _dispatch(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        trace, submitted = metrics.current(), time.perf_counter()
+
+        def timed():
+            metrics.record_queue_wait(self.name, time.perf_counter() - submitted, trace)
+            return fn(*args, **kwargs)
+
+        try:
+            future = self.executor.submit(timed)
+        except Exception:
+            with self._lock:
+                self._inflight -= 1
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(functools.partial(fn, *args, **kwargs)))
+
+
+llm_pool = InferencePool("llm", settings.llm_workers, settings.inference_max_queue, ready=lambda: model_lifecycle.is_ready("llm"))
+tts_pool = InferencePool("tts", settings.tts_workers, settings.inference_max_queue, ready=lambda: model_lifecycle.is_ready("tts"))
+
+
+def _record_generation(llm: Any, text: str, seconds: float, trace: Optional[metrics.TurnTrace]) -> None:
+    try:
+        tokens = llm.count_tokens(text) if text else 0
+    except Exception:
+        return
+    metrics.record_llm(tokens, seconds, trace)
+
+
+def _context_reply(context: ConversationContext, session_id: Optional[str], trace: Optional[metrics.TurnTrace]) -> str:
+    llm = get_llm()
+    context.fit(llm)
+    started = time.perf_counter()
+    reply = llm.chat(context.messages(), session_id=session_id)
+    _record_generation(llm, reply, time.perf_counter() - started, trace)
+    return reply
+
+
+async def run_context_chat(context: ConversationContext, session_id: Optional[str] = None) -> str:
+    return await llm_pool.run(_context_reply, context, session_id, metrics.current())
+
+
+_STREAM_END = object()
+
+
+async def stream_context_chat(context: ConversationContext, session_id: Optional[str] = None) -> AsyncIterator[str]:
+    # Sentences arrive as the LLM worker produces them; raises InferenceBusy
+    # on first iteration if the LLM pool is full.
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    trace = metrics.current()
+
+    def produce():
+        try:
+            llm = get_llm()
+            context.fit(llm)
+            started, sentences = time.perf_counter(), []
+            for sentence in llm.stream_chat(context.messages(), session_id=session_id):
+                if not sentences and trace is not None:
+                    trace.add("llm_first_sentence", time.perf_counter() - started)
+                sentences.append(sentence)
+                loop.call_soon_threadsafe(queue.put_nowait, sentence)
+            _record_generation(llm, " ".join(sentences), time.perf_counter() - started, trace)
+        except Exception as exc:
+            loop.call_soon_threadsafe(queue.put_nowait, exc)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+
+    llm_pool.submit(produce)
+    while True:
+        item = await queue.get()
+        if item is _STREAM_END:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+async def run_reply_segments(
+    context: ConversationContext,
+    session_id: Optional[str],
+    ref_wav_path: str,
+    conditioning: Optional[Conditioning] = None,
+) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    # Starts synthesizing each sentence while the LLM is still writing the
+    # next one. Returns (sentence, out_path, rel_url); paths are None for
+    # sentences the TTS pool had no room for.
+    tasks = []
+    try:
+        async for sentence in stream_context_chat(context, session_id=session_id):
+            task = asyncio.ensure_future(
+                run_synthesis(
+                    sentence,
+                    ref_wav_path,
+                    language="en",
+                    conditioning=conditioning,
+                    output_format="telephony",
+                    write_behind=True,
+                )
+            )
+            tasks.append((sentence, task))
+    except Exception:
+        for _, task in tasks:
+            task.cancel()
+        raise
+
+    segments = []
+    for sentence, task in tasks:
+        try:
+            out_path, rel_url = await task
+            segments.append((sentence, out_path, rel_url))
+        except InferenceBusy:
+            segments.append((sentence, None, None))
+    return segments
+
+
+def _timed_synthesis(trace: Optional[metrics.TurnTrace], *args: Any, **kwargs: Any) -> Tuple[str, str]:
+    started = time.perf_counter()
+    out_path, rel_url = synthesize_to_wav(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    duration = audio_buffers.duration(out_path)
+    if duration is None:
+        try:
+            duration = sf.info(out_path).duration
+        except Exception:
+            # With remote model workers the file may not be readable from here
+            duration = 0.0
+    metrics.record_tts(elapsed, duration, trace)
+    return out_path, rel_url
+
+
+async def run_synthesis(
+    text: str,
+    ref_wav_path: str,
+    language: str = "en",
+    conditioning: Optional[Conditioning] = None,
+    output_format: str = "preview",
+    write_behind: bool = False,
+) -> Tuple[str, str]:
+    return await tts_pool.run(
+        _timed_synthesis,
+        metrics.current(),
+        text,
+        ref_wav_path,
+        language=language,
+        conditioning=conditioning,
+        output_format=output_format,
+        write_behind=write_behind,
+    )
+
+
+async def run_cached_synthesis(
+    text: str,
+    voice_name: str,
+    ref_wav_path: str,
+    language: str = "en",
+    conditioning: Optional[Conditioning] = None,
+    output_format: str = "preview",
+) -> Tuple[str, str]:
+    return await tts_pool.run(
+        synthesize_cached,
+        text,
+        voice_name,
+        ref_wav_path,
+        language=language,
+        conditioning=conditioning,
+        output_format=output_format,
+    )
+
+
+async def run_prepare_voice(ref_wav_path: str) -> bool:
+    try:
+        return await tts_pool.run(prepare_voice, ref_wav_path)
+    except InferenceBusy:
+        # Conditioning is computed lazily on first synthesis instead.
+        return False
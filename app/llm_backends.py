@@ -0,0 +1,135 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+BACKENDS = ("fp32", "int8", "onnx")
+MODELS_DIR = os.path.join(settings.data_dir, "models")
+
+DRIFT_PROMPTS = [
+    "Hello, is this a good time to talk?",
+    "I'd like to reschedule my appointment to Friday afternoon.",
+    "Can you tell me what the refund policy is?",
+]
+
+
+def _slug(model_name: str) -> str:
+    return model_name.replace("/", "--")
+
+
+def artifact_path(model_name: str, backend: str) -> str:
+    # Pickled quantized modules are tied to the torch build that wrote them
+    if backend == "int8":
+        version = importlib.import_module("torch").__version__.replace("+", "_")
+        return os.path.join(MODELS_DIR, f"{_slug(model_name)}-int8-torch{version}.pt")
+    return os.path.join(MODELS_DIR, f"{_slug(model_name)}-onnx")
+
+
+def _load_fp32(model_name: str) -> Any:
+    transformers = importlib.import_module("transformers")
+    # safetensors are memory-mapped and loaded without an extra copy,
+    # so forked model workers share the weight pages
+    return transformers.AutoModelForCausalLM.from_pretrained(model_name, low_cpu_mem_usage=True)
+
+
+def _load_int8(model_name: str) -> Any:
+    torch = importlib.import_module("torch")
+    path = artifact_path(model_name, "int8")
+    if os.path.exists(path):
+        return torch.load(path, weights_only=False)
+    logger.info("Quantizing %s to int8 (one-off, cached at %s)", model_name, path)
+    model = torch.ao.quantization.quantize_dynamic(_load_fp32(model_name).eval(), {torch.nn.Linear}, dtype=torch.qint8)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    torch.save(model, tmp)
+    os.replace(tmp, path)
+    return model
+
+
+def _load_onnx(model_name: str) -> Any:
+    ORTModelForCausalLM = importlib.import_module("optimum.onnxruntime").ORTModelForCausalLM
+    path = artifact_path(model_name, "onnx")
+    if os.path.isdir(path):
+        return ORTModelForCausalLM.from_pretrained(path)
+    logger.info("Exporting %s to ONNX (one-off, cached at %s)", model_name, path)
+    model = ORTModelForCausalLM.from_pretrained(model_name, export=True)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    model.save_pretrained(path)
+    return model
+
+
+def load_model(model_name: str, backend: str) -> Tuple[Any, str]:
+    # Returns the model and the backend actually used; an unavailable
+    # backend falls back to fp32 rather than leaving the LLM offline.
+    if backend not in BACKENDS:
+        logger.warning("Unknown LLM_BACKEND %r, using fp32", backend)
+        backend = "fp32"
+    if backend != "fp32":
+        try:
+            return (_load_int8 if backend == "int8" else _load_onnx)(model_name), backend
+        except Exception:
+            logger.exception("Could not load the %s backend, using fp32", backend)
+    return _load_fp32(model_name), "fp32"
+
+
+def drift_report(model_name: str, backend: str, prompts: List[str] = DRIFT_PROMPTS, new_tokens: int = 20) -> Dict[str, Any]:
+    # Compares the backend's next-token logits and greedy continuations
+    # against the fp32 reference on a few call-style prompts.
+    torch = importlib.import_module("torch")
+    tokenizer = importlib.import_module("transformers").AutoTokenizer.from_pretrained(model_name)
+    reference = _load_fp32(model_name).eval()
+    candidate, used = load_model(model_name, backend)
+    results = []
+    with torch.inference_mode():
+        for prompt in prompts:
+            inputs = tokenizer(prompt, return_tensors="pt")
+            ref_logits = reference(**inputs).logits[0]
+            cand_logits = candidate(**inputs).logits[0]
+            greedy = {"max_new_tokens": new_tokens, "do_sample": False, "pad_token_id": tokenizer.eos_token_id}
+            ref_out = reference.generate(**inputs, **greedy)[0].tolist()
+            cand_out = candidate.generate(**inputs, **greedy)[0].tolist()
+            n = inputs.input_ids.shape[1]
+            same = sum(1 for a, b in zip(ref_out[n:], cand_out[n:]) if a == b)
+            results.append(
+                {
+                    "prompt": prompt,
+                    "max_abs_logit_diff": float((ref_logits - cand_logits).abs().max()),
+                    "top1_agreement": float((ref_logits.argmax(-1) == cand_logits.argmax(-1)).float().mean()),
+                    "greedy_token_match": same / max(1, len(ref_out) - n),
+                    "fp32": tokenizer.decode(ref_out[n:], skip_special_tokens=True),
+                    "candidate": tokenizer.decode(cand_out[n:], skip_special_tokens=True),
+                }
+            )
+    return {
+        "model": model_name,
+        "backend": used,
+        "mean_top1_agreement": sum(r["top1_agreement"] for r in results) / len(results),
+        "mean_greedy_token_match": sum(r["greedy_token_match"] for r in results) / len(results),
+        "prompts": results,
+    }
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build cached LLM backend artifacts and check their drift from fp32.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backend", choices=BACKENDS, default=settings.llm_backend)
+    parser.add_argument("--check", action="store_true", help="Report output drift against fp32")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.check:
+        print(json.dumps(drift_report(args.model, args.backend), indent=2))
+    else:
+        _, used = load_model(args.model, args.backend)
+        print(f"{args.backend} artifacts ready ({used})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import threading
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    # Only for annotations; importing it would load the model
+    from app.llm_engine import LLMEngine
+
+
+CALL_SYSTEM_PROMPT = "You are a friendly helpful assistant for short phone calls. Keep replies under 15 words."
+
+# Role markers and separators the chat template adds around each message
+MESSAGE_OVERHEAD_TOKENS = 8
+# After folding, aim this far below the budget so we don't re-summarize every turn
+FOLD_TARGET_RATIO = 0.6
+
+
+class ConversationContext:
+    def __init__(self, system_prompt: str, budget_tokens: int, min_recent_turns: int = 4):
+        self.system_prompt = system_prompt
+        self.budget_tokens = budget_tokens
+        self.min_recent_turns = min_recent_turns
+        self.summary = ""
+        self.turns: List[Dict[str, str]] = []
+        self._turn_tokens: List[int] = []
+        self._lock = threading.Lock()
+
+    def add(self, role: str, content: str) -> None:
+        with self._lock:
+            self.turns.append({"role": role, "content": content})
+
+    def _system_content(self) -> str:
+        if not self.summary:
+            return self.system_prompt
+        return f"{self.system_prompt}\n\nSummary of the call so far: {self.summary}"
+
+    def messages(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [{"role": "system", "content": self._system_content()}] + list(self.turns)
+
+    def _total(self, engine: "LLMEngine") -> int:
+        while len(self._turn_tokens) < len(self.turns):
+            turn = self.turns[len(self._turn_tokens)]
+            self._turn_tokens.append(engine.count_tokens(turn["content"]) + MESSAGE_OVERHEAD_TOKENS)
+        return engine.count_tokens(self._system_content()) + MESSAGE_OVERHEAD_TOKENS + sum(self._turn_tokens)
+
+    def fit(self, engine: "LLMEngine") -> None:
+        # Keeps the prompt within budget by folding the oldest turns into the
+        # rolling summary. Runs on the LLM worker since folding calls the model;
+        # the lock is not held during generation so add() never waits on it.
+        budget = min(self.budget_tokens, engine.prompt_budget)
+        with self._lock:
+            total = self._total(engine)
+            if total <= budget:
+                return
+            target = int(budget * FOLD_TARGET_RATIO)
+            folded = []
+            while len(self.turns) > self.min_recent_turns and total > target:
+                folded.append(self.turns.pop(0))
+                total -= self._turn_tokens.pop(0)
+            previous = self.summary
+
+        if folded:
+            summary = engine.update_summary(previous, folded)
+            with self._lock:
+                self.summary = summary
+
+        with self._lock:
+            # A few very long turns can still overflow; drop them outright.
+            total = self._total(engine)
+            while len(self.turns) > 1 and total > budget:
+                self.turns.pop(0)
+                total -= self._turn_tokens.pop(0)
@@ -1,35 +1,149 @@
 import importlib
-from typing import List, Dict
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, List, Dict, Optional, Tuple
+
+from app.llm_backends import DEFAULT_MODEL, load_model
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_NEW_TOKENS = 180
+GENERATION_KWARGS = {"max_new_tokens": MAX_NEW_TOKENS, "do_sample": True, "top_p": 0.9, "temperature": 0.6}
+# The legacy prompt format has no stop token, so generation may invent turns
+LEGACY_MARKERS = ("[User]:", "[System]:", "[Assistant]:")
+
+SENTENCE_BOUNDARY = re.compile(r"([.!?;:]|,)(\s+)")
+# Commas only end a chunk once it is long enough to be worth a TTS call
+MIN_CLAUSE_CHARS = 24
+
+
+class _AttemptStreamer:
+    # Wraps the reply's streamer for one generate() call: drops the prompt
+    # (always the first put) and notes whether any reply text went out, so
+    # a failed attempt can tell if retrying would repeat what was sent.
+    def __init__(self, target: Any):
+        self.target = target
+        self.started = False
+        self._prompt = True
+
+    def put(self, value: Any) -> None:
+        if self._prompt:
+            self._prompt = False
+            return
+        self.started = True
+        self.target.put(value)
+
+    def end(self) -> None:
+        self.target.end()
+
+
+def split_sentences(buffer: str) -> Tuple[List[str], str]:
+    # Returns the complete sentences/clauses in buffer and the unfinished rest.
+    pieces = []
+    start = 0
+    for m in SENTENCE_BOUNDARY.finditer(buffer):
+        piece = buffer[start:m.end(1)].strip()
+        if m.group(1) == "," and len(piece) < MIN_CLAUSE_CHARS:
+            continue
+        if piece:
+            pieces.append(piece)
+        start = m.end()
+    return pieces, buffer[start:]
+
+
+def _cut_invented_turn(text: str) -> Tuple[str, bool]:
+    for marker in LEGACY_MARKERS:
+        idx = text.find(marker)
+        if idx != -1:
+            return text[:idx], True
+    return text, False
+
+
+def _cache_nbytes(cache: Any) -> int:
+    layers = getattr(cache, "layers", None)
+    if layers is not None:
+        tensors = [t for layer in layers for t in (getattr(layer, "keys", None), getattr(layer, "values", None))]
+    else:
+        tensors = list(getattr(cache, "key_cache", [])) + list(getattr(cache, "value_cache", []))
+    return sum(t.numel() * t.element_size() for t in tensors if t is not None and hasattr(t, "numel"))
+
+
+# Past key/values per conversation, so a new turn only prefills the tokens
+# that differ from what the model has already seen. Entries are taken out
+# while in use, so a session's cache is never shared between two generations.
+class KVCacheStore:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[List[int], Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def take(self, session_id: str) -> Optional[Tuple[List[int], Any]]:
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[2]
+            return entry[0], entry[1]
+
+    def put(self, session_id: str, token_ids: List[int], cache: Any) -> None:
+        size = _cache_nbytes(cache)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(session_id, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[session_id] = (token_ids, cache, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def drop(self, session_id: str) -> None:
+        self.take(session_id)
 
 
 class LLMEngine:
-    def __init__(self, model_name: str = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"):
+    def __init__(self, model_name: str = DEFAULT_MODEL, backend: str = settings.llm_backend):
         self.model_name = model_name
+        self.backend = backend
+        self.context_tokens = settings.llm_context_tokens
+        self.kv_cache = KVCacheStore(settings.llm_kv_cache_mb * 1024 * 1024)
         try:
             transformers = importlib.import_module("transformers")
-            AutoModelForCausalLM = transformers.AutoModelForCausalLM
             AutoTokenizer = transformers.AutoTokenizer
             pipeline = transformers.pipeline
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
+            self.model, self.backend = load_model(model_name, backend)
             self.pipe = pipeline(
                 "text-generation",
                 model=self.model,
                 tokenizer=self.tokenizer,
-                max_new_tokens=180,
-                do_sample=True,
-                top_p=0.9,
-                temperature=0.6,
+                **GENERATION_KWARGS,
             )
+            # ONNX Runtime models keep their own past key/values
+            self._dynamic_cache = getattr(transformers, "DynamicCache", None) if self.backend != "onnx" else None
             self._ok = True
         except Exception:
             self._ok = False
 
-    def chat(self, messages: List[Dict[str, str]]) -> str:
+    @property
+    def prompt_budget(self) -> int:
+        return self.context_tokens - MAX_NEW_TOKENS
+
+    def count_tokens(self, text: str) -> int:
         if not getattr(self, "_ok", False):
-            # Minimal fallback if transformers isn't available
-            last_user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
-            return ("Noted: " + last_user)[:100]
+            # Rough English average when no tokenizer is available
+            return max(1, len(text) // 4)
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def build_prompt(self, messages: List[Dict[str, str]]) -> str:
+        if getattr(self, "_ok", False) and getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
         prompt = ""
         for m in messages:
             role = m.get("role", "user")
@@ -41,10 +155,113 @@ class LLMEngine:
             else:
                 prompt += f"[User]: {content}\n"
         prompt += "[Assistant]:"
-        result = self.pipe(prompt)[0]["generated_text"]
-        if "[Assistant]:" in result:
-            return result.split("[Assistant]:")[-1].strip()
-        return result.strip()
+        return prompt
+
+    def _generate_cached(self, prompt: str, session_id: str, streamer: Any = None) -> str:
+        torch = importlib.import_module("torch")
+        input_ids = self.tokenizer(prompt, return_tensors="pt").input_ids
+        new_ids = input_ids[0].tolist()
+
+        past = None
+        entry = self.kv_cache.take(session_id)
+        if entry is not None:
+            cached_ids, cache = entry
+            common = 0
+            for a, b in zip(cached_ids, new_ids):
+                if a != b:
+                    break
+                common += 1
+            # At least one prompt token must be fed to get next-token logits
+            common = min(common, len(new_ids) - 1)
+            if common > 0:
+                stale = cache.get_seq_length() - common
+                if stale > 0:
+                    cache.crop(-stale)
+                past = cache
+        if past is None:
+            past = self._dynamic_cache()
+
+        with torch.inference_mode():
+            out = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=past,
+                return_dict_in_generate=True,
+                pad_token_id=self.tokenizer.eos_token_id,
+                streamer=streamer,
+                **GENERATION_KWARGS,
+            )
+        sequence = out.sequences[0]
+        cache = out.past_key_values
+        self.kv_cache.put(session_id, sequence.tolist()[: cache.get_seq_length()], cache)
+        return self.tokenizer.decode(sequence[len(new_ids):], skip_special_tokens=True)
+
+    def drop_session(self, session_id: str) -> None:
+        self.kv_cache.drop(session_id)
+
+    def warm_up(self) -> None:
+        # One short generation so the first caller doesn't pay for lazy
+        # kernel/allocator setup
+        if getattr(self, "_ok", False):
+            self.pipe(self.build_prompt([{"role": "user", "content": "Hello"}]), return_full_text=False, max_new_tokens=1)
+
+    def _generate(self, prompt: str, session_id: Optional[str] = None, streamer: Any = None) -> str:
+        if session_id and self._dynamic_cache is not None:
+            attempt = _AttemptStreamer(streamer) if streamer is not None else None
+            try:
+                return self._generate_cached(prompt, session_id, streamer=attempt)
+            except Exception:
+                logger.exception("Cached generation failed; falling back to a full prefill")
+                self.kv_cache.drop(session_id)
+                if attempt is not None and attempt.started:
+                    # Part of the reply was already streamed, and a sampled
+                    # retry wouldn't continue it; fail the turn instead
+                    raise
+        extra = {"streamer": _AttemptStreamer(streamer)} if streamer is not None else {}
+        return self.pipe(prompt, return_full_text=False, **extra)[0]["generated_text"]
+
+    def chat(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> str:
+        if not getattr(self, "_ok", False):
+            # Minimal fallback if transformers isn't available
+            last_user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+            return ("Noted: " + last_user)[:100]
+        result = self._generate(self.build_prompt(messages), session_id=session_id)
+        return _cut_invented_turn(result)[0].strip()
+
+    def stream_chat(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> Iterator[str]:
+        # Yields the reply sentence by sentence (long clauses too) while the
+        # model is still generating the rest.
+        if not getattr(self, "_ok", False):
+            yield self.chat(messages, session_id=session_id)
+            return
+        TextIteratorStreamer = importlib.import_module("transformers").TextIteratorStreamer
+        # _generate drops the prompt itself, per attempt
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=False, skip_special_tokens=True)
+        prompt = self.build_prompt(messages)
+        errors: List[BaseException] = []
+
+        def generate():
+            try:
+                self._generate(prompt, session_id=session_id, streamer=streamer)
+            except BaseException as exc:
+                errors.append(exc)
+                streamer.end()
+
+        worker = threading.Thread(target=generate, name="llm-stream", daemon=True)
+        worker.start()
+        buffer = ""
+        stopped = False
+        for piece in streamer:
+            if stopped:
+                continue  # drain so generation can finish
+            buffer, stopped = _cut_invented_turn(buffer + piece)
+            sentences, buffer = split_sentences(buffer)
+            yield from sentences
+        worker.join()
+        if errors:
+            raise errors[0]
+        if buffer.strip():
+            yield buffer.strip()
 
     def summarize(self, transcript: str) -> str:
         messages = [
@@ -53,5 +270,27 @@ class LLMEngine:
         ]
         return self.chat(messages)
 
+    def update_summary(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        lines = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+        messages = [
+            {"role": "system", "content": "You maintain a short running summary of a phone call. Reply with the updated summary only, under 60 words."},
+            {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew lines:\n{lines}"},
+        ]
+        return self.chat(messages)
+
+
+_llm_lock = threading.Lock()
+_llm: Optional[LLMEngine] = None
+
+
+def get_llm() -> LLMEngine:
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = LLMEngine()
+    return _llm
+
 
-llm = LLMEngine()
\ No newline at end of file
+def loaded_llm() -> Optional[LLMEngine]:
+    return _llm
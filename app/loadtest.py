@@ -0,0 +1,454 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import soundfile as sf
+
+# Drives the app with simulated Twilio webhook traffic: each call is
+# answer -> N x loop -> status, many calls at once. Runs the app in process
+# (optionally with fake LLM/TTS backends of known latency) or against a
+# server on localhost, and prints a JSON report to compare across changes:
+#
+#   python -m app.loadtest --calls 40 --concurrency 8 --turns 3
+#   python -m app.loadtest --real --data-dir ./data --voice alice
+#   python -m app.loadtest --url http://127.0.0.1:8000 --data-dir ./data
+#
+# app.* is imported lazily: settings are read at import time and the data
+# directory is chosen from the command line first.
+
+CALLER_LINES = [
+    "Hi, what time do you open tomorrow?",
+    "Can I book a table for four people at seven?",
+    "Do you have any vegetarian options on the menu?",
+    "Is there parking near the restaurant?",
+    "Great, can you repeat the booking details for me?",
+    "Thanks, that's all I needed. Goodbye.",
+]
+FAKE_REPLIES = [
+    "Sure, I can help with that. We open at nine in the morning.",
+    "Of course. I have noted a table for four at seven this evening.",
+    "Yes, we have several vegetarian dishes. The risotto is popular.",
+    "There is a public car park just around the corner. It is free after six.",
+]
+# Speaking rate used to size fake audio
+SECONDS_PER_WORD = 0.4
+BUSY_MARKER = "Sorry, I missed that."
+
+
+class FakeLLM:
+    # Same surface as LLMEngine with deterministic replies: first_ms until
+    # the first sentence, then tokens_per_second for the rest.
+    prompt_budget = 1536
+
+    def __init__(self, first_ms: float, tokens_per_second: float):
+        self.first_s = first_ms / 1000.0
+        self.tokens_per_second = max(1.0, tokens_per_second)
+
+    def count_tokens(self, text: str) -> int:
+        return max(1, int(len(text.split()) * 1.3))
+
+    def _sentences(self, messages: List[Dict[str, str]]) -> List[str]:
+        last = messages[-1]["content"] if messages else ""
+        i = zlib.crc32(last.encode("utf-8"))
+        return [FAKE_REPLIES[(i + k) % len(FAKE_REPLIES)] for k in range(2)]
+
+    def stream_chat(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> Iterator[str]:
+        time.sleep(self.first_s)
+        for k, sentence in enumerate(self._sentences(messages)):
+            if k:
+                time.sleep(self.count_tokens(sentence) / self.tokens_per_second)
+            yield sentence
+
+    def chat(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> str:
+        return " ".join(self.stream_chat(messages, session_id=session_id))
+
+    def summarize(self, transcript: str) -> str:
+        time.sleep(self.first_s)
+        return f"Caller discussed {len(transcript.splitlines())} topics."
+
+    def update_summary(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        return summary
+
+    def drop_session(self, session_id: str) -> None:
+        pass
+
+    def warm_up(self) -> None:
+        pass
+
+
+class FakeTTS:
+    # Renders silence as long as the text would take to say, taking
+    # real_time_factor x that long
+    def __init__(self, real_time_factor: float):
+        self.real_time_factor = real_time_factor
+
+    def _render(self, text: str) -> Tuple[np.ndarray, int]:
+        seconds = max(0.5, len(text.split()) * SECONDS_PER_WORD)
+        time.sleep(seconds * self.real_time_factor)
+        return np.zeros(int(seconds * 8000), dtype=np.float32), 8000
+
+    def synthesize_to_wav(
+        self,
+        text: str,
+        ref_wav_path: str,
+        language: str = "en",
+        conditioning: Any = None,
+        output_format: str = "preview",
+        write_behind: bool = False,
+    ) -> Tuple[str, str]:
+        from app import audio_buffers
+        from app.audio import encode_audio, write_audio
+        from app.utils import buffered_audio_url, new_audio_file
+
+        out_path, rel_url = new_audio_file(stem="tts")
+        samples, rate = self._render(text)
+        if write_behind:
+            audio_buffers.publish(out_path, encode_audio(samples, rate, output_format), len(samples) / rate)
+            return out_path, buffered_audio_url(out_path)
+        write_audio(out_path, samples, rate, output_format)
+        return out_path, rel_url
+
+    def synthesize_cached(
+        self,
+        text: str,
+        voice_name: str,
+        ref_wav_path: str,
+        language: str = "en",
+        conditioning: Any = None,
+        output_format: str = "preview",
+    ) -> Tuple[str, str]:
+        return self.synthesize_to_wav(text, ref_wav_path, language=language, output_format=output_format)
+
+    def stream_synthesis(self, text: str, ref_wav_path: str, language: str = "en", conditioning: Any = None) -> Iterator[Any]:
+        yield self._render(text)
+
+    def get_speaker_conditioning(self, ref_wav_path: str) -> None:
+        return None
+
+    def prepare_voice(self, ref_wav_path: str) -> bool:
+        return True
+
+
+def install_fakes(llm: FakeLLM, tts: FakeTTS) -> None:
+    # Must run before app.main (and everything importing from
+    # app.model_backend by name) is imported
+    from app import model_backend, model_lifecycle
+
+    model_backend.get_llm = lambda: llm
+    model_backend.loaded_llm = lambda: llm
+    for name in ("synthesize_to_wav", "synthesize_cached", "stream_synthesis", "get_speaker_conditioning", "prepare_voice"):
+        setattr(model_backend, name, getattr(tts, name))
+    model_lifecycle._warm_tts = lambda: None
+
+
+def _bench_voice(data_dir: str) -> str:
+    # A reference clip for fake runs; fake TTS never reads it
+    from app.db import upsert_voice
+
+    voice_dir = os.path.join(data_dir, "voices", "loadtest")
+    os.makedirs(voice_dir, exist_ok=True)
+    path = os.path.join(voice_dir, "reference.wav")
+    sf.write(path, np.zeros(22050, dtype=np.float32), 22050)
+    upsert_voice("loadtest", path)
+    return "loadtest"
+
+
+# ----------------------
+# /metrics parsing: server-side histograms are diffed across the run
+# ----------------------
+_SERIES = re.compile(r"^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)$")
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    series = {}
+    for line in text.splitlines():
+        m = _SERIES.match(line.strip())
+        if m and not line.startswith("#"):
+            labels = tuple(sorted(_LABEL.findall(m.group(2) or "")))
+            series[(m.group(1), labels)] = float(m.group(3))
+    return series
+
+
+def _histograms(before: Dict, after: Dict, name: str) -> Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]]:
+    # label set (without le) -> {count, sum, buckets: [(le, cumulative)]}
+    out: Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]] = {}
+    for (series, labels), value in after.items():
+        if not series.startswith(name + "_"):
+            continue
+        delta = value - before.get((series, labels), 0.0)
+        key = tuple(kv for kv in labels if kv[0] != "le")
+        h = out.setdefault(key, {"count": 0.0, "sum": 0.0, "buckets": []})
+        suffix = series[len(name) + 1:]
+        if suffix == "count":
+            h["count"] = delta
+        elif suffix == "sum":
+            h["sum"] = delta
+        elif suffix == "bucket":
+            le = dict(labels)["le"]
+            h["buckets"].append((float("inf") if le == "+Inf" else float(le), delta))
+    return {k: h for k, h in out.items() if h["count"] > 0}
+
+
+def bucket_quantile(q: float, buckets: List[Tuple[float, float]]) -> Optional[float]:
+    # Linear interpolation within the bucket, as Prometheus histogram_quantile
+    buckets = sorted(buckets)
+    total = buckets[-1][1] if buckets else 0
+    if total <= 0:
+        return None
+    rank, prev_le, prev_count = q * total, 0.0, 0.0
+    for le, count in buckets:
+        if count >= rank:
+            if le == float("inf"):
+                return prev_le
+            span = count - prev_count
+            return prev_le + (le - prev_le) * ((rank - prev_count) / span if span else 1.0)
+        prev_le, prev_count = le, count
+    return prev_le
+
+
+def _summarize_histograms(before: Dict, after: Dict, name: str, label: Optional[str], scale: float = 1.0) -> Dict[str, Any]:
+    report = {}
+    for labels, h in sorted(_histograms(before, after, name).items()):
+        key = dict(labels).get(label, "all") if label else "all"
+        p95 = bucket_quantile(0.95, h["buckets"])
+        report[key] = {
+            "count": int(h["count"]),
+            "mean": round(h["sum"] / h["count"] * scale, 3),
+            "p95": round(p95 * scale, 3) if p95 is not None else None,
+            "total": round(h["sum"] * scale, 3),
+        }
+    return report
+
+
+def server_report(before: Dict, after: Dict) -> Dict[str, Any]:
+    turn_ms = _summarize_histograms(before, after, "call_turn_seconds", "outcome", 1000)
+    stages_ms = _summarize_histograms(before, after, "call_turn_stage_seconds", "stage", 1000)
+    db_ms = _summarize_histograms(before, after, "db_call_seconds", "op", 1000)
+    turn_total = sum(v["total"] for v in turn_ms.values())
+    return {
+        "turn_ms": turn_ms,
+        "stages_ms": stages_ms,
+        "queue_wait_ms": _summarize_histograms(before, after, "inference_queue_wait_seconds", "pool", 1000),
+        "llm_tokens_per_second": _summarize_histograms(before, after, "llm_tokens_per_second", None).get("all"),
+        "tts_real_time_factor": _summarize_histograms(before, after, "tts_real_time_factor", None).get("all"),
+        # DB contention: time turns spent awaiting SQLite, executor queueing included
+        "db": {
+            "ops_ms": db_ms,
+            "turn_share": round(stages_ms["db"]["total"] / turn_total, 4) if "db" in stages_ms and turn_total else 0.0,
+        },
+    }
+
+
+# ----------------------
+# Traffic
+# ----------------------
+def percentiles(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        # Nearest-rank
+        return ordered[min(len(ordered) - 1, max(0, int(np.ceil(q * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "p50": round(rank(0.50), 2),
+        "p95": round(rank(0.95), 2),
+        "p99": round(rank(0.99), 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+class _Recorder:
+    def __init__(self):
+        self.latency_ms: Dict[str, List[float]] = {"answer": [], "loop": [], "status": []}
+        self.errors: Dict[str, int] = {}
+        self.busy_turns = 0
+
+    async def post(self, client: httpx.AsyncClient, kind: str, url: str, data: Dict[str, str]) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.post(url, data=data)
+        except httpx.HTTPError as exc:
+            self._error(f"{kind}: {type(exc).__name__}")
+            return None
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            self._error(f"{kind}: HTTP {response.status_code}")
+            return response
+        self.latency_ms[kind].append(elapsed)
+        if kind == "loop" and BUSY_MARKER in response.text:
+            self.busy_turns += 1
+        return response
+
+    def _error(self, key: str) -> None:
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+
+async def _simulate_call(client: httpx.AsyncClient, recorder: _Recorder, call_id: str, index: int, turns: int, think_s: float) -> None:
+    sid = f"CA{call_id}"
+    query = f"call_id={call_id}"
+    await recorder.post(client, "answer", f"/twilio/answer?{query}", {"CallSid": sid, "CallStatus": "in-progress"})
+    for turn in range(turns):
+        if think_s:
+            await asyncio.sleep(think_s)
+        speech = CALLER_LINES[(index + turn) % len(CALLER_LINES)]
+        await recorder.post(client, "loop", f"/twilio/loop?{query}", {"CallSid": sid, "SpeechResult": speech})
+    await recorder.post(client, "status", f"/twilio/status?{query}", {"CallSid": sid, "CallStatus": "completed"})
+
+
+@asynccontextmanager
+async def _client(args: argparse.Namespace) -> AsyncIterator[httpx.AsyncClient]:
+    timeout = httpx.Timeout(args.request_timeout)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+            yield client
+        return
+    from app.main import app
+
+    # ASGITransport doesn't run lifespan events; run startup/shutdown here
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            yield client
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise SystemExit(f"App not ready after {timeout:.0f}s")
+        await asyncio.sleep(0.5)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.db import create_call, init_db, run_db
+
+    init_db()
+    voice = args.voice
+    if voice is None and not args.real and not args.url:
+        voice = await run_db(_bench_voice, args.data_dir)
+
+    recorder = _Recorder()
+    async with _client(args) as client:
+        await _wait_ready(client, args.ready_timeout)
+        call_ids = [f"lt{uuid.uuid4().hex[:12]}" for _ in range(args.calls)]
+        for i, call_id in enumerate(call_ids):
+            await run_db(create_call, call_id, f"+1555{i:07d}", voice, args.greeting or None)
+
+        before = parse_metrics((await client.get("/metrics")).text)
+        semaphore = asyncio.Semaphore(max(1, args.concurrency))
+
+        async def one(i: int, call_id: str) -> None:
+            async with semaphore:
+                await _simulate_call(client, recorder, call_id, i, args.turns, args.think_ms / 1000.0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i, c) for i, c in enumerate(call_ids)))
+        elapsed = time.perf_counter() - started
+        after = parse_metrics((await client.get("/metrics")).text)
+
+    return {
+        "config": {
+            "target": args.url or "in-process",
+            "backends": "real" if args.real or args.url else "fake",
+            "calls": args.calls,
+            "concurrency": args.concurrency,
+            "turns": args.turns,
+            "think_ms": args.think_ms,
+            "voice": voice,
+            "fake_llm_first_ms": args.llm_first_ms,
+            "fake_llm_tokens_per_second": args.llm_tps,
+            "fake_tts_real_time_factor": args.tts_rtf,
+        },
+        "duration_s": round(elapsed, 3),
+        "throughput": {
+            "turns_per_second": round(len(recorder.latency_ms["loop"]) / elapsed, 3) if elapsed else 0.0,
+            "calls_per_second": round(args.calls / elapsed, 3) if elapsed else 0.0,
+        },
+        "latency_ms": {kind: percentiles(values) for kind, values in recorder.latency_ms.items()},
+        "busy_turns": recorder.busy_turns,
+        "errors": recorder.errors,
+        "server": server_report(before, after),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    # Regressions beyond max_regression (a fraction) in turn latency or throughput
+    problems = []
+    for q in ("p50", "p95", "p99"):
+        old, new = baseline["latency_ms"]["loop"].get(q), report["latency_ms"]["loop"].get(q)
+        if old and new and new > old * (1 + max_regression):
+            problems.append(f"loop {q} {old:.0f}ms -> {new:.0f}ms")
+    old, new = baseline["throughput"]["turns_per_second"], report["throughput"]["turns_per_second"]
+    if old and new < old * (1 - max_regression):
+        problems.append(f"throughput {old:.2f} -> {new:.2f} turns/s")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulated Twilio call load against the app")
+    parser.add_argument("--calls", type=int, default=20, help="calls to simulate")
+    parser.add_argument("--concurrency", type=int, default=5, help="calls in flight at once")
+    parser.add_argument("--turns", type=int, default=3, help="caller turns (loop requests) per call")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause before each caller turn")
+    parser.add_argument("--greeting", default="Hello, this is a test call.", help="initial message; empty for none")
+    parser.add_argument("--voice", help="voice to call with (default: a generated one with fakes, none otherwise)")
+    parser.add_argument("--real", action="store_true", help="use the real models instead of fakes")
+    parser.add_argument("--url", help="drive a running server instead of the app in process")
+    parser.add_argument("--data-dir", help="DATA_DIR to use (default: a fresh temp dir); must be the server's with --url")
+    parser.add_argument("--llm-first-ms", type=float, default=300.0, help="fake LLM time to first sentence")
+    parser.add_argument("--llm-tps", type=float, default=20.0, help="fake LLM tokens per second after that")
+    parser.add_argument("--tts-rtf", type=float, default=0.5, help="fake TTS seconds per second of audio")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--ready-timeout", type=float, default=600.0)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--baseline", help="earlier report to compare against; exits 1 on regression")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown vs baseline, as a fraction")
+    args = parser.parse_args()
+    if args.url and not args.data_dir:
+        parser.error("--url needs --data-dir pointing at the server's data directory")
+
+    args.data_dir = args.data_dir or tempfile.mkdtemp(prefix="loadtest-")
+    os.environ["DATA_DIR"] = args.data_dir
+    # Replies are generated in the /loop request only without Media Streams
+    os.environ["TWILIO_MEDIA_STREAMS"] = "false"
+    if not args.real and not args.url:
+        install_fakes(FakeLLM(args.llm_first_ms, args.llm_tps), FakeTTS(args.tts_rtf))
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
@@ -6,8 +7,12 @@ from app.twilio_routes import router as twilio_router
 from app.voice_routes import router as voice_router
 from app.tts_routes import router as tts_router
 from app.calls_routes import router as calls_router
+from app.campaign_routes import router as campaign_router
+from app.audio_routes import router as audio_router
 from app.settings import settings, STATIC_DIR
-from app.db import init_db
+from app.db import init_db, close_connections
+from app import audio_buffers, campaigns, metrics, model_backend, model_lifecycle, retention, sessions, summaries
+from app.telephony import close_clients as close_telephony_clients
 
 app = FastAPI(title=settings.app_name)
 
@@ -34,19 +39,65 @@ app.include_router(twilio_router, prefix="/twilio", tags=["twilio"])
 app.include_router(voice_router, prefix="/api/voices", tags=["voices"])
 app.include_router(tts_router, prefix="/api/tts", tags=["tts"])
 app.include_router(calls_router, prefix="/api/calls", tags=["calls"])
+app.include_router(campaign_router, prefix="/api/campaigns", tags=["campaigns"])
+app.include_router(audio_router, prefix="/audio", tags=["audio"])
 
 # ----------------------
 # DB
 # ----------------------
 init_db()
 
+
+@app.on_event("startup")
+def warm_models():
+    model_lifecycle.start()
+    summaries.start()
+    retention.start()
+
+
+@app.on_event("startup")
+async def resume_campaigns():
+    await campaigns.resume_all()
+
+
+@app.on_event("shutdown")
+async def close_twilio():
+    await campaigns.stop_all()
+    await close_telephony_clients()
+
+
+@app.on_event("shutdown")
+def close_db():
+    audio_buffers.flush()
+    sessions.flush()
+    close_connections()
+
+
 # ----------------------
-# Health endpoint (fast)
+# Health endpoint (fast): liveness, and readiness once models are warm
 # ----------------------
 @app.get("/healthz")
 def health():
     return {"ok": True}
 
+
+@app.get("/readyz")
+def ready():
+    status = model_lifecycle.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/model-workers")
+def model_workers():
+    if model_backend.client is None:
+        return {"mode": "in-process", "workers": []}
+    return {"mode": "remote", "workers": model_backend.client.status()}
+
 # ----------------------
 # Lazy-load Gradio UI (fast startup)
 # ----------------------
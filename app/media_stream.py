@@ -0,0 +1,170 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from twilio.twiml.voice_response import Connect, VoiceResponse
+
+from app.audio import MulawStreamEncoder
+from app import metrics, sessions
+from app.inference import InferenceBusy, stream_context_chat, tts_pool
+from app.model_backend import stream_synthesis
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FRAME_BYTES = 160  # 20 ms of 8 kHz mu-law
+MULAW_SILENCE = b"\xff"
+END_MARK = "utterance-end"
+
+
+def stream_url() -> str:
+    base = (settings.base_url or "").rstrip("/")
+    if base.startswith("https://"):
+        base = "wss://" + base[len("https://"):]
+    elif base.startswith("http://"):
+        base = "ws://" + base[len("http://"):]
+    return f"{base}/twilio/stream"
+
+
+def append_stream(vr: VoiceResponse, call_id: str, text: Optional[str] = None) -> None:
+    # Twilio holds the call on <Connect> until the socket closes, then moves on
+    # to the next verb, so the Gather that follows still runs after playback.
+    # Without text, the handler generates the assistant's reply itself.
+    connect = Connect()
+    stream = connect.stream(url=stream_url())
+    stream.parameter(name="call_id", value=call_id)
+    if text:
+        stream.parameter(name="text", value=text)
+    vr.append(connect)
+
+
+def _media_message(stream_sid: str, payload: bytes) -> str:
+    return json.dumps({
+        "event": "media",
+        "streamSid": stream_sid,
+        "media": {"payload": base64.b64encode(payload).decode("ascii")},
+    })
+
+
+async def _send_speech(websocket: WebSocket, stream_sid: str, text: str, session: sessions.CallSession) -> None:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    trace = metrics.current()
+
+    def produce():
+        encoder = None
+        started, audio_seconds = time.perf_counter(), 0.0
+        try:
+            for samples, rate in stream_synthesis(text, session.ref_wav_path, language="en"):
+                if encoder is None:
+                    encoder = MulawStreamEncoder(rate)
+                audio_seconds += len(samples) / rate
+                data = encoder.encode(samples)
+                if data:
+                    loop.call_soon_threadsafe(queue.put_nowait, data)
+            metrics.record_tts(time.perf_counter() - started, audio_seconds, trace)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    producer = asyncio.wrap_future(tts_pool.submit(produce))
+    buffer = b""
+    while True:
+        data = await queue.get()
+        if data is None:
+            break
+        buffer += data
+        if trace is not None:
+            trace.mark("first_audio")
+        while len(buffer) >= FRAME_BYTES:
+            await websocket.send_text(_media_message(stream_sid, buffer[:FRAME_BYTES]))
+            buffer = buffer[FRAME_BYTES:]
+    if buffer:
+        await websocket.send_text(_media_message(stream_sid, buffer.ljust(FRAME_BYTES, MULAW_SILENCE)))
+    await producer
+
+
+async def _send_reply(websocket: WebSocket, stream_sid: str, session: sessions.CallSession) -> None:
+    # Each sentence is voiced as soon as the LLM finishes it; the LLM keeps
+    # generating on its own worker while earlier sentences are synthesized.
+    spoken = []
+    try:
+        async for sentence in stream_context_chat(session.context, session_id=session.call_id):
+            spoken.append(sentence)
+            await _send_speech(websocket, stream_sid, sentence, session)
+    finally:
+        if spoken:
+            sessions.record_turn(session, "assistant", " ".join(spoken))
+
+
+async def _receive(websocket: WebSocket) -> Dict[str, Any]:
+    raw = await websocket.receive_text()
+    try:
+        msg = json.loads(raw)
+    except ValueError:
+        logger.warning("Ignoring malformed Media Streams message: %.100r", raw)
+        return {}
+    return msg if isinstance(msg, dict) else {}
+
+
+async def _speak(websocket: WebSocket, stream_sid: str, params: Dict[str, Any]) -> None:
+    session = await sessions.get_or_load(params.get("call_id") or "")
+    if not session or not session.ref_wav_path:
+        return
+    text = params.get("text") or ""
+    if text:
+        await _send_speech(websocket, stream_sid, text, session)
+        return
+    # A caller turn: timed until the last audio frame is sent
+    with metrics.turn(session.call_id, "stream") as trace:
+        try:
+            await _send_reply(websocket, stream_sid, session)
+        except InferenceBusy:
+            trace.outcome = "busy"
+            raise
+        except Exception:
+            trace.outcome = "error"
+            raise
+        finally:
+            sessions.record_metrics(trace.finish())
+
+
+async def handle_stream(websocket: WebSocket) -> None:
+    await websocket.accept()
+    try:
+        start = None
+        while start is None:
+            msg = await _receive(websocket)
+            if msg.get("event") == "start":
+                start = msg.get("start") or {}
+            elif msg.get("event") == "stop":
+                return
+
+        stream_sid = start.get("streamSid") or ""
+        try:
+            await _speak(websocket, stream_sid, start.get("customParameters") or {})
+        except InferenceBusy:
+            pass
+        except WebSocketDisconnect:
+            raise
+        except Exception:
+            # Whatever was sent still plays; the call moves on to its Gather
+            logger.exception("Streaming speech on %s failed", stream_sid)
+
+        # Twilio echoes the mark once everything queued before it has played.
+        await websocket.send_text(json.dumps({"event": "mark", "streamSid": stream_sid, "mark": {"name": END_MARK}}))
+        while True:
+            msg = await _receive(websocket)
+            if msg.get("event") == "stop":
+                return
+            if msg.get("event") == "mark" and (msg.get("mark") or {}).get("name") == END_MARK:
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if websocket.client_state == WebSocketState.CONNECTED and websocket.application_state == WebSocketState.CONNECTED:
+            await websocket.close()
@@ -0,0 +1,193 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus-style histograms kept in process and rendered in the text
+# exposition format by /metrics. With several app processes, each one
+# reports its own; scrape them individually.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            counts, total, n = self._series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value, n + 1)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._series.items())
+        for key, (counts, total, n) in series:
+            for bound, count in zip(self.buckets, counts):
+                le = f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{self._labels(key, le)} {n}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {total:.6f}")
+            lines.append(f"{self.name}_count{self._labels(key)} {n}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_registry: List[Histogram] = []
+
+TURN_SECONDS = Histogram("call_turn_seconds", "Time to answer a caller turn", ("mode", "outcome"))
+TURN_STAGE_SECONDS = Histogram("call_turn_stage_seconds", "Time spent per stage of a caller turn", ("mode", "stage"))
+LLM_TOKENS_PER_SECOND = Histogram(
+    "llm_tokens_per_second", "Tokens generated per second of LLM time", buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+)
+TTS_REAL_TIME_FACTOR = Histogram(
+    "tts_real_time_factor", "Synthesis time divided by audio duration", buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10)
+)
+QUEUE_WAIT_SECONDS = Histogram("inference_queue_wait_seconds", "Time work waited for an inference worker", ("pool",))
+DB_SECONDS = Histogram("db_call_seconds", "Time awaiting a database call, including executor queueing", ("op",))
+
+
+def render() -> str:
+    lines: List[str] = []
+    for histogram in _registry:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+# One caller turn. Stages timed with stage() are sequential parts of the
+# handler; llm/tts/queue/db entries added from deeper down are totals across
+# the turn and overlap them (sentences are synthesized while the LLM writes).
+class TurnTrace:
+    def __init__(self, call_id: str, mode: str):
+        self.call_id = call_id
+        self.mode = mode
+        # "busy" when the inference pools turned the turn away
+        self.outcome = "ok"
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.tokens = 0
+        self.llm_seconds = 0.0
+        self.tts_seconds = 0.0
+        self.audio_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_llm(self, tokens: int, seconds: float) -> None:
+        with self._lock:
+            self.tokens += tokens
+            self.llm_seconds += seconds
+        self.add("llm", seconds)
+
+    def add_tts(self, seconds: float, audio_seconds: float) -> None:
+        with self._lock:
+            self.tts_seconds += seconds
+            self.audio_seconds += audio_seconds
+        self.add("tts", seconds)
+
+    def mark(self, stage: str) -> None:
+        # Time from the start of the turn, recorded the first time only
+        with self._lock:
+            self.stages.setdefault(stage, time.perf_counter() - self.started)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def finish(self) -> Dict[str, Any]:
+        # Observes the turn's histograms and returns its turn_metrics row
+        total = time.perf_counter() - self.started
+        TURN_SECONDS.observe(total, mode=self.mode, outcome=self.outcome)
+        with self._lock:
+            stages = dict(self.stages)
+            tokens, llm_seconds = self.tokens, self.llm_seconds
+            tts_seconds, audio_seconds = self.tts_seconds, self.audio_seconds
+        for stage, seconds in stages.items():
+            TURN_STAGE_SECONDS.observe(seconds, mode=self.mode, stage=stage)
+        return {
+            "call_id": self.call_id,
+            "mode": self.mode,
+            "outcome": self.outcome,
+            "total_ms": round(total * 1000, 1),
+            "stages_ms": {k: round(v * 1000, 1) for k, v in stages.items()},
+            "tokens": tokens,
+            "tokens_per_second": round(tokens / llm_seconds, 2) if tokens and llm_seconds > 0 else None,
+            "tts_rtf": round(tts_seconds / audio_seconds, 3) if audio_seconds > 0 else None,
+        }
+
+
+_current: "contextvars.ContextVar[Optional[TurnTrace]]" = contextvars.ContextVar("turn_trace", default=None)
+
+
+def current() -> Optional[TurnTrace]:
+    return _current.get()
+
+
+@contextmanager
+def turn(call_id: str, mode: str) -> Iterator[TurnTrace]:
+    # Makes the trace visible to run_db and the inference pools for the rest
+    # of this task (and tasks it starts)
+    trace = TurnTrace(call_id, mode)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def record_llm(tokens: int, seconds: float, trace: Optional[TurnTrace] = None) -> None:
+    if tokens and seconds > 0:
+        LLM_TOKENS_PER_SECOND.observe(tokens / seconds)
+    trace = trace or current()
+    if trace is not None:
+        trace.add_llm(tokens, seconds)
+
+
+def record_tts(seconds: float, audio_seconds: float, trace: Optional[TurnTrace] = None) -> None:
+    if audio_seconds > 0:
+        TTS_REAL_TIME_FACTOR.observe(seconds / audio_seconds)
+    trace = trace or current()
+    if trace is not None:
+        trace.add_tts(seconds, audio_seconds)
+
+
+def record_queue_wait(pool: str, seconds: float, trace: Optional[TurnTrace] = None) -> None:
+    QUEUE_WAIT_SECONDS.observe(seconds, pool=pool)
+    if trace is not None:
+        trace.add(f"{pool}_queue", seconds)
+
+
+def record_db(op: str, seconds: float) -> None:
+    DB_SECONDS.observe(seconds, op=op)
+    trace = current()
+    if trace is not None:
+        trace.add("db", seconds)
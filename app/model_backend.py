@@ -0,0 +1,28 @@
+from typing import Any, Optional
+
+from app.settings import settings
+
+# With MODEL_WORKERS set the models live in app.model_server processes and
+# this process only holds RPC proxies; otherwise they are loaded in-process,
+# lazily on first use (see app.model_lifecycle for the startup warm-up).
+if settings.model_workers:
+    from app.model_client import ModelClient, RemoteLLM, RemoteTTS
+
+    client = ModelClient(settings.model_workers)
+    _llm = RemoteLLM(client)
+    _tts = RemoteTTS(client)
+    synthesize_to_wav = _tts.synthesize_to_wav
+    synthesize_cached = _tts.synthesize_cached
+    stream_synthesis = _tts.stream_synthesis
+    get_speaker_conditioning = _tts.get_speaker_conditioning
+    prepare_voice = _tts.prepare_voice
+
+    def get_llm() -> Any:
+        return _llm
+
+    def loaded_llm() -> Optional[Any]:
+        return _llm
+else:
+    client = None
+    from app.llm_engine import get_llm, loaded_llm
+    from app.tts_engine import get_speaker_conditioning, prepare_voice, stream_synthesis, synthesize_cached, synthesize_to_wav
@@ -0,0 +1,283 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+from multiprocessing.connection import Client, Connection
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+HEALTH_INTERVAL_SECONDS = 5.0
+HEALTH_TIMEOUT_SECONDS = 10.0
+# Workers unpickle whatever an authenticated peer sends, so the key is all
+# that stands between a reachable worker port and running code on it
+PLACEHOLDER_AUTHKEYS = ("change-me", "call-assistant-models")
+MIN_AUTHKEY_CHARS = 16
+
+
+class RemoteModelError(Exception):
+    pass
+
+
+def worker_authkey() -> bytes:
+    # Raises ValueError unless MODEL_WORKER_AUTHKEY is set to a real secret
+    key = settings.model_worker_authkey or ""
+    if key in PLACEHOLDER_AUTHKEYS or len(key) < MIN_AUTHKEY_CHARS:
+        raise ValueError(
+            f"MODEL_WORKER_AUTHKEY must be a random secret of at least {MIN_AUTHKEY_CHARS} characters, "
+            "e.g. python -c 'import secrets; print(secrets.token_hex(32))'"
+        )
+    return key.encode("utf-8")
+
+
+def _recv(conn: Connection, timeout: float) -> Any:
+    # A wedged worker must not hang the caller's thread forever
+    if not conn.poll(timeout):
+        raise TimeoutError(f"no reply within {timeout:.0f}s")
+    return conn.recv()
+
+
+def _parse_address(address: str) -> Any:
+    # host:port for TCP, anything else is a Unix socket path
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+class _Worker:
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.healthy = True
+        self.inflight = 0
+        self.last_error: Optional[str] = None
+        self._idle: "queue.LifoQueue[Connection]" = queue.LifoQueue()
+
+    def acquire(self) -> Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return Client(_parse_address(self.address), authkey=self.authkey)
+
+    def release(self, conn: Connection, reusable: bool) -> None:
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+
+# Talks to the processes started by app.model_server. Calls carrying a
+# route_key (a call's session id) stick to one worker so its KV cache for
+# that call is reused; everything else goes to the least busy healthy
+# worker, with affinity (e.g. the voice) only breaking ties.
+class ModelClient:
+    def __init__(self, addresses: List[str]):
+        authkey = worker_authkey()
+        self.workers = [_Worker(a, authkey) for a in addresses]
+        self._lock = threading.Lock()
+        # One health thread per worker, so a slow one can't delay the others' checks
+        for i, worker in enumerate(self.workers):
+            threading.Thread(target=self._health_loop, args=(worker,), name=f"model-health-{i}", daemon=True).start()
+
+    def _pick(self, route_key: Optional[str], affinity: Optional[str] = None, exclude: Tuple[_Worker, ...] = ()) -> _Worker:
+        with self._lock:
+            candidates = [w for w in self.workers if w.healthy and w not in exclude]
+            if not candidates:
+                candidates = [w for w in self.workers if w not in exclude] or self.workers
+            if route_key:
+                worker = candidates[zlib.crc32(route_key.encode("utf-8")) % len(candidates)]
+            else:
+                preferred = candidates[zlib.crc32(affinity.encode("utf-8")) % len(candidates)] if affinity else None
+                worker = min(candidates, key=lambda w: (w.inflight, w is not preferred))
+            worker.inflight += 1
+            return worker
+
+    def _done(self, worker: _Worker) -> None:
+        with self._lock:
+            worker.inflight -= 1
+
+    def _mark_down(self, worker: _Worker, exc: BaseException) -> None:
+        logger.warning("Model worker %s unavailable: %s", worker.address, exc)
+        worker.healthy = False
+        worker.last_error = str(exc)
+
+    def _connect(self, route_key: Optional[str], affinity: Optional[str]) -> Tuple[_Worker, Connection]:
+        # One retry on another worker if the first can't be reached
+        tried: Tuple[_Worker, ...] = ()
+        while True:
+            worker = self._pick(route_key, affinity, exclude=tried)
+            try:
+                return worker, worker.acquire()
+            except OSError as exc:
+                self._done(worker)
+                self._mark_down(worker, exc)
+                tried += (worker,)
+                if len(tried) >= min(2, len(self.workers)):
+                    raise RemoteModelError(f"No model worker reachable: {exc}") from exc
+
+    def call(
+        self, method: str, *args: Any, route_key: Optional[str] = None, affinity: Optional[str] = None, **kwargs: Any
+    ) -> Any:
+        worker, conn = self._connect(route_key, affinity)
+        reusable = False
+        try:
+            conn.send((method, args, kwargs))
+            status, value = _recv(conn, settings.model_worker_timeout_seconds)
+            reusable = True
+        except (EOFError, OSError) as exc:
+            self._mark_down(worker, exc)
+            raise RemoteModelError(f"Model worker {worker.address} failed: {exc or type(exc).__name__}") from exc
+        finally:
+            worker.release(conn, reusable)
+            self._done(worker)
+        if status == "error":
+            raise RemoteModelError(value)
+        return value
+
+    def stream(
+        self, method: str, *args: Any, route_key: Optional[str] = None, affinity: Optional[str] = None, **kwargs: Any
+    ) -> Iterator[Any]:
+        worker, conn = self._connect(route_key, affinity)
+        reusable = False
+        try:
+            conn.send((method, args, kwargs))
+            while True:
+                status, value = _recv(conn, settings.model_worker_timeout_seconds)
+                if status == "item":
+                    yield value
+                    continue
+                reusable = True
+                if status == "error":
+                    raise RemoteModelError(value)
+                return
+        except (EOFError, OSError) as exc:
+            self._mark_down(worker, exc)
+            raise RemoteModelError(f"Model worker {worker.address} failed: {exc or type(exc).__name__}") from exc
+        finally:
+            # A stream abandoned half way leaves replies in flight on the socket
+            worker.release(conn, reusable)
+            self._done(worker)
+
+    def ping(self, worker: _Worker) -> Dict[str, Any]:
+        conn = Client(_parse_address(worker.address), authkey=worker.authkey)
+        with conn:
+            conn.send(("ping", (), {}))
+            status, value = _recv(conn, HEALTH_TIMEOUT_SECONDS)
+        if status != "ok":
+            raise RemoteModelError(value)
+        return value
+
+    def _health_loop(self, worker: _Worker) -> None:
+        while True:
+            try:
+                self.ping(worker)
+                if not worker.healthy:
+                    logger.info("Model worker %s is back", worker.address)
+                worker.healthy = True
+                worker.last_error = None
+            except Exception as exc:
+                if worker.healthy:
+                    self._mark_down(worker, exc)
+            time.sleep(HEALTH_INTERVAL_SECONDS)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"address": w.address, "healthy": w.healthy, "inflight": w.inflight, "last_error": w.last_error}
+            for w in self.workers
+        ]
+
+
+# Same surface as LLMEngine, served by the model workers
+class RemoteLLM:
+    def __init__(self, client: ModelClient):
+        self.client = client
+        self._prompt_budget: Optional[int] = None
+
+    @property
+    def prompt_budget(self) -> int:
+        if self._prompt_budget is None:
+            self._prompt_budget = self.client.call("ping")["prompt_budget"]
+        return self._prompt_budget
+
+    def count_tokens(self, text: str) -> int:
+        return self.client.call("count_tokens", text)
+
+    def chat(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> str:
+        return self.client.call("chat", messages, session_id=session_id, route_key=session_id)
+
+    def stream_chat(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> Iterator[str]:
+        return self.client.stream("stream_chat", messages, session_id=session_id, route_key=session_id)
+
+    def summarize(self, transcript: str) -> str:
+        return self.client.call("summarize", transcript)
+
+    def update_summary(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        return self.client.call("update_summary", summary, turns)
+
+    def drop_session(self, session_id: str) -> None:
+        try:
+            self.client.call("drop_session", session_id, route_key=session_id)
+        except RemoteModelError:
+            pass
+
+
+# Speaker conditioning stays inside the workers (their voice store caches it
+# per reference file), so conditioning arguments are accepted and ignored.
+# Requests prefer the worker that already has the voice's conditioning, but
+# only when it is no busier than the others.
+class RemoteTTS:
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def synthesize_to_wav(
+        self,
+        text: str,
+        ref_wav_path: str,
+        language: str = "en",
+        conditioning: Any = None,
+        output_format: str = "preview",
+        write_behind: bool = False,
+    ) -> Tuple[str, str]:
+        # The worker's memory isn't reachable from here, so it always writes
+        # the file before replying (write_behind is ignored)
+        return tuple(
+            self.client.call(
+                "synthesize_to_wav", text, ref_wav_path, language=language, output_format=output_format, affinity=ref_wav_path
+            )
+        )
+
+    def synthesize_cached(
+        self,
+        text: str,
+        voice_name: str,
+        ref_wav_path: str,
+        language: str = "en",
+        conditioning: Any = None,
+        output_format: str = "preview",
+    ) -> Tuple[str, str]:
+        return tuple(
+            self.client.call(
+                "synthesize_cached",
+                text,
+                voice_name,
+                ref_wav_path,
+                language=language,
+                output_format=output_format,
+                affinity=ref_wav_path,
+            )
+        )
+
+    def stream_synthesis(self, text: str, ref_wav_path: str, language: str = "en", conditioning: Any = None) -> Iterator[Any]:
+        return self.client.stream("stream_synthesis", text, ref_wav_path, language=language, affinity=ref_wav_path)
+
+    def get_speaker_conditioning(self, ref_wav_path: str) -> None:
+        # Warm the worker this voice prefers; nothing to hand back
+        self.client.call("prepare_voice", ref_wav_path, affinity=ref_wav_path)
+        return None
+
+    def prepare_voice(self, ref_wav_path: str) -> bool:
+        return self.client.call("prepare_voice", ref_wav_path, affinity=ref_wav_path)
@@ -0,0 +1,82 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from app import model_backend
+from app.db import list_voices
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+WARMUP_TEXT = "Hello."
+
+_lock = threading.Lock()
+_models: Dict[str, Dict[str, Any]] = {name: {"state": PENDING} for name in ("llm", "tts")}
+_started = False
+
+
+def _warm_llm() -> None:
+    model_backend.get_llm().warm_up()
+
+
+def _warm_tts() -> None:
+    from app import tts_engine
+
+    tts_engine._load_tts()
+    # Precompute conditioning for recent voices and run one synthesis, so
+    # the first call after a deploy hits warm caches
+    voices = [v for v in list_voices() if os.path.exists(v["ref_wav_path"])]
+    for voice in voices[: settings.voice_cache_size]:
+        tts_engine.prepare_voice(voice["ref_wav_path"])
+    if voices:
+        out_path, _ = tts_engine.synthesize_to_wav(WARMUP_TEXT, voices[0]["ref_wav_path"])
+        os.remove(out_path)
+
+
+def _load(name: str, warm: Callable[[], None]) -> None:
+    entry = _models[name]
+    with _lock:
+        entry.update(state=LOADING, started_at=time.time())
+    t0 = time.perf_counter()
+    try:
+        warm()
+        state, error = READY, None
+    except Exception as exc:
+        logger.exception("Loading the %s model failed", name)
+        state, error = FAILED, f"{type(exc).__name__}: {exc}"
+    with _lock:
+        entry.update(state=state, error=error, load_seconds=round(time.perf_counter() - t0, 2))
+    logger.info("%s model %s in %.1fs", name.upper(), state, entry["load_seconds"])
+
+
+def start() -> None:
+    # Loads the LLM and TTS concurrently in the background; the app serves
+    # requests (with fallbacks) meanwhile.
+    global _started
+    with _lock:
+        if _started or model_backend.client is not None:
+            return
+        _started = True
+    for name, warm in (("llm", _warm_llm), ("tts", _warm_tts)):
+        threading.Thread(target=_load, args=(name, warm), name=f"warmup-{name}", daemon=True).start()
+
+
+def is_ready(name: str) -> bool:
+    if model_backend.client is not None:
+        return any(w["healthy"] for w in model_backend.client.status())
+    return _models[name]["state"] == READY
+
+
+def status() -> Dict[str, Any]:
+    if model_backend.client is not None:
+        workers = model_backend.client.status()
+        state = READY if any(w["healthy"] for w in workers) else FAILED
+        return {"ready": state == READY, "models": {name: {"state": state} for name in _models}, "workers": workers}
+    with _lock:
+        models = {name: dict(entry) for name, entry in _models.items()}
+    # Ready once nothing is still loading; a failed TTS leaves calls on <Say>
+    settled = all(m["state"] in (READY, FAILED) for m in models.values())
+    return {"ready": settled and models["llm"]["state"] == READY, "models": models}
@@ -0,0 +1,133 @@
+import argparse
+import importlib
+import logging
+import os
+import signal
+import sys
+import threading
+from multiprocessing.connection import Connection, Listener
+from typing import Any, Callable, Dict, List
+
+from app.model_client import worker_authkey
+
+logger = logging.getLogger(__name__)
+
+
+# Weights are loaded once in the parent and the workers are forked from it,
+# so the model pages (mmap'd from safetensors, then copy-on-write) are shared
+# by every worker instead of being duplicated per process.
+
+def _handlers() -> Dict[str, Callable[..., Any]]:
+    from app.llm_engine import get_llm
+    from app import tts_engine
+
+    llm = get_llm()
+
+    def info() -> Dict[str, Any]:
+        return {"pid": os.getpid(), "llm_ok": getattr(llm, "_ok", False), "prompt_budget": llm.prompt_budget}
+
+    return {
+        "ping": info,
+        "chat": llm.chat,
+        "summarize": llm.summarize,
+        "update_summary": llm.update_summary,
+        "count_tokens": llm.count_tokens,
+        "drop_session": llm.drop_session,
+        "synthesize_to_wav": tts_engine.synthesize_to_wav,
+        "synthesize_cached": tts_engine.synthesize_cached,
+        "prepare_voice": tts_engine.prepare_voice,
+    }
+
+
+def _stream_handlers() -> Dict[str, Callable[..., Any]]:
+    from app.llm_engine import get_llm
+    from app import tts_engine
+
+    llm = get_llm()
+    return {"stream_chat": llm.stream_chat, "stream_synthesis": tts_engine.stream_synthesis}
+
+
+def _serve_connection(conn: Connection, handlers: Dict[str, Callable[..., Any]], streams: Dict[str, Callable[..., Any]]) -> None:
+    with conn:
+        while True:
+            try:
+                method, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if method in streams:
+                    for item in streams[method](*args, **kwargs):
+                        conn.send(("item", item))
+                    conn.send(("end", None))
+                elif method in handlers:
+                    conn.send(("ok", handlers[method](*args, **kwargs)))
+                else:
+                    conn.send(("error", f"Unknown method {method!r}"))
+            except (EOFError, OSError):
+                return
+            except Exception as exc:
+                logger.exception("Model worker call %s failed", method)
+                conn.send(("error", f"{type(exc).__name__}: {exc}"))
+
+
+def serve(address: Any, threads: int) -> None:
+    if threads > 0:
+        try:
+            importlib.import_module("torch").set_num_threads(threads)
+        except Exception:
+            pass
+    handlers, streams = _handlers(), _stream_handlers()
+    with Listener(address, authkey=worker_authkey()) as listener:
+        logger.info("Model worker %s listening on %s", os.getpid(), address)
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_serve_connection, args=(conn, handlers, streams), daemon=True).start()
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run model worker processes sharing one copy of the weights.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=7901)
+    parser.add_argument("--preload-tts", action="store_true", help="Load XTTS before forking so workers share it too")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        worker_authkey()
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    # Load everything before forking; workers inherit the loaded weights.
+    from app.llm_engine import get_llm
+    get_llm().warm_up()
+    if args.preload_tts:
+        from app.tts_engine import _load_tts
+        _load_tts()
+
+    threads = max(1, (os.cpu_count() or 1) // max(1, args.workers))
+    children = []
+    for i in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            serve((args.host, args.base_port + i), threads)
+            os._exit(0)
+        children.append(pid)
+    addresses = ",".join(f"{args.host}:{args.base_port + i}" for i in range(args.workers))
+    logger.info("Started %d model workers; set MODEL_WORKERS=%s", len(children), addresses)
+
+    def stop(signum, _frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import fcntl
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from app import audio_cache
+from app.db import delete_voice, get_voice, set_transcript_audio_paths, transcript_audio_owners
+from app.settings import AUDIO_OUT_DIR, VOICES_DIR, settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.path.join(AUDIO_OUT_DIR, "archive")
+LOCK_PATH = os.path.join(AUDIO_OUT_DIR, ".retention.lock")
+# Files younger than this are never touched; Twilio may still be fetching them
+MIN_AGE_SECONDS = 15 * 60
+
+_sweep_lock = threading.Lock()
+_last_sweep: Dict[str, Any] = {}
+_thread = None
+
+
+def _loose_audio_files() -> List[Tuple[str, int, float]]:
+    # (path, size, mtime) of per-turn audio; the TTS cache and archives are
+    # managed separately
+    files = []
+    for entry in os.scandir(AUDIO_OUT_DIR):
+        if entry.is_file() and entry.name.endswith(".wav"):
+            st = entry.stat()
+            files.append((entry.path, st.st_size, st.st_mtime))
+    return files
+
+
+def _dir_usage(path: str) -> Tuple[int, int]:
+    count = total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+                count += 1
+            except OSError:
+                pass
+    return count, total
+
+
+def _expired(files: List[Tuple[str, int, float]], now: float) -> List[str]:
+    # Past the age limit, then oldest first until under the size quota
+    max_age = settings.audio_retention_days * 86400
+    quota = settings.audio_max_mb * 1024 * 1024
+    chosen, remaining = [], sum(size for _, size, _ in files)
+    for path, size, mtime in sorted(files, key=lambda f: f[2]):
+        age = now - mtime
+        if age < MIN_AGE_SECONDS:
+            break
+        if (max_age > 0 and age > max_age) or remaining > quota:
+            chosen.append(path)
+            remaining -= size
+    return chosen
+
+
+def _archive(call_id: str, rows: List[Tuple[int, str]]) -> List[Tuple[str, int]]:
+    # Appends a call's files to archive/<call_id>.zip; transcript rows then
+    # point at "<zip>#<member>"
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    zip_path = os.path.join(ARCHIVE_DIR, f"{call_id}.zip")
+    updates = []
+    with zipfile.ZipFile(zip_path, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+        existing = set(zf.namelist())
+        for row_id, path in rows:
+            member = os.path.basename(path)
+            if member not in existing:
+                zf.write(path, member)
+                existing.add(member)
+            updates.append((f"{zip_path}#{member}", row_id))
+    return updates
+
+
+@contextmanager
+def _exclusive() -> Iterator[None]:
+    # _sweep_lock covers this process's threads; the file lock covers the
+    # other app processes sharing the data dir, which would otherwise append
+    # to the same per-call zips at once
+    with _sweep_lock, open(LOCK_PATH, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def sweep() -> Dict[str, Any]:
+    with _exclusive():
+        started = time.time()
+        expired = _expired(_loose_audio_files(), started)
+        owners = transcript_audio_owners(expired)
+        by_call: Dict[str, List[Tuple[int, str]]] = {}
+        for path in expired:
+            for row_id, call_id in owners.get(path, []):
+                by_call.setdefault(call_id, []).append((row_id, path))
+
+        archived, keep = set(), set()
+        for call_id, rows in by_call.items():
+            if not settings.audio_archive:
+                set_transcript_audio_paths([(None, row_id) for row_id, _ in rows])
+                continue
+            try:
+                updates = _archive(call_id, rows)
+            except (OSError, zipfile.BadZipFile):
+                logger.exception("Archiving audio for call %s failed", call_id)
+                keep.update(path for _, path in rows)
+                continue
+            set_transcript_audio_paths(updates)
+            archived.update(path for _, path in rows)
+
+        deleted = freed = 0
+        for path in expired:
+            if path in keep:
+                continue
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+                deleted += 1
+            except OSError:
+                pass
+
+        _last_sweep.clear()
+        _last_sweep.update(
+            at=started,
+            seconds=round(time.time() - started, 3),
+            expired=len(expired),
+            archived=len(archived),
+            removed=deleted,
+            bytes_freed=freed,
+        )
+        return dict(_last_sweep)
+
+
+def disk_usage() -> Dict[str, Any]:
+    files = _loose_audio_files()
+    archive_files, archive_bytes = _dir_usage(ARCHIVE_DIR) if os.path.isdir(ARCHIVE_DIR) else (0, 0)
+    cache = audio_cache.stats()
+    return {
+        "audio_files": len(files),
+        "audio_bytes": sum(size for _, size, _ in files),
+        "audio_quota_bytes": settings.audio_max_mb * 1024 * 1024,
+        "archive_files": archive_files,
+        "archive_bytes": archive_bytes,
+        "cache_files": cache["entries"],
+        "cache_bytes": cache["bytes"],
+        "last_sweep": dict(_last_sweep) or None,
+    }
+
+
+def _loop() -> None:
+    while True:
+        try:
+            sweep()
+        except Exception:
+            logger.exception("Audio retention sweep failed")
+        time.sleep(max(60, settings.audio_sweep_seconds))
+
+
+def start() -> None:
+    global _thread
+    if _thread is None:
+        _thread = threading.Thread(target=_loop, name="audio-retention", daemon=True)
+        _thread.start()
+
+
+def remove_voice(name: str) -> bool:
+    # Shared by the API and the UI: drops the voice row, its cached
+    # conditioning and its reference files. Returns False if there was no such voice.
+    if get_voice(name) is None:
+        return False
+    delete_voice(name)
+    shutil.rmtree(os.path.join(VOICES_DIR, name), ignore_errors=True)
+    return True
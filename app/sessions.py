@@ -0,0 +1,172 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.db import append_transcript, get_call, get_transcript, get_voice, insert_turn_metrics, run_db
+from app.llm_context import CALL_SYSTEM_PROMPT, ConversationContext
+from app.model_backend import loaded_llm
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CallSession:
+    call_id: str
+    voice_name: Optional[str] = None
+    ref_wav_path: Optional[str] = None
+    initial_message: Optional[str] = None
+    context: ConversationContext = field(
+        default_factory=lambda: ConversationContext(CALL_SYSTEM_PROMPT, settings.call_context_tokens)
+    )
+    ended_at: Optional[float] = None
+    last_access: float = field(default_factory=time.monotonic)
+
+
+_sessions: Dict[str, CallSession] = {}
+_sessions_lock = threading.Lock()
+
+
+# Transcript rows are persisted by a single background writer so the call
+# loop never waits on SQLite; order is preserved because the queue is FIFO.
+class _WriteBehind:
+    def __init__(self):
+        self._queue: "queue.Queue[Callable[[], None]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                job()
+            except Exception:
+                logger.exception("Write-behind job failed")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn: Callable[..., None], *args: Any, **kwargs: Any) -> None:
+        self._ensure_started()
+        self._queue.put(lambda: fn(*args, **kwargs))
+
+    def flush(self) -> None:
+        self._queue.join()
+
+
+_writer = _WriteBehind()
+
+
+def _evict_expired(now: float) -> None:
+    with _sessions_lock:
+        for call_id, session in list(_sessions.items()):
+            if session.ended_at is not None and now - session.ended_at > settings.session_ttl_seconds:
+                del _sessions[call_id]
+            elif now - session.last_access > settings.session_idle_ttl_seconds:
+                del _sessions[call_id]
+
+
+def _register(session: CallSession) -> CallSession:
+    _evict_expired(time.monotonic())
+    with _sessions_lock:
+        _sessions[session.call_id] = session
+    return session
+
+
+def start(call_id: str, voice: Optional[Dict[str, Any]], initial_message: Optional[str]) -> CallSession:
+    return _register(CallSession(
+        call_id=call_id,
+        voice_name=voice["name"] if voice else None,
+        ref_wav_path=voice["ref_wav_path"] if voice else None,
+        initial_message=initial_message,
+    ))
+
+
+def get(call_id: str) -> Optional[CallSession]:
+    with _sessions_lock:
+        session = _sessions.get(call_id)
+    if session is not None:
+        session.last_access = time.monotonic()
+    return session
+
+
+def load(call_id: str) -> Optional[CallSession]:
+    # Rebuilds a session from the database, e.g. after a restart or when the
+    # call was started by another worker process.
+    session = get(call_id)
+    if session is not None:
+        return session
+    call = get_call(call_id)
+    if not call:
+        return None
+    voice = get_voice(call["voice_name"]) if call["voice_name"] else None
+    session = CallSession(
+        call_id=call_id,
+        voice_name=call["voice_name"],
+        ref_wav_path=voice["ref_wav_path"] if voice else None,
+        initial_message=call["initial_message"],
+    )
+    for role, text in transcript_turns(get_transcript(call_id)):
+        session.context.add(role, text)
+    with _sessions_lock:
+        return _sessions.setdefault(call_id, session)
+
+
+def transcript_turns(rows: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    # (role, text) per turn, joining a reply's segment rows back together
+    turns: List[Tuple[str, str]] = []
+    for t in rows:
+        if t.get("segment") and turns and turns[-1][0] == t["role"]:
+            turns[-1] = (t["role"], f"{turns[-1][1]} {t['text']}")
+        else:
+            turns.append((t["role"], t["text"]))
+    return turns
+
+
+async def get_or_load(call_id: str) -> Optional[CallSession]:
+    return get(call_id) or await run_db(load, call_id)
+
+
+def record_turn(
+    session: CallSession,
+    role: str,
+    text: str,
+    audio_path: Optional[str] = None,
+    segments: Optional[List[Tuple[str, Optional[str]]]] = None,
+) -> None:
+    # A turn played as several audio segments is one message in the LLM
+    # context but one transcript row per segment, so each keeps its audio.
+    session.context.add(role, text)
+    session.last_access = time.monotonic()
+    for i, (segment_text, segment_audio) in enumerate(segments or [(text, audio_path)]):
+        _writer.submit(append_transcript, session.call_id, role, segment_text, audio_path=segment_audio, segment=i)
+
+
+def record_metrics(row: Dict[str, Any]) -> None:
+    # Per-turn timings from metrics.TurnTrace.finish(), written behind like transcripts
+    _writer.submit(insert_turn_metrics, row)
+
+
+async def end(call_id: str) -> None:
+    session = get(call_id)
+    if session is not None:
+        session.ended_at = time.monotonic()
+    _evict_expired(time.monotonic())
+    llm = loaded_llm()
+    if llm is not None:
+        # With model workers this is a socket round trip; keep it off the loop
+        await run_in_threadpool(llm.drop_session, call_id)
+
+
+def flush() -> None:
+    _writer.flush()
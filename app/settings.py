@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,6 +12,21 @@ def get_env(name: str, default: str | None = None) -> str | None:
     return default
 
 
+def get_int_env(name: str, default: int) -> int:
+    return int(get_env(name, str(default)) or default)
+
+
+def get_float_env(name: str, default: float) -> float:
+    return float(get_env(name, str(default)) or default)
+
+
+def get_bool_env(name: str, default: bool = False) -> bool:
+    value = get_env(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 @dataclass
 class Settings:
     app_name: str = get_env("APP_NAME", "MultiVoiceCallAssistant") or "MultiVoiceCallAssistant"
@@ -21,10 +36,84 @@ class Settings:
     twilio_account_sid: str | None = get_env("TWILIO_ACCOUNT_SID")
     twilio_auth_token: str | None = get_env("TWILIO_AUTH_TOKEN")
     twilio_phone_number: str | None = get_env("TWILIO_PHONE_NUMBER")
+    # REST API root (point at a local fake for testing) and retries for 429/503/connect errors
+    twilio_api_base: str = get_env("TWILIO_API_BASE", "https://api.twilio.com") or "https://api.twilio.com"
+    twilio_max_retries: int = get_int_env("TWILIO_MAX_RETRIES", 3)
 
     # Public base URL for Twilio to fetch TwiML and media
     base_url: str | None = get_env("BASE_URL")
 
+    # Stream assistant speech over Twilio Media Streams instead of <Play>-ing a WAV
+    twilio_media_streams: bool = get_bool_env("TWILIO_MEDIA_STREAMS")
+
+    # Inference worker pools; requests beyond workers + queue are rejected fast
+    llm_workers: int = get_int_env("LLM_WORKERS", 1)
+    tts_workers: int = get_int_env("TTS_WORKERS", 1)
+    inference_max_queue: int = get_int_env("INFERENCE_MAX_QUEUE", 8)
+
+    # SQLite: threads serving async routes, page cache per connection (KiB)
+    db_workers: int = get_int_env("DB_WORKERS", 4)
+    db_cache_kb: int = get_int_env("DB_CACHE_KB", 16384)
+
+    # LLM context window, and the share of it a call's prompt may use
+    llm_context_tokens: int = get_int_env("LLM_CONTEXT_TOKENS", 2048)
+    call_context_tokens: int = get_int_env("CALL_CONTEXT_TOKENS", 1024)
+    # LLM weights: fp32, int8 (dynamic quantization) or onnx (ONNX Runtime)
+    llm_backend: str = (get_env("LLM_BACKEND", "fp32") or "fp32").lower()
+    # Post-call summaries: transcripts longer than this are summarized in chunks
+    summary_chunk_tokens: int = get_int_env("SUMMARY_CHUNK_TOKENS", 1200)
+    # Summary steps wait this long for the LLM to go idle before taking a turn
+    # anyway; jobs with no progress for SUMMARY_STALE_SECONDS are requeued
+    summary_idle_wait_seconds: float = get_float_env("SUMMARY_IDLE_WAIT_SECONDS", 30.0)
+    summary_stale_seconds: int = get_int_env("SUMMARY_STALE_SECONDS", 900)
+    # Memory cap for per-call KV caches reused across turns
+    llm_kv_cache_mb: int = get_int_env("LLM_KV_CACHE_MB", 512)
+
+    # Per-call session cache: kept this long after hangup, or after the last turn
+    session_ttl_seconds: int = get_int_env("SESSION_TTL_SECONDS", 60)
+    session_idle_ttl_seconds: int = get_int_env("SESSION_IDLE_TTL_SECONDS", 7200)
+
+    # How long /twilio/answer waits for a greeting still rendering before <Say>
+    greeting_wait_ms: int = get_int_env("GREETING_WAIT_MS", 2500)
+
+    # Disk budget for cached greeting/preview audio
+    tts_cache_max_mb: int = get_int_env("TTS_CACHE_MAX_MB", 256)
+
+    # Per-turn call audio: kept this many days and within this total size,
+    # then packed into per-call zip archives (or deleted if archiving is off)
+    audio_retention_days: int = get_int_env("AUDIO_RETENTION_DAYS", 7)
+    audio_max_mb: int = get_int_env("AUDIO_MAX_MB", 2048)
+    audio_archive: bool = get_bool_env("AUDIO_ARCHIVE", True)
+    audio_sweep_seconds: int = get_int_env("AUDIO_SWEEP_SECONDS", 3600)
+
+    # Memory for recent reply audio served by /audio while it's written to disk
+    audio_buffer_mb: int = get_int_env("AUDIO_BUFFER_MB", 64)
+
+    # Voice training: upload size cap, and length of the clip conditioning uses
+    voice_upload_max_mb: int = get_int_env("VOICE_UPLOAD_MAX_MB", 50)
+    voice_clip_seconds: float = get_float_env("VOICE_CLIP_SECONDS", 12.0)
+
+    # Number of voices whose speaker conditioning is kept in memory
+    voice_cache_size: int = get_int_env("VOICE_CACHE_SIZE", 32)
+
+    # Campaign dialer defaults: new calls started per second, and calls live at once
+    campaign_cps: float = get_float_env("CAMPAIGN_CPS", 1.0)
+    campaign_max_concurrent: int = get_int_env("CAMPAIGN_MAX_CONCURRENT", 5)
+
+    # Campaign rows stuck 'dialing' / live this long are failed to free their slot
+    campaign_dial_timeout_seconds: int = get_int_env("CAMPAIGN_DIAL_TIMEOUT_SECONDS", 300)
+    campaign_call_timeout_seconds: int = get_int_env("CAMPAIGN_CALL_TIMEOUT_SECONDS", 14400)
+
+    # Model worker processes (python -m app.model_server), comma separated
+    # host:port or socket paths; empty loads the models in this process
+    model_workers: list[str] = field(
+        default_factory=lambda: [a.strip() for a in (get_env("MODEL_WORKERS", "") or "").split(",") if a.strip()]
+    )
+    # Shared secret for the workers' RPC; required with MODEL_WORKERS
+    model_worker_authkey: str | None = get_env("MODEL_WORKER_AUTHKEY")
+    # A worker silent this long on a request (or between streamed items) is marked down
+    model_worker_timeout_seconds: float = get_float_env("MODEL_WORKER_TIMEOUT_SECONDS", 120.0)
+
 
 settings = Settings()
 
@@ -32,8 +121,9 @@ settings = Settings()
 STATIC_DIR = os.path.join(settings.data_dir, "static")
 VOICES_DIR = os.path.join(settings.data_dir, "voices")
 AUDIO_OUT_DIR = os.path.join(STATIC_DIR, "audio")
+TTS_CACHE_DIR = os.path.join(AUDIO_OUT_DIR, "cache")
 TRANSCRIPTS_DIR = os.path.join(settings.data_dir, "transcripts")
 DB_PATH = os.path.join(settings.data_dir, "app.db")
 
-for d in [settings.data_dir, STATIC_DIR, VOICES_DIR, AUDIO_OUT_DIR, TRANSCRIPTS_DIR]:
+for d in [settings.data_dir, STATIC_DIR, VOICES_DIR, AUDIO_OUT_DIR, TTS_CACHE_DIR, TRANSCRIPTS_DIR]:
     os.makedirs(d, exist_ok=True)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from app import model_lifecycle, sessions
+from app.db import (
+    claim_summary_job,
+    finish_summary_job,
+    get_transcript,
+    release_summary_job,
+    requeue_stale_summary_jobs,
+    touch_summary_job,
+)
+from app.inference import InferenceBusy, llm_pool
+from app.model_backend import get_llm
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+BUSY_BACKOFF_SECONDS = 2.0
+ERROR_BACKOFF_SECONDS = 10.0
+# Room left in the prompt for the summarization instructions
+PROMPT_OVERHEAD_TOKENS = 64
+
+_wake = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _llm_step(fn, *args):
+    # Each map/reduce step goes through the shared LLM pool at low priority,
+    # so live calls get the model between steps.
+    return llm_pool.submit_when_idle(settings.summary_idle_wait_seconds, fn, *args).result()
+
+
+def _summarize(text: str) -> str:
+    return get_llm().summarize(text)
+
+
+def _chunks(lines: List[str], budget: int) -> List[str]:
+    llm = get_llm()
+    chunks, current, used = [], [], 0
+    for line in lines:
+        n = llm.count_tokens(line) + 1
+        if current and used + n > budget:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += n
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def summarize_transcript(lines: List[str], on_step: Optional[Callable[[], None]] = None) -> str:
+    # Map-reduce: summarize chunks that fit the context window, then
+    # summarize the summaries until one chunk is left. on_step runs after
+    # every LLM step.
+    if not lines:
+        return ""
+    budget = max(128, min(settings.summary_chunk_tokens, get_llm().prompt_budget - PROMPT_OVERHEAD_TOKENS))
+    chunks = _chunks(lines, budget)
+    while True:
+        summaries = []
+        for chunk in chunks:
+            summaries.append(_llm_step(_summarize, chunk))
+            if on_step is not None:
+                on_step()
+        if len(summaries) == 1:
+            return summaries[0]
+        merged = _chunks(summaries, budget)
+        if len(merged) >= len(chunks):
+            # Summaries aren't getting shorter; settle for the first pass
+            return "\n".join(summaries)
+        chunks = merged
+
+
+def _run_job(job) -> None:
+    try:
+        # Transcript rows are written behind; make sure this call's are in
+        sessions.flush()
+        lines = [f"{role}: {text}" for role, text in sessions.transcript_turns(get_transcript(job["call_id"]))]
+        summary = summarize_transcript(lines, on_step=lambda: touch_summary_job(job["id"]))
+        finish_summary_job(job["id"], job["call_id"], summary)
+    except InferenceBusy as exc:
+        release_summary_job(job["id"], job["call_id"], str(exc), failed=False, count_attempt=False)
+        time.sleep(BUSY_BACKOFF_SECONDS)
+    except Exception as exc:
+        logger.exception("Summarizing call %s failed", job["call_id"])
+        release_summary_job(job["id"], job["call_id"], f"{type(exc).__name__}: {exc}", failed=job["attempts"] >= MAX_ATTEMPTS)
+
+
+def _loop() -> None:
+    requeued_at = 0.0
+    while True:
+        if not model_lifecycle.is_ready("llm"):
+            time.sleep(BUSY_BACKOFF_SECONDS)
+            continue
+        try:
+            # Jobs a dead worker (this process before a restart, or another
+            # one) left running
+            if time.monotonic() - requeued_at >= settings.summary_stale_seconds / 2:
+                requeued_at = time.monotonic()
+                requeue_stale_summary_jobs(settings.summary_stale_seconds)
+            job = claim_summary_job()
+        except Exception:
+            logger.exception("Claiming a summary job failed")
+            job = None
+        if job is None:
+            _wake.wait(timeout=30.0)
+            _wake.clear()
+            continue
+        try:
+            _run_job(job)
+        except Exception:
+            # Releasing the job failed too (e.g. database locked); it is
+            # requeued once stale
+            logger.exception("Summary job %s for call %s was left running", job["id"], job["call_id"])
+            time.sleep(ERROR_BACKOFF_SECONDS)
+
+
+def start() -> None:
+    global _thread
+    with _thread_lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, name="summary-worker", daemon=True)
+        _thread.start()
+
+
+def notify() -> None:
+    _wake.set()
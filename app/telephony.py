@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import random
+import uuid
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app import greetings, sessions
+from app.db import create_call, get_voice, run_db, update_call_status
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 503)
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+
+class TwilioError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Async Twilio REST client over one pooled keep-alive httpx connection, so
+# dialing doesn't block the event loop or pay for a TLS handshake per call.
+# transport replaces the network, e.g. an httpx.MockTransport standing in
+# for Twilio.
+class TwilioRestClient:
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        api_base: str,
+        max_retries: int,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.account_sid = account_sid
+        self.max_retries = max(0, max_retries)
+        self.http = httpx.AsyncClient(
+            base_url=api_base.rstrip("/"),
+            auth=(account_sid, auth_token),
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            transport=transport,
+        )
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(BACKOFF_MAX_SECONDS, float(retry_after))
+        return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _post(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Creating a call isn't idempotent, so only retry when Twilio can't
+        # have acted on the request: the connection never opened, or it
+        # answered 429/503.
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await self.http.post(path, data=data)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as exc:
+                if attempt == self.max_retries:
+                    raise TwilioError(f"Could not reach Twilio: {exc}") from exc
+            except httpx.HTTPError as exc:
+                raise TwilioError(f"Twilio request failed: {exc}") from exc
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    try:
+                        message = response.json().get("message") or response.text
+                    except ValueError:
+                        message = response.text
+                    raise TwilioError(message, status_code=response.status_code)
+            delay = self._backoff(attempt, response)
+            logger.warning("Twilio request to %s failed, retrying in %.1fs", path, delay)
+            await asyncio.sleep(delay)
+        raise TwilioError("Twilio request failed")
+
+    async def create_call(self, to: str, from_: str, url: str, status_callback: str, status_callback_event: List[str]) -> Dict[str, Any]:
+        data = {
+            "To": to,
+            "From": from_,
+            "Url": url,
+            "Method": "POST",
+            "StatusCallback": status_callback,
+            "StatusCallbackEvent": status_callback_event,
+        }
+        return await self._post(f"/2010-04-01/Accounts/{self.account_sid}/Calls.json", data)
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+# httpx clients are bound to the loop they were first used on; the API and
+# the Gradio UI may run callbacks on different loops.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TwilioRestClient]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> TwilioRestClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = TwilioRestClient(
+            settings.twilio_account_sid or "",
+            settings.twilio_auth_token or "",
+            settings.twilio_api_base,
+            settings.twilio_max_retries,
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_clients() -> None:
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+async def dial(to_number: str, voice_name: str, initial_message: Optional[str]) -> Tuple[str, str]:
+    # Shared by the REST API and the UI: records the call, opens its session
+    # and asks Twilio to place it. Returns (call_id, Twilio call sid).
+    call_id = uuid.uuid4().hex
+    await run_db(create_call, call_id, to_number, voice_name, initial_message)
+    voice = await run_db(get_voice, voice_name)
+    sessions.start(call_id, voice, initial_message)
+    # Render the greeting while Twilio is still ringing the callee
+    greetings.start(call_id, initial_message, voice)
+    try:
+        call = await get_client().create_call(
+            to=to_number,
+            from_=settings.twilio_phone_number or "",
+            url=f"{settings.base_url}/twilio/answer?call_id={call_id}",
+            status_callback=f"{settings.base_url}/twilio/status?call_id={call_id}",
+            status_callback_event=["completed"],
+        )
+    except TwilioError:
+        await sessions.end(call_id)
+        await run_db(update_call_status, call_id, "failed")
+        raise
+    return call_id, call.get("sid", "")
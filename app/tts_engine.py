@@ -1,13 +1,27 @@
 import importlib
+import importlib.metadata
 import threading
-from typing import Tuple
+from typing import Dict, Iterator, Optional, Tuple
 
+import numpy as np
+import soundfile as sf
+
+from app import audio_buffers, audio_cache, voice_store
+from app.audio import encode_audio, transcode, write_audio
 from app.settings import settings
-from app.utils import new_audio_file
+from app.tts_scheduler import SynthesisRequest, TTSScheduler
+from app.utils import buffered_audio_url, new_audio_file
+
 
+TTS_MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+PREVIEW_TEXT = "This is a preview of the cloned voice."
 
 _tts_lock = threading.Lock()
+# One XTTS instance isn't safe to drive from several threads: every model
+# call (scheduled requests, streaming, conditioning, tts_to_file) holds this.
+_model_lock = threading.Lock()
 _tts_model = None
+_scheduler: Optional[TTSScheduler] = None
 
 
 def _load_tts():
@@ -16,12 +30,152 @@ def _load_tts():
         with _tts_lock:
             if _tts_model is None:
                 TTS = importlib.import_module("TTS.api").TTS
-                _tts_model = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2")
+                _tts_model = TTS(model_name=TTS_MODEL_NAME)
     return _tts_model
 
 
-def synthesize_to_wav(text: str, ref_wav_path: str, language: str = "en") -> Tuple[str, str]:
+def model_version() -> str:
+    try:
+        return f"{TTS_MODEL_NAME}@{importlib.metadata.version('TTS')}"
+    except Exception:
+        return TTS_MODEL_NAME
+
+
+def _xtts_model(tts):
+    # The underlying Xtts model exposes conditioning/inference separately; other
+    # models only support the one-shot tts_to_file path.
+    model = getattr(getattr(tts, "synthesizer", None), "tts_model", None)
+    if model is None or not hasattr(model, "get_conditioning_latents"):
+        return None
+    return model
+
+
+def get_speaker_conditioning(ref_wav_path: str) -> Optional[voice_store.Conditioning]:
+    conditioning = voice_store.get(ref_wav_path)
+    if conditioning is not None:
+        return conditioning
+    model = _xtts_model(_load_tts())
+    if model is None:
+        return None
+    clip = voice_store.conditioning_audio(ref_wav_path)
+    with _model_lock:
+        gpt_cond_latent, speaker_embedding = model.get_conditioning_latents(audio_path=[clip])
+    return voice_store.put(ref_wav_path, gpt_cond_latent, speaker_embedding)
+
+
+def prepare_voice(ref_wav_path: str) -> bool:
+    # Called when a voice is saved so the first synthesis doesn't pay for the
+    # speaker encoder. Training must still succeed when TTS isn't installed.
+    try:
+        return get_speaker_conditioning(ref_wav_path) is not None
+    except Exception:
+        return False
+
+
+def _run_one(request: SynthesisRequest) -> np.ndarray:
+    # Xtts has no padded multi-utterance inference API, so requests aren't
+    # batched: each runs alone on the scheduler thread, under the model lock.
+    tts = _load_tts()
+    model = _xtts_model(tts)
+    torch = importlib.import_module("torch")
+    gpt_cond_latent, speaker_embedding = request.conditioning
+    chunks = []
+    with torch.inference_mode():
+        for sentence in tts.synthesizer.split_into_sentences(request.text):
+            with _model_lock:
+                out = model.inference(sentence, request.language, gpt_cond_latent, speaker_embedding)
+            chunks.append(np.asarray(out["wav"], dtype=np.float32).reshape(-1))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+
+def _get_scheduler() -> TTSScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _tts_lock:
+            if _scheduler is None:
+                _scheduler = TTSScheduler(_run_one)
+    return _scheduler
+
+
+def scheduler_stats() -> Dict[str, float]:
+    return _scheduler.stats() if _scheduler is not None else {}
+
+
+def synthesize_to_wav(
+    text: str,
+    ref_wav_path: str,
+    language: str = "en",
+    conditioning: Optional[voice_store.Conditioning] = None,
+    output_format: str = "preview",
+    write_behind: bool = False,
+) -> Tuple[str, str]:
+    # output_format: "telephony" for audio played to callers, "preview" for the UI.
+    # write_behind: serve the result from memory under /audio and write the
+    # file asynchronously; only for callers that fetch it over HTTP.
     tts = _load_tts()
     out_path, rel_url = new_audio_file(stem="tts")
-    tts.tts_to_file(text=text, file_path=out_path, speaker_wav=ref_wav_path, language=language)
-    return out_path, rel_url
\ No newline at end of file
+    model = _xtts_model(tts)
+    if model is not None and conditioning is None:
+        conditioning = get_speaker_conditioning(ref_wav_path)
+    if conditioning is None:
+        speaker_wav = voice_store.conditioning_audio(ref_wav_path)
+        with _model_lock:
+            tts.tts_to_file(text=text, file_path=out_path, speaker_wav=speaker_wav, language=language)
+        if output_format != "preview":
+            transcode(out_path, output_format)
+        return out_path, rel_url
+
+    wav = _get_scheduler().submit(text, language, conditioning).result()
+    rate = model.config.audio.output_sample_rate
+    if write_behind:
+        audio_buffers.publish(out_path, encode_audio(wav, rate, output_format), len(wav) / rate)
+        return out_path, buffered_audio_url(out_path)
+    write_audio(out_path, wav, rate, output_format)
+    return out_path, rel_url
+
+
+def synthesize_cached(
+    text: str,
+    voice_name: str,
+    ref_wav_path: str,
+    language: str = "en",
+    conditioning: Optional[voice_store.Conditioning] = None,
+    output_format: str = "preview",
+) -> Tuple[str, str]:
+    # For fixed phrases (previews, campaign greetings): identical inputs map
+    # to one file under the TTS cache directory.
+    key = audio_cache.cache_key(voice_name, ref_wav_path, text, language, model_version(), output_format)
+    hit = audio_cache.lookup(key)
+    if hit is not None:
+        return hit
+    out_path, _ = synthesize_to_wav(
+        text, ref_wav_path, language=language, conditioning=conditioning, output_format=output_format
+    )
+    return audio_cache.store(key, out_path)
+
+
+def stream_synthesis(
+    text: str,
+    ref_wav_path: str,
+    language: str = "en",
+    conditioning: Optional[voice_store.Conditioning] = None,
+) -> Iterator[Tuple[np.ndarray, int]]:
+    # Yields (samples, sample_rate) chunks as soon as XTTS produces them.
+    tts = _load_tts()
+    model = _xtts_model(tts)
+    if model is not None and conditioning is None:
+        conditioning = get_speaker_conditioning(ref_wav_path)
+    if conditioning is None:
+        out_path, _ = synthesize_to_wav(text, ref_wav_path, language=language)
+        samples, rate = sf.read(out_path, dtype="float32")
+        yield samples, rate
+        return
+
+    gpt_cond_latent, speaker_embedding = conditioning
+    rate = model.config.audio.output_sample_rate
+    for sentence in tts.synthesizer.split_into_sentences(text):
+        # Held for the whole sentence: the stream keeps generation state on
+        # the model between chunks. Consumers only encode and queue a chunk.
+        with _model_lock:
+            for chunk in model.inference_stream(sentence, language, gpt_cond_latent, speaker_embedding):
+                yield np.asarray(chunk.cpu() if hasattr(chunk, "cpu") else chunk, dtype=np.float32).reshape(-1), rate
@@ -1,15 +1,40 @@
 from fastapi import APIRouter, HTTPException
 
-from app.db import get_voice
-from app.tts_engine import synthesize_to_wav
+from app import audio_cache, retention
+from app.db import get_voice, run_db
+from app.inference import InferenceBusy, run_synthesis
+from app.tts_engine import scheduler_stats
 
 router = APIRouter()
 
 
 @router.post("")
 async def tts(text: str, voice_name: str):
-    voice = get_voice(voice_name)
+    voice = await run_db(get_voice, voice_name)
     if not voice:
         raise HTTPException(status_code=404, detail="Voice not found")
-    _, rel_url = synthesize_to_wav(text, voice["ref_wav_path"], language="en")
-    return {"audio_url": rel_url}
\ No newline at end of file
+    try:
+        _, rel_url = await run_synthesis(text, voice["ref_wav_path"], language="en")
+    except InferenceBusy:
+        raise HTTPException(status_code=503, detail="TTS is busy, try again shortly")
+    return {"audio_url": rel_url}
+
+
+@router.get("/cache")
+async def cache_stats():
+    return audio_cache.stats()
+
+
+@router.get("/scheduler")
+async def scheduler():
+    return scheduler_stats()
+
+
+@router.get("/storage")
+async def storage():
+    return await run_db(retention.disk_usage)
+
+
+@router.post("/storage/sweep")
+async def storage_sweep():
+    return await run_db(retention.sweep)
@@ -0,0 +1,71 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class SynthesisRequest:
+    text: str
+    language: str
+    conditioning: Any
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+    started: Optional[float] = None
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+# Runs synthesis requests from all calls one at a time, in arrival order,
+# on a single model thread, and keeps queueing and latency stats. run_one
+# returns the request's audio or raises.
+class TTSScheduler:
+    def __init__(self, run_one: Callable[[SynthesisRequest], Any]):
+        self.run_one = run_one
+        self._queue: "queue.Queue[SynthesisRequest]" = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="tts-scheduler", daemon=True)
+        self._stats_lock = threading.Lock()
+        self._waits: deque = deque(maxlen=1000)
+        self._latencies: deque = deque(maxlen=1000)
+        self._requests = 0
+        self._thread.start()
+
+    def submit(self, text: str, language: str, conditioning: Any) -> Future:
+        request = SynthesisRequest(text=text, language=language, conditioning=conditioning)
+        self._queue.put(request)
+        return request.future
+
+    def _loop(self) -> None:
+        while True:
+            request = self._queue.get()
+            request.started = time.perf_counter()
+            try:
+                request.future.set_result(self.run_one(request))
+            except Exception as exc:
+                request.future.set_exception(exc)
+            finished = time.perf_counter()
+            with self._stats_lock:
+                self._requests += 1
+                self._waits.append(request.started - request.enqueued)
+                self._latencies.append(finished - request.enqueued)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            waits, latencies = list(self._waits), list(self._latencies)
+            return {
+                "requests": self._requests,
+                "queue_depth": self._queue.qsize(),
+                "wait_p50_ms": _percentile(waits, 50) * 1000,
+                "wait_p95_ms": _percentile(waits, 95) * 1000,
+                "latency_p50_ms": _percentile(latencies, 50) * 1000,
+                "latency_p95_ms": _percentile(latencies, 95) * 1000,
+                "latency_p99_ms": _percentile(latencies, 99) * 1000,
+            }
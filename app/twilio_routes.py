@@ -1,20 +1,28 @@
-import uuid
+import logging
 from typing import Optional
 
-from fastapi import APIRouter, Form, Request
+from fastapi import APIRouter, Form, HTTPException, Request, WebSocket
 from fastapi.responses import Response
-from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse, Gather
 
+from app import greetings, metrics, model_lifecycle, sessions, summaries
 from app.settings import settings
-from app.db import create_call, update_call_status, append_transcript, complete_call_with_summary, get_transcript
-from app.db import get_voice
-from app.tts_engine import synthesize_to_wav
+from app.db import CALL_TERMINAL_STATUSES, enqueue_summary_job, finish_campaign_call, update_call_status
+from app.db import run_db
+from app.media_stream import append_stream, handle_stream
+from app.inference import InferenceBusy, run_context_chat, run_reply_segments
+from app.telephony import TwilioError, dial
 from app.utils import to_public_url
-from app.llm_engine import llm
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Final CallStatus values Twilio reports when a call ends
+TERMINAL_STATUSES = CALL_TERMINAL_STATUSES
+
+BUSY_MESSAGE = "Sorry, I missed that. Could you say it again?"
+
 
 def _twiml_response(xml: str) -> Response:
     return Response(content=xml, media_type="application/xml")
@@ -22,24 +30,11 @@ def _twiml_response(xml: str) -> Response:
 
 @router.post("/start")
 async def start_call(to_number: str = Form(...), voice_name: str = Form(...), initial_message: Optional[str] = Form(None)):
-    call_id = uuid.uuid4().hex
-    create_call(call_id, to_number, voice_name, initial_message)
-
-    client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
-
-    answer_url = f"{settings.base_url}/twilio/answer?call_id={call_id}"
-    status_url = f"{settings.base_url}/twilio/status?call_id={call_id}"
-
-    call = client.calls.create(
-        to=to_number,
-        from_=settings.twilio_phone_number,
-        url=answer_url,
-        status_callback=status_url,
-        status_callback_event=["completed"],
-        method="POST",
-    )
-
-    return {"status": "dialing", "call_id": call_id, "sid": call.sid}
+    try:
+        call_id, sid = await dial(to_number, voice_name, initial_message)
+    except TwilioError as exc:
+        raise HTTPException(status_code=502, detail=f"Twilio: {exc}")
+    return {"status": "dialing", "call_id": call_id, "sid": sid}
 
 
 @router.api_route("/answer", methods=["GET", "POST"])
@@ -49,23 +44,29 @@ async def answer(request: Request):
         return _twiml_response(VoiceResponse().to_xml())
 
     # Look up call and voice
-    from app.db import db_cursor
-    with db_cursor() as cur:
-        cur.execute("SELECT voice_name, initial_message FROM calls WHERE id = ?", (call_id,))
-        row = cur.fetchone()
-        if row:
-            voice_name, initial_message = row[0], row[1]
-        else:
-            voice_name, initial_message = None, None
+    # Nothing here may wait on the TTS pool: the greeting render started at
+    # dial time may hold it, and only greetings.wait below is bounded.
+    session = await sessions.get_or_load(call_id)
+    initial_message = session.initial_message if session else None
 
     vr = VoiceResponse()
 
     # If initial message, speak in cloned voice
-    voice = get_voice(voice_name) if voice_name else None
-    if initial_message and voice:
-        out_path, rel_url = synthesize_to_wav(initial_message, voice["ref_wav_path"], language="en")
-        append_transcript(call_id, "assistant", initial_message, audio_path=out_path)
-        vr.play(to_public_url(rel_url))
+    # The greeting was rendered when the call was placed. Play it if it's
+    # ready; otherwise stream it, or give the render a short grace period
+    # before falling back to <Say> (as also happens until TTS is warm).
+    streaming = settings.twilio_media_streams and model_lifecycle.is_ready("tts")
+    if initial_message and session.ref_wav_path:
+        greeting = await greetings.wait(call_id, 0 if streaming else settings.greeting_wait_ms / 1000.0)
+        if greeting is not None:
+            sessions.record_turn(session, "assistant", initial_message, audio_path=greeting[0])
+            vr.play(to_public_url(greeting[1]))
+        elif streaming:
+            sessions.record_turn(session, "assistant", initial_message)
+            append_stream(vr, call_id, initial_message)
+        else:
+            sessions.record_turn(session, "assistant", initial_message)
+            vr.say(initial_message)
 
     # Gather user speech
     loop_action = f"{settings.base_url}/twilio/loop?call_id={call_id}"
@@ -81,44 +82,72 @@ async def loop(request: Request):
     call_id = request.query_params.get("call_id")
     if not call_id:
         return _twiml_response(VoiceResponse().to_xml())
-
-    form = await request.form()
-    user_speech = form.get("SpeechResult") or ""
-    if user_speech:
-        append_transcript(call_id, "user", user_speech)
-
-    # Compose LLM response
-    transcript_items = get_transcript(call_id)
-    history_text = "\n".join([f"{t['role']}: {t['text']}" for t in transcript_items])
-    messages = [
-        {"role": "system", "content": "You are a friendly helpful assistant for short phone calls. Keep replies under 15 words."},
-        {"role": "user", "content": history_text + ("\nUser:" + user_speech if user_speech else "")},
-    ]
-    assistant_text = llm.chat(messages)
-
-    # Generate TTS audio with selected voice
-    from app.db import db_cursor
-    with db_cursor() as cur:
-        cur.execute("SELECT voice_name FROM calls WHERE id = ?", (call_id,))
-        row = cur.fetchone()
-        voice_name = row[0] if row else None
-
-    voice = get_voice(voice_name) if voice_name else None
-
-    vr = VoiceResponse()
-    if voice:
-        out_path, rel_url = synthesize_to_wav(assistant_text, voice["ref_wav_path"], language="en")
-        append_transcript(call_id, "assistant", assistant_text, audio_path=out_path)
-        media_url = to_public_url(rel_url)
-        vr.play(media_url)
-    else:
-        vr.say(assistant_text)
-        append_transcript(call_id, "assistant", assistant_text)
-
-    loop_action = f"{settings.base_url}/twilio/loop?call_id={call_id}"
-    gather = Gather(input="speech", action=loop_action, method="POST", speechTimeout="auto")
-    vr.append(gather)
-    return _twiml_response(vr.to_xml())
+    with metrics.turn(call_id, "gather") as trace:
+        with trace.stage("session"):
+            session = await sessions.get_or_load(call_id)
+        if session is None:
+            return _twiml_response(VoiceResponse().to_xml())
+
+        with trace.stage("form"):
+            form = await request.form()
+        user_speech = form.get("SpeechResult") or ""
+        if user_speech:
+            sessions.record_turn(session, "user", user_speech)
+
+        loop_action = f"{settings.base_url}/twilio/loop?call_id={call_id}"
+        vr = VoiceResponse()
+        if session.ref_wav_path and settings.twilio_media_streams and model_lifecycle.is_ready("tts"):
+            # The stream handler generates the reply and speaks it as it is
+            # written, and records that turn's metrics itself
+            append_stream(vr, call_id)
+            vr.append(Gather(input="speech", action=loop_action, method="POST", speechTimeout="auto"))
+            return _twiml_response(vr.to_xml())
+
+        # Compose LLM response from the session's bounded context window,
+        # synthesizing each sentence while the next is being generated
+        segments = None
+        try:
+            with trace.stage("reply"):
+                if session.ref_wav_path:
+                    segments = await run_reply_segments(session.context, call_id, session.ref_wav_path)
+                else:
+                    segments = [(await run_context_chat(session.context, session_id=call_id), None, None)]
+        except InferenceBusy:
+            trace.outcome = "busy"
+        except Exception:
+            # Nothing has played yet in gather mode, so the caller is just
+            # asked again rather than Twilio dropping the call on a 500
+            logger.exception("Reply for call %s failed", call_id)
+            trace.outcome = "error"
+        if segments is None:
+            vr.say(BUSY_MESSAGE)
+            vr.append(Gather(input="speech", action=loop_action, method="POST", speechTimeout="auto"))
+            sessions.record_metrics(trace.finish())
+            return _twiml_response(vr.to_xml())
+
+        with trace.stage("twiml"):
+            for sentence, _, rel_url in segments:
+                if rel_url:
+                    vr.play(to_public_url(rel_url))
+                else:
+                    vr.say(sentence)
+            if segments:
+                sessions.record_turn(
+                    session,
+                    "assistant",
+                    " ".join(sentence for sentence, _, _ in segments),
+                    segments=[(sentence, out_path) for sentence, out_path, _ in segments],
+                )
+            gather = Gather(input="speech", action=loop_action, method="POST", speechTimeout="auto")
+            vr.append(gather)
+            xml = vr.to_xml()
+        sessions.record_metrics(trace.finish())
+        return _twiml_response(xml)
+
+
+@router.websocket("/stream")
+async def stream(websocket: WebSocket):
+    await handle_stream(websocket)
 
 
 @router.api_route("/status", methods=["POST", "GET"])
@@ -127,11 +156,17 @@ async def status(request: Request):
     form = await request.form()
     call_status = form.get("CallStatus") or request.query_params.get("CallStatus")
 
-    if call_id and call_status == "completed":
-        # Build summary
-        items = get_transcript(call_id)
-        transcript_text = "\n".join([f"{t['role']}: {t['text']}" for t in items])
-        summary = llm.summarize(transcript_text)
-        complete_call_with_summary(call_id, summary)
+    if call_id and call_status in TERMINAL_STATUSES:
+        # Frees the call's slot if it belongs to a campaign
+        await run_db(finish_campaign_call, call_id, call_status)
 
-    return Response(status_code=200)
\ No newline at end of file
+    if call_id and call_status == "completed":
+        # Summarized in the background so hangups don't hold up live calls
+        await sessions.end(call_id)
+        await run_db(enqueue_summary_job, call_id)
+        summaries.notify()
+    elif call_id and call_status in TERMINAL_STATUSES:
+        await sessions.end(call_id)
+        await run_db(update_call_status, call_id, call_status)
+
+    return Response(status_code=200)
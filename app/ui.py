@@ -3,11 +3,20 @@ import os
 import shutil
 from typing import List
 
-from app.db import list_voices as db_list_voices, list_calls, upsert_voice, get_voice, delete_voice as db_delete_voice
+from starlette.concurrency import run_in_threadpool
+
+from app.db import list_voices as db_list_voices, list_calls, search_calls, upsert_voice, get_voice
 from app.settings import settings, VOICES_DIR
-from app.tts_engine import synthesize_to_wav
-from app.utils import sanitize_name
-from twilio.rest import Client
+from app.inference import InferenceBusy, run_cached_synthesis, run_prepare_voice, run_synthesis
+from app.utils import escape_markdown, sanitize_name
+from app.tts_engine import PREVIEW_TEXT
+from app.retention import remove_voice
+from app.telephony import TwilioError, dial
+from app.voice_ingest import VoiceSampleError, discard, incoming_path, prepare_reference
+
+
+HISTORY_PAGE_SIZE = 200
+SEARCH_PAGE_SIZE = 50
 
 
 def build_ui():
@@ -29,15 +38,27 @@ def build_ui():
                     del_btn = gr.Button("Delete")
                     prev_audio = gr.Audio(label="Preview", type="filepath")
 
-            def do_train(name, sample_path):
+            async def do_train(name, sample_path):
                 if not name or not sample_path:
                     return gr.update(visible=True, value="Please provide name and sample."), None
+                # Gradio has already written the upload to a temp file
+                if os.path.getsize(sample_path) > settings.voice_upload_max_mb * 1024 * 1024:
+                    return gr.update(visible=True, value=f"Sample is larger than {settings.voice_upload_max_mb} MB."), None
                 clean = sanitize_name(name)
                 vdir = os.path.join(VOICES_DIR, clean)
                 os.makedirs(vdir, exist_ok=True)
-                ref_path = os.path.join(vdir, "reference.wav")
-                shutil.copy(sample_path, ref_path)
+                incoming = incoming_path(vdir, sample_path)
+                try:
+                    shutil.copy(sample_path, incoming)
+                    ref_path = await run_in_threadpool(prepare_reference, incoming, vdir)
+                except VoiceSampleError as exc:
+                    discard(incoming, vdir)
+                    return gr.update(visible=True, value=f"{exc}."), None
+                except BaseException:
+                    discard(incoming, vdir)
+                    raise
                 upsert_voice(clean, ref_path)
+                await run_prepare_voice(ref_path)
                 return gr.update(visible=True, value="Voice saved."), True
 
             def do_refresh():
@@ -45,22 +66,18 @@ def build_ui():
                 names = [v["name"] for v in items]
                 return items, gr.update(choices=list(names))
 
-            def do_preview(name):
+            async def do_preview(name):
                 v = get_voice(name)
                 if not v:
                     return None
-                out_path, _ = synthesize_to_wav("This is a preview of the cloned voice.", v["ref_wav_path"], language="en")
+                try:
+                    out_path, _ = await run_cached_synthesis(PREVIEW_TEXT, v["name"], v["ref_wav_path"], language="en")
+                except InferenceBusy:
+                    raise gr.Error("TTS is busy, try again shortly.")
                 return out_path
 
             def do_delete(name):
-                v = get_voice(name)
-                if v:
-                    db_delete_voice(name)
-                    vdir = os.path.join(VOICES_DIR, name)
-                    try:
-                        shutil.rmtree(vdir)
-                    except Exception:
-                        pass
+                remove_voice(name)
                 items, names_update = do_refresh()
                 return names_update, items
 
@@ -81,11 +98,14 @@ def build_ui():
                 names = [v["name"] for v in items]
                 return gr.update(choices=names)
 
-            def do_tts(text, voice_name):
+            async def do_tts(text, voice_name):
                 v = get_voice(voice_name)
                 if not v:
                     return None
-                out_path, _ = synthesize_to_wav(text, v["ref_wav_path"], language="en")
+                try:
+                    out_path, _ = await run_synthesis(text, v["ref_wav_path"], language="en")
+                except InferenceBusy:
+                    raise gr.Error("TTS is busy, try again shortly.")
                 return out_path
 
             demo.load(load_voice_names, None, voice_dd)
@@ -103,37 +123,49 @@ def build_ui():
                 names = [v["name"] for v in items]
                 return gr.update(choices=names)
 
-            def do_call(voice_name, to_number, initial_message):
-                client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
-                call_id = __import__("uuid").uuid4().hex
-                # Insert call row
-                from app.db import create_call
-                create_call(call_id, to_number, voice_name, initial_message)
-                answer_url = f"{settings.base_url}/twilio/answer?call_id={call_id}"
-                status_url = f"{settings.base_url}/twilio/status?call_id={call_id}"
-                call = client.calls.create(
-                    to=to_number,
-                    from_=settings.twilio_phone_number,
-                    url=answer_url,
-                    status_callback=status_url,
-                    status_callback_event=["completed"],
-                    method="POST",
-                )
+            async def do_call(voice_name, to_number, initial_message):
+                try:
+                    call_id, _ = await dial(to_number, voice_name, initial_message)
+                except TwilioError as exc:
+                    raise gr.Error(f"Twilio: {exc}")
                 return gr.update(visible=True, value=f"Dialing... Call ID: {call_id}")
 
             demo.load(load_voice_names2, None, call_voice_dd)
             call_btn.click(do_call, inputs=[call_voice_dd, phone_in, start_msg], outputs=[call_status])
 
         with gr.Tab("History"):
-            history_df = gr.Dataframe(headers=["id", "to_number", "voice_name", "status", "summary", "created_at"], interactive=False)
+            history_df = gr.Dataframe(
+                headers=["id", "to_number", "voice_name", "status", "summary", "summary_status", "turn_count", "last_activity_at", "created_at"],
+                interactive=False,
+            )
             refresh_hist_btn = gr.Button("Refresh History")
+            with gr.Row():
+                search_in = gr.Textbox(label="Search transcripts and summaries", scale=4)
+                search_btn = gr.Button("Search", scale=1)
+            search_df = gr.Dataframe(
+                headers=["id", "created_at", "to_number", "voice_name", "status", "source", "matches", "snippet"],
+                datatype=["str", "str", "str", "str", "str", "str", "number", "markdown"],
+                interactive=False,
+            )
             dl_hint = gr.Markdown(value="Select a call ID above. Download transcript: /api/calls/<CALL_ID>/transcript.txt")
 
             def load_history():
-                items = list_calls()
+                items = list_calls(limit=HISTORY_PAGE_SIZE)
                 return items
 
+            def do_search(query):
+                if not (query or "").strip():
+                    return []
+                try:
+                    items = search_calls(query, limit=SEARCH_PAGE_SIZE, highlight=("**", "**"), escape=escape_markdown)
+                except ValueError:
+                    return []
+                columns = ["id", "created_at", "to_number", "voice_name", "status", "source", "matches", "snippet"]
+                return [[item[c] for c in columns] for item in items]
+
             demo.load(load_history, None, history_df)
             refresh_hist_btn.click(load_history, None, history_df)
+            search_btn.click(do_search, search_in, search_df)
+            search_in.submit(do_search, search_in, search_df)
 
     return demo
\ No newline at end of file
@@ -1,3 +1,4 @@
+import html
 import os
 import re
 import uuid
@@ -7,6 +8,7 @@ from app.settings import AUDIO_OUT_DIR, settings
 
 
 SAFE_NAME_REGEX = re.compile(r"[^a-zA-Z0-9_-]+")
+MARKDOWN_SPECIAL = re.compile(r"([\\`*_{}\[\]()#+\-.!|~])")
 
 
 def sanitize_name(name: str) -> str:
@@ -20,8 +22,24 @@ def new_audio_file(stem: str = "out", ext: str = ".wav") -> Tuple[str, str]:
     return full_path, rel_url
 
 
+def audio_rel_url(path: str) -> str:
+    # URL under /static/audio for a file written below AUDIO_OUT_DIR
+    rel = os.path.relpath(path, AUDIO_OUT_DIR).replace(os.sep, "/")
+    return f"/static/audio/{rel}"
+
+
+def buffered_audio_url(path: str) -> str:
+    # URL under /audio, which serves from app.audio_buffers before disk
+    return f"/audio/{os.path.basename(path)}"
+
+
 def to_public_url(rel_url: str) -> str:
     base = settings.base_url or ""
     if base.endswith("/"):
         base = base[:-1]
-    return f"{base}{rel_url}"
\ No newline at end of file
+    return f"{base}{rel_url}"
+
+
+def escape_markdown(text: str) -> str:
+    # Shows text literally in a Markdown cell: no emphasis, links or raw HTML
+    return MARKDOWN_SPECIAL.sub(r"\\\1", html.escape(text, quote=False))
@@ -0,0 +1,167 @@
+import os
+import tempfile
+from typing import Tuple
+
+import numpy as np
+import soundfile as sf
+from starlette.concurrency import run_in_threadpool
+
+from app.audio import resample
+from app.settings import settings
+from app.voice_store import CLIP_FILENAME
+
+REFERENCE_FILENAME = "reference.wav"
+# Rate the XTTS speaker encoder and GPT conditioning read reference audio at
+MODEL_RATE = 22050
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Only this much of an upload is decoded; longer samples don't condition better
+MAX_DECODE_SECONDS = 300
+MIN_SPEECH_SECONDS = 3.0
+FRAME_SECONDS = 0.02
+# Frames quieter than this relative to the loudest frame count as silence
+SILENCE_DB = -35.0
+TARGET_RMS_DB = -20.0
+PEAK_LIMIT = 0.95
+
+
+class VoiceSampleError(ValueError):
+    pass
+
+
+class UploadTooLarge(VoiceSampleError):
+    pass
+
+
+def _db_to_gain(db: float) -> float:
+    return float(10 ** (db / 20))
+
+
+def incoming_path(voice_dir: str, filename: str) -> str:
+    # Where an upload waits until it is accepted; it then replaces original<ext>.
+    # Unique per upload so two uploads of one voice can't overwrite each other.
+    ext = os.path.splitext(filename or "")[1].lower() or ".wav"
+    fd, path = tempfile.mkstemp(prefix="incoming-", suffix=ext, dir=voice_dir)
+    os.close(fd)
+    return path
+
+
+def _keep_original(src_path: str, voice_dir: str) -> None:
+    for name in os.listdir(voice_dir):
+        if name.startswith("original."):
+            os.remove(os.path.join(voice_dir, name))
+    ext = os.path.splitext(src_path)[1]
+    os.replace(src_path, os.path.join(voice_dir, f"original{ext}"))
+
+
+async def save_upload(upload, dest_path: str) -> int:
+    # Streams an UploadFile to disk in chunks, stopping at the size cap so a
+    # large upload never sits in memory whole. Returns the bytes written.
+    limit = settings.voice_upload_max_mb * 1024 * 1024
+    part_path = dest_path + ".part"
+    written = 0
+    try:
+        with open(part_path, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > limit:
+                    raise UploadTooLarge(f"Sample is larger than {settings.voice_upload_max_mb} MB")
+                f.write(chunk)
+        os.replace(part_path, dest_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return written
+
+
+def _decode(path: str) -> Tuple[np.ndarray, int]:
+    try:
+        with sf.SoundFile(path) as f:
+            rate = f.samplerate
+            samples = f.read(frames=min(f.frames, MAX_DECODE_SECONDS * rate), dtype="float32", always_2d=True)
+    except (RuntimeError, sf.LibsndfileError) as exc:
+        raise VoiceSampleError(f"Could not decode the sample: {exc}") from exc
+    return samples.mean(axis=1), rate
+
+
+def _frame_rms(samples: np.ndarray, frame: int) -> np.ndarray:
+    n = samples.size // frame
+    frames = samples[: n * frame].reshape(n, frame)
+    return np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+
+
+def _best_window(voiced: np.ndarray, rms: np.ndarray, width: int) -> int:
+    # Start frame of the window with the most speech, louder breaking ties
+    if voiced.size <= width:
+        return 0
+    score = voiced.astype(np.float64) + rms / (rms.max() * width + 1e-12)
+    sums = np.convolve(score, np.ones(width), mode="valid")
+    return int(np.argmax(sums))
+
+
+def _normalize(samples: np.ndarray, speech_rms: float) -> np.ndarray:
+    gain = _db_to_gain(TARGET_RMS_DB) / max(speech_rms, 1e-6)
+    peak = float(np.max(np.abs(samples))) * gain
+    if peak > PEAK_LIMIT:
+        gain *= PEAK_LIMIT / peak
+    return (samples * gain).astype(np.float32)
+
+
+def prepare_reference(src_path: str, voice_dir: str) -> str:
+    # Decodes the upload once, downmixes, resamples to the model rate, trims
+    # leading/trailing silence and normalizes loudness. Writes the full
+    # cleaned reference plus a short best-segment clip that speaker
+    # conditioning is computed from, and keeps the upload as original<ext>.
+    # Returns the reference path.
+    samples, rate = _decode(src_path)
+    samples = resample(samples, rate, MODEL_RATE)
+
+    frame = int(MODEL_RATE * FRAME_SECONDS)
+    rms = _frame_rms(samples, frame)
+    if rms.size == 0 or rms.max() < 1e-4:
+        raise VoiceSampleError("Sample is silent")
+    voiced = rms > rms.max() * _db_to_gain(SILENCE_DB)
+    if voiced.sum() * FRAME_SECONDS < MIN_SPEECH_SECONDS:
+        raise VoiceSampleError(f"Sample needs at least {MIN_SPEECH_SECONDS:.0f}s of speech")
+
+    # Keep a few frames of room tone either side of the speech
+    pad = 5
+    idx = np.flatnonzero(voiced)
+    first, last = max(0, idx[0] - pad), min(voiced.size, idx[-1] + 1 + pad)
+    voiced, rms = voiced[first:last], rms[first:last]
+    samples = _normalize(samples[first * frame: last * frame], float(np.sqrt(np.mean(rms[voiced] ** 2))))
+
+    width = max(1, int(settings.voice_clip_seconds / FRAME_SECONDS))
+    start = _best_window(voiced, rms, width)
+    clip = samples[start * frame: (start + width) * frame]
+
+    ref_path = os.path.join(voice_dir, REFERENCE_FILENAME)
+    # Clip first: conditioning freshness is checked against the reference
+    sf.write(os.path.join(voice_dir, CLIP_FILENAME), clip, MODEL_RATE, subtype="PCM_16")
+    sf.write(ref_path, samples, MODEL_RATE, subtype="PCM_16")
+    _keep_original(src_path, voice_dir)
+    return ref_path
+
+
+def discard(src_path: str, voice_dir: str) -> None:
+    # Undo a rejected upload; the directory goes too unless a voice lives there
+    for remove, path in ((os.remove, src_path), (os.rmdir, voice_dir)):
+        try:
+            remove(path)
+        except OSError:
+            pass
+
+
+async def ingest_upload(upload, voice_dir: str) -> str:
+    # API path: stream to disk, then preprocess off the event loop
+    os.makedirs(voice_dir, exist_ok=True)
+    src = incoming_path(voice_dir, upload.filename)
+    try:
+        await save_upload(upload, src)
+        return await run_in_threadpool(prepare_reference, src, voice_dir)
+    except BaseException:
+        # Rejected samples, disconnects and cancellation all leave nothing behind
+        discard(src, voice_dir)
+        raise
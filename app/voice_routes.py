@@ -6,8 +6,11 @@ from fastapi.responses import FileResponse
 
 from app.settings import VOICES_DIR
 from app.utils import sanitize_name
-from app.db import upsert_voice, list_voices, get_voice, delete_voice as db_delete_voice
-from app.tts_engine import synthesize_to_wav
+from app.db import upsert_voice, list_voices, get_voice, run_db
+from app.inference import InferenceBusy, run_cached_synthesis, run_prepare_voice
+from app.retention import remove_voice
+from app.tts_engine import PREVIEW_TEXT
+from app.voice_ingest import UploadTooLarge, VoiceSampleError, ingest_upload
 
 router = APIRouter()
 
@@ -17,48 +20,37 @@ async def train_voice(name: str = Form(...), sample: UploadFile = File(...)):
     clean = sanitize_name(name)
     if not clean:
         raise HTTPException(status_code=400, detail="Invalid voice name")
-    voice_dir = os.path.join(VOICES_DIR, clean)
-    os.makedirs(voice_dir, exist_ok=True)
-    ref_wav_path = os.path.join(voice_dir, "reference.wav")
-
-    data = await sample.read()
-    with open(ref_wav_path, "wb") as f:
-        f.write(data)
-
-    upsert_voice(clean, ref_wav_path)
+    try:
+        ref_wav_path = await ingest_upload(sample, os.path.join(VOICES_DIR, clean))
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except VoiceSampleError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    await run_db(upsert_voice, clean, ref_wav_path)
+    await run_prepare_voice(ref_wav_path)
     return {"status": "ok", "name": clean}
 
 
 @router.get("")
 async def voices() -> List[dict]:
-    return list_voices()
+    return await run_db(list_voices)
 
 
 @router.get("/{name}/preview")
 async def preview_voice(name: str):
-    v = get_voice(name)
+    v = await run_db(get_voice, name)
     if not v:
         raise HTTPException(status_code=404, detail="Voice not found")
-    _, rel = synthesize_to_wav("This is a preview of the cloned voice.", v["ref_wav_path"], language="en")
+    try:
+        _, rel = await run_cached_synthesis(PREVIEW_TEXT, v["name"], v["ref_wav_path"], language="en")
+    except InferenceBusy:
+        raise HTTPException(status_code=503, detail="TTS is busy, try again shortly")
     return {"audio_url": rel}
 
 
 @router.delete("/{name}")
 async def delete_voice(name: str):
-    v = get_voice(name)
-    if not v:
+    if not await run_db(remove_voice, name):
         raise HTTPException(status_code=404, detail="Voice not found")
-    # Remove from DB
-    db_delete_voice(name)
-    # Remove files
-    voice_dir = os.path.join(VOICES_DIR, name)
-    try:
-        if os.path.isdir(voice_dir):
-            for root, _, files in os.walk(voice_dir, topdown=False):
-                for file in files:
-                    os.remove(os.path.join(root, file))
-            os.rmdir(voice_dir)
-    except Exception:
-        # Ignore FS errors
-        pass
     return {"status": "ok"}
\ No newline at end of file
@@ -0,0 +1,79 @@
+import importlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from app.settings import settings
+
+
+LATENTS_FILENAME = "conditioning.pt"
+# Short cleaned-up excerpt of the reference that conditioning is computed from
+CLIP_FILENAME = "conditioning.wav"
+
+Conditioning = Tuple[Any, Any]
+
+_store_lock = threading.Lock()
+_cache: "OrderedDict[str, Conditioning]" = OrderedDict()
+
+
+def latents_path(ref_wav_path: str) -> str:
+    return os.path.join(os.path.dirname(ref_wav_path), LATENTS_FILENAME)
+
+
+def conditioning_audio(ref_wav_path: str) -> str:
+    # Voices saved before clips existed condition on the full reference
+    clip = os.path.join(os.path.dirname(ref_wav_path), CLIP_FILENAME)
+    return clip if os.path.exists(clip) else ref_wav_path
+
+
+def _remember(ref_wav_path: str, conditioning: Conditioning) -> None:
+    with _store_lock:
+        _cache[ref_wav_path] = conditioning
+        _cache.move_to_end(ref_wav_path)
+        while len(_cache) > max(1, settings.voice_cache_size):
+            _cache.popitem(last=False)
+
+
+def _is_fresh(path: str, ref_wav_path: str) -> bool:
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(ref_wav_path)
+    except OSError:
+        return False
+
+
+def get(ref_wav_path: str) -> Optional[Conditioning]:
+    with _store_lock:
+        conditioning = _cache.get(ref_wav_path)
+        if conditioning is not None:
+            _cache.move_to_end(ref_wav_path)
+            return conditioning
+
+    path = latents_path(ref_wav_path)
+    if not _is_fresh(path, ref_wav_path):
+        return None
+    torch = importlib.import_module("torch")
+    data = torch.load(path, map_location="cpu")
+    conditioning = (data["gpt_cond_latent"], data["speaker_embedding"])
+    _remember(ref_wav_path, conditioning)
+    return conditioning
+
+
+def put(ref_wav_path: str, gpt_cond_latent: Any, speaker_embedding: Any) -> Conditioning:
+    torch = importlib.import_module("torch")
+    torch.save(
+        {"gpt_cond_latent": gpt_cond_latent, "speaker_embedding": speaker_embedding},
+        latents_path(ref_wav_path),
+    )
+    conditioning = (gpt_cond_latent, speaker_embedding)
+    _remember(ref_wav_path, conditioning)
+    return conditioning
+
+
+def invalidate(ref_wav_path: str) -> None:
+    with _store_lock:
+        _cache.pop(ref_wav_path, None)
+    try:
+        os.remove(latents_path(ref_wav_path))
+    except OSError:
+        pass
@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings and paths are fixed when app.settings is imported, so point the
+# app at a scratch data directory before any test imports it.
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="call-assistant-tests-")
+os.environ["HF_HUB_OFFLINE"] = "1"
+os.environ["MODEL_WORKERS"] = ""
+
+
+@pytest.fixture(scope="session")
+def database():
+    from app.db import init_db
+
+    init_db()
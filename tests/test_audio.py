@@ -0,0 +1,52 @@
+import numpy as np
+
+from app.audio import TELEPHONY_RATE, MulawStreamEncoder, mulaw_encode
+
+# Segment end points of the reference G.711 mu-law coder (14-bit magnitudes)
+SEG_UEND = (0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF)
+
+
+def reference_linear2ulaw(pcm16: int) -> int:
+    # Sun's g711.c linear2ulaw, one sample at a time
+    pcm = pcm16 >> 2
+    if pcm < 0:
+        pcm, mask = -pcm, 0x7F
+    else:
+        mask = 0xFF
+    pcm = min(pcm, 8159) + 0x21
+    seg = next((i for i, end in enumerate(SEG_UEND) if pcm <= end), 8)
+    if seg >= 8:
+        return 0x7F ^ mask
+    return ((seg << 4) | ((pcm >> (seg + 1)) & 0x0F)) ^ mask
+
+
+def test_mulaw_encode_matches_reference_coder_for_every_sample():
+    pcm = np.arange(-32768, 32768, dtype=np.int32)
+    samples = pcm.astype(np.float32) / 32767
+    # The encoder scales floats back to 16-bit itself; compare on its view
+    scaled = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int32)
+    expected = bytes(reference_linear2ulaw(int(v)) for v in scaled)
+    assert mulaw_encode(samples) == expected
+
+
+def test_mulaw_encode_known_values():
+    assert mulaw_encode(np.array([0.0, 1.0, -1.0], dtype=np.float32)) == bytes([0xFF, 0x80, 0x00])
+
+
+def test_stream_encoder_is_seamless_across_chunks():
+    rate = 24000
+    t = np.arange(rate) / rate
+    samples = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+    whole = MulawStreamEncoder(rate).encode(samples)
+    encoder = MulawStreamEncoder(rate)
+    chunked = b"".join(encoder.encode(chunk) for chunk in np.array_split(samples, 37))
+
+    assert len(whole) == TELEPHONY_RATE
+    assert chunked == whole
+
+
+def test_stream_encoder_holds_back_tiny_chunks():
+    encoder = MulawStreamEncoder(TELEPHONY_RATE)
+    assert encoder.encode(np.zeros(1, dtype=np.float32)) == b""
+    assert len(encoder.encode(np.zeros(160, dtype=np.float32))) == 160
@@ -0,0 +1,31 @@
+import os
+
+from app import audio_cache
+from app.settings import AUDIO_OUT_DIR, TTS_CACHE_DIR
+
+
+def _wav(path: str, size: int) -> str:
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def test_copied_out_audio_survives_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_cache.settings, "tts_cache_max_mb", 1)
+    greeting, _ = audio_cache.store("a" * 64, _wav(str(tmp_path / "a.wav"), 600 * 1024))
+    data = open(greeting, "rb").read()
+
+    out_path, rel_url = audio_cache.copy_out(greeting, "greeting")
+    assert os.path.dirname(out_path) == AUDIO_OUT_DIR and rel_url.startswith("/static/audio/greeting_")
+
+    # Pushes the greeting's cache entry out
+    audio_cache.store("b" * 64, _wav(str(tmp_path / "b.wav"), 600 * 1024))
+    assert audio_cache.lookup("a" * 64) is None
+    assert not os.path.exists(os.path.join(TTS_CACHE_DIR, "a" * 64 + ".wav"))
+    assert open(out_path, "rb").read() == data
+
+
+def test_lookup_hits_after_store(tmp_path):
+    path, rel_url = audio_cache.store("c" * 64, _wav(str(tmp_path / "c.wav"), 1024))
+    assert audio_cache.lookup("c" * 64) == (path, rel_url)
+    assert rel_url == f"/static/audio/cache/{'c' * 64}.wav"
@@ -0,0 +1,104 @@
+import os
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import audio_buffers
+from app.audio_routes import _byte_range, _etag_matches, router
+from app.settings import AUDIO_OUT_DIR
+
+app = FastAPI()
+app.include_router(router, prefix="/audio")
+client = TestClient(app)
+DATA = bytes(range(256)) * 4
+
+
+def _published() -> str:
+    name = f"tts_{uuid.uuid4().hex}.wav"
+    audio_buffers.publish(os.path.join(AUDIO_OUT_DIR, name), DATA, 1.0)
+    return name
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=1000-", (1000, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=-5000", (0, 1023)),
+    ("bytes=1000-9999", (1000, 1023)),
+    ("bytes=0-1,4-5", None),
+    ("items=0-1", None),
+])
+def test_byte_range(header, expected):
+    assert _byte_range(header, 1024) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=5-4", "bytes=-"])
+def test_byte_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        _byte_range(header, 1024)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ('"ab"', False),
+    ('"xabc"', False),
+])
+def test_etag_matches(header, expected):
+    assert _etag_matches(header, '"abc"') is expected
+
+
+def test_serves_from_memory_and_from_disk():
+    name = _published()
+    response = client.get(f"/audio/{name}")
+    assert response.status_code == 200 and response.content == DATA
+    etag = response.headers["etag"]
+
+    audio_buffers.flush()
+    with open(os.path.join(AUDIO_OUT_DIR, name), "rb") as f:
+        assert f.read() == DATA
+    assert client.head(f"/audio/{name}").headers["content-length"] == str(len(DATA))
+    assert client.get(f"/audio/{name}", headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get(f"/audio/{name}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_range_requests():
+    name = _published()
+    partial = client.get(f"/audio/{name}", headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206 and partial.content == DATA[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(DATA)}"
+
+    stale = client.get(f"/audio/{name}", headers={"Range": "bytes=10-19", "If-Range": '"old"'})
+    assert stale.status_code == 200 and stale.content == DATA
+
+    unsatisfiable = client.get(f"/audio/{name}", headers={"Range": f"bytes={len(DATA)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+def test_unknown_audio_is_404():
+    assert client.get("/audio/missing.wav").status_code == 404
+    assert client.get("/audio/..%2Fsecret.wav").status_code == 404
+
+
+def test_failed_write_leaves_no_part_file(monkeypatch):
+    real_replace = os.replace
+
+    def failing_replace(src, dst):
+        if src.endswith(".part"):
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(audio_buffers.os, "replace", failing_replace)
+    name = _published()
+    audio_buffers.flush()
+    path = os.path.join(AUDIO_OUT_DIR, name)
+    assert not os.path.exists(path + ".part") and not os.path.exists(path)
+    assert name not in audio_buffers._unwritten
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+import uuid
+
+from app import campaigns
+from app.db import (
+    campaign_progress,
+    claim_campaign_calls,
+    create_call,
+    create_campaign,
+    db_cursor,
+    get_campaign,
+    reap_stale_campaign_calls,
+    set_campaign_status,
+    update_campaign_call,
+    update_call_status,
+)
+from app.telephony import TwilioError
+
+
+def _campaign(numbers: int, cps: float = 1000.0, max_concurrent: int = 100) -> str:
+    campaign_id = uuid.uuid4().hex
+    rows = [{"to_number": f"+1555{i:07d}", "voice_name": "v"} for i in range(numbers)]
+    create_campaign(campaign_id, "test", cps, max_concurrent, rows)
+    return campaign_id
+
+
+def _statuses(campaign_id: str) -> dict:
+    return campaign_progress(campaign_id)["counts"]
+
+
+def _age_dial(row_id: int, seconds: int) -> None:
+    with db_cursor() as cur:
+        cur.execute("UPDATE campaign_calls SET dialed_at = datetime('now', ?) WHERE id = ?", (f"-{seconds} seconds", row_id))
+
+
+def test_claim_stops_at_max_concurrent(database):
+    campaign_id, now = _campaign(5, cps=1.0, max_concurrent=2), time.time()
+    rows, wait = claim_campaign_calls(campaign_id, 5, 2, now=now)
+    assert len(rows) == 2 and wait == 0.0
+    # Full: nothing claimed, and the unused pacing slot isn't held against it
+    assert claim_campaign_calls(campaign_id, 1, 2, now=now + 2) == ([], 0.0)
+    update_campaign_call(rows[0]["id"], "failed", error="busy")
+    assert len(claim_campaign_calls(campaign_id, 1, 2, now=now + 2)[0]) == 1
+
+
+def test_claim_paces_dials_at_cps(database):
+    campaign_id = _campaign(3, cps=2.0)
+    now = time.time()
+    assert len(claim_campaign_calls(campaign_id, 1, 10, now=now)[0]) == 1
+    rows, wait = claim_campaign_calls(campaign_id, 1, 10, now=now + 0.1)
+    assert rows == [] and abs(wait - 0.4) < 1e-6
+    assert len(claim_campaign_calls(campaign_id, 1, 10, now=now + 0.5)[0]) == 1
+
+
+def test_concurrent_claims_never_share_a_row(database):
+    campaign_id = _campaign(40, cps=1e9)
+    claimed, lock = [], threading.Lock()
+
+    def dialer():
+        while True:
+            rows, wait = claim_campaign_calls(campaign_id, 1, 30)
+            if not rows and not wait:
+                return
+            with lock:
+                claimed.extend(r["id"] for r in rows)
+
+    threads = [threading.Thread(target=dialer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(claimed) == len(set(claimed)) == 30
+
+
+def test_dial_result_does_not_overwrite_a_reaped_row(database):
+    campaign_id = _campaign(1)
+    [row], _ = claim_campaign_calls(campaign_id, 1, 1)
+    _age_dial(row["id"], 600)
+    assert reap_stale_campaign_calls(300, 3600) >= 1
+    update_campaign_call(row["id"], "in_progress", call_id="late")
+    assert _statuses(campaign_id) == {"failed": 1}
+
+
+def test_reaper_frees_slots_nothing_else_will(database):
+    campaign_id = _campaign(3)
+    rows, _ = claim_campaign_calls(campaign_id, 3, 3)
+    ended, lost, fresh = (uuid.uuid4().hex for _ in range(3))
+    for row, call_id in zip(rows, (ended, lost, fresh)):
+        create_call(call_id, row["to_number"], "v", None)
+        update_campaign_call(row["id"], "in_progress", call_id=call_id)
+    # Its status callback arrived before the dialer stored the call id
+    update_call_status(ended, "no-answer")
+    _age_dial(rows[1]["id"], 7200)
+
+    reap_stale_campaign_calls(300, 3600)
+    assert _statuses(campaign_id) == {"no-answer": 1, "failed": 1, "in_progress": 1}
+
+
+def test_cancel_drops_queued_numbers_only(database):
+    campaign_id = _campaign(3)
+    [row], _ = claim_campaign_calls(campaign_id, 1, 10)
+    update_campaign_call(row["id"], "in_progress", call_id=uuid.uuid4().hex)
+    set_campaign_status(campaign_id, "cancelled")
+    assert _statuses(campaign_id) == {"in_progress": 1, "cancelled": 2}
+    assert get_campaign(campaign_id)["finished_at"] is not None
+
+
+def test_dialers_in_several_processes_share_the_rate(database, monkeypatch):
+    # Two dialers on one campaign, as two app processes would run it
+    cps = 20.0
+    campaign_id = _campaign(6, cps=cps)
+    dialed = []
+
+    async def dial(to_number, voice_name, initial_message):
+        dialed.append(time.monotonic())
+        raise TwilioError("refused", 400)
+
+    monkeypatch.setattr(campaigns, "dial", dial)
+
+    async def go():
+        await asyncio.wait_for(asyncio.gather(campaigns._run(campaign_id), campaigns._run(campaign_id)), 10)
+
+    asyncio.run(go())
+    assert len(dialed) == 6
+    gaps = [b - a for a, b in zip(dialed, dialed[1:])]
+    assert min(gaps) > 0.9 / cps
+    assert get_campaign(campaign_id)["status"] == "completed"
+    assert _statuses(campaign_id) == {"failed": 6}
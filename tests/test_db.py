@@ -0,0 +1,93 @@
+import sqlite3
+import uuid
+
+import pytest
+
+from app import db
+from app.db import (
+    append_transcript,
+    create_call,
+    decode_cursor,
+    encode_cursor,
+    get_transcript,
+    list_calls,
+    next_calls_cursor,
+)
+
+
+def test_cursor_round_trip():
+    key = ("2026-01-02 03:04:05", "call/é+=")
+    assert decode_cursor(encode_cursor(*key)) == list(key)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "//79"])
+def test_malformed_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_list_calls_pages_cover_every_call_once(database):
+    # Calls created within one second share created_at, so this also
+    # exercises the id tie-break in the keyset
+    for _ in range(5):
+        create_call(uuid.uuid4().hex, "+15550001111", "v", None)
+    everything = [c["id"] for c in list_calls()]
+
+    seen, cursor = [], None
+    while True:
+        page = list_calls(limit=2, cursor=cursor)
+        seen.extend(c["id"] for c in page)
+        cursor = next_calls_cursor(page, 2)
+        if cursor is None:
+            break
+    assert seen == everything
+
+
+def test_transcript_pages_continue_after_the_last_id(database):
+    call_id = uuid.uuid4().hex
+    create_call(call_id, "+15550001111", "v", None)
+    for i in range(5):
+        append_transcript(call_id, "user", f"line {i}")
+    first = get_transcript(call_id, limit=3)
+    rest = get_transcript(call_id, after_id=first[-1]["id"], limit=3)
+    assert [t["text"] for t in first + rest] == [f"line {i}" for i in range(5)]
+
+
+@pytest.fixture
+def scratch_db(tmp_path, monkeypatch):
+    # A separate database file; every thread reconnects after the switch
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "app.db"))
+    db.close_connections()
+    yield str(tmp_path / "app.db")
+    monkeypatch.undo()
+    db.close_connections()
+
+
+def test_migrations_upgrade_a_baseline_database(scratch_db, monkeypatch):
+    # Build the schema as it was before migrations existed, with data in it
+    with monkeypatch.context() as m:
+        m.setattr(db, "MIGRATIONS", [])
+        db.init_db()
+    with db.db_cursor() as cur:
+        cur.execute("INSERT INTO calls(id, to_number, voice_name, summary) VALUES ('old', '+1555', 'v', 'Refund agreed')")
+        cur.executemany(
+            "INSERT INTO transcripts(call_id, role, text) VALUES ('old', ?, ?)",
+            [("user", "My parcel never arrived"), ("assistant", "Sorry to hear that")],
+        )
+
+    db.init_db()
+
+    with db.db_cursor() as cur:
+        cur.execute("PRAGMA user_version")
+        assert cur.fetchone()[0] == len(db.MIGRATIONS)
+        cur.execute("SELECT turn_count, last_activity_at, summary_status FROM calls WHERE id = 'old'")
+        turn_count, last_activity_at, summary_status = cur.fetchone()
+    assert turn_count == 2 and last_activity_at is not None and summary_status == "done"
+    # Existing rows are backfilled into the search index
+    assert [c["id"] for c in db.search_calls("parcel")] == ["old"]
+    assert [c["id"] for c in db.search_calls("refund")] == ["old"]
+
+    # Running again is a no-op
+    db.init_db()
+    with sqlite3.connect(scratch_db) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
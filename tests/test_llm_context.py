@@ -0,0 +1,71 @@
+from app.llm_context import FOLD_TARGET_RATIO, MESSAGE_OVERHEAD_TOKENS, ConversationContext
+
+
+class FakeEngine:
+    # One token per word; summaries are a fixed short string
+    def __init__(self, prompt_budget: int = 10_000, during_summary=None):
+        self.prompt_budget = prompt_budget
+        self.folds = []
+        self._during_summary = during_summary
+
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def update_summary(self, previous, turns):
+        self.folds.append((previous, [t["content"] for t in turns]))
+        if self._during_summary:
+            self._during_summary()
+        return f"summary of {len(turns)} turns"
+
+
+def _context(turns: int, words: int = 10, budget: int = 100, min_recent: int = 4) -> ConversationContext:
+    ctx = ConversationContext("Be brief.", budget, min_recent_turns=min_recent)
+    for i in range(turns):
+        ctx.add("user" if i % 2 == 0 else "assistant", " ".join([f"t{i}"] * words))
+    return ctx
+
+
+def _prompt_tokens(ctx: ConversationContext, engine: FakeEngine) -> int:
+    return sum(engine.count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in ctx.messages())
+
+
+def test_fit_leaves_a_prompt_within_budget_alone():
+    ctx, engine = _context(3), FakeEngine()
+    ctx.fit(engine)
+    assert len(ctx.turns) == 3 and ctx.summary == "" and engine.folds == []
+
+
+def test_fit_folds_the_oldest_turns_into_the_summary():
+    ctx, engine = _context(10, min_recent=2), FakeEngine()
+    ctx.fit(engine)
+
+    assert len(engine.folds) == 1
+    previous, folded = engine.folds[0]
+    assert previous == "" and folded[0].startswith("t0 ")
+    # The newest turns are kept verbatim and the prompt lands below the fold target
+    assert ctx.turns[-1]["content"].startswith("t9 ") and len(ctx.turns) >= 2
+    assert len(folded) + len(ctx.turns) == 10
+    assert _prompt_tokens(ctx, engine) <= int(100 * FOLD_TARGET_RATIO)
+    assert ctx.messages()[0]["content"].endswith(f"Summary of the call so far: summary of {len(folded)} turns")
+
+
+def test_fit_keeps_min_recent_turns_and_drops_what_still_overflows():
+    ctx, engine = _context(6, words=40), FakeEngine()
+    ctx.fit(engine)
+    # Folding stops at min_recent_turns; those are too long, so the oldest go
+    assert len(engine.folds[0][1]) == 2
+    assert _prompt_tokens(ctx, engine) <= 100 and len(ctx.turns) >= 1
+    assert ctx.turns[-1]["content"].startswith("t5 ")
+
+
+def test_fit_uses_the_smaller_of_its_budget_and_the_model_window():
+    ctx, engine = _context(6), FakeEngine(prompt_budget=50)
+    ctx.fit(engine)
+    assert engine.folds and _prompt_tokens(ctx, engine) <= 50
+
+
+def test_turns_added_while_summarizing_are_kept():
+    ctx = _context(10)
+    engine = FakeEngine(during_summary=lambda: ctx.add("user", "late arrival"))
+    ctx.fit(engine)
+    assert ctx.turns[-1]["content"] == "late arrival"
@@ -0,0 +1,79 @@
+import pytest
+
+from app.llm_engine import LLMEngine, split_sentences
+
+PROMPT = ["<prompt>"]
+
+
+class RecordingStreamer:
+    def __init__(self):
+        self.pieces, self.ended = [], False
+
+    def put(self, value):
+        self.pieces.append(value)
+
+    def end(self):
+        self.ended = True
+
+
+class FakeKVCache:
+    def __init__(self):
+        self.dropped = []
+
+    def drop(self, session_id):
+        self.dropped.append(session_id)
+
+
+def _engine(cached_tokens, fail=True):
+    # An LLMEngine with model calls replaced: the cached path streams
+    # cached_tokens and then fails; the full-prefill pipeline streams "fresh"
+    engine = LLMEngine.__new__(LLMEngine)
+    engine._dynamic_cache = object
+    engine.kv_cache = FakeKVCache()
+
+    def generate_cached(prompt, session_id, streamer=None):
+        streamer.put(PROMPT)
+        for token in cached_tokens:
+            streamer.put(token)
+        if fail:
+            raise RuntimeError("cache went bad")
+        streamer.end()
+        return "".join(cached_tokens)
+
+    def pipe(prompt, return_full_text=False, streamer=None):
+        streamer.put(PROMPT)
+        streamer.put("fresh")
+        streamer.end()
+        return [{"generated_text": "fresh"}]
+
+    engine._generate_cached = generate_cached
+    engine.pipe = pipe
+    return engine
+
+
+def test_cached_failure_before_any_text_falls_back_with_a_clean_stream():
+    engine, streamer = _engine([]), RecordingStreamer()
+    assert engine._generate("p", session_id="call-1", streamer=streamer) == "fresh"
+    # Neither attempt's prompt leaks into the reply
+    assert streamer.pieces == ["fresh"] and streamer.ended
+    assert engine.kv_cache.dropped == ["call-1"]
+
+
+def test_cached_failure_mid_reply_fails_instead_of_repeating_text():
+    engine, streamer = _engine(["Hello", " there"]), RecordingStreamer()
+    with pytest.raises(RuntimeError):
+        engine._generate("p", session_id="call-1", streamer=streamer)
+    assert streamer.pieces == ["Hello", " there"]
+    assert engine.kv_cache.dropped == ["call-1"]
+
+
+def test_cached_success_streams_once():
+    engine, streamer = _engine(["Hi."], fail=False), RecordingStreamer()
+    assert engine._generate("p", session_id="call-1", streamer=streamer) == "Hi."
+    assert streamer.pieces == ["Hi."] and streamer.ended
+
+
+def test_split_sentences_keeps_short_clauses_together():
+    sentences, rest = split_sentences("Sure, I can help. Your order, which shipped on Monday, is on its way. And")
+    assert sentences == ["Sure, I can help.", "Your order, which shipped on Monday,", "is on its way."]
+    assert rest == "And"
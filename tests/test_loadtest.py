@@ -0,0 +1,75 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from app.loadtest import bucket_quantile, compare, parse_metrics, percentiles, server_report
+
+METRICS = """\
+# HELP call_turn_seconds Turn latency
+# TYPE call_turn_seconds histogram
+call_turn_seconds_bucket{outcome="ok",le="0.5"} 3
+call_turn_seconds_bucket{outcome="ok",le="1"} 8
+call_turn_seconds_bucket{outcome="ok",le="+Inf"} 10
+call_turn_seconds_count{outcome="ok"} 10
+call_turn_seconds_sum{outcome="ok"} 7.5
+"""
+
+
+def test_parse_metrics_keys_series_by_sorted_labels():
+    series = parse_metrics(METRICS)
+    assert series[("call_turn_seconds_bucket", (("le", "+Inf"), ("outcome", "ok")))] == 10
+    assert series[("call_turn_seconds_sum", (("outcome", "ok"),))] == 7.5
+    assert len(series) == 5
+
+
+def test_bucket_quantile_interpolates_like_prometheus():
+    buckets = [(0.5, 3), (1.0, 8), (float("inf"), 10)]
+    assert bucket_quantile(0.5, buckets) == pytest.approx(0.5 + 0.5 * (5 - 3) / 5)
+    # Past the last finite bucket the answer is its upper bound
+    assert bucket_quantile(0.95, buckets) == 1.0
+    assert bucket_quantile(0.5, []) is None
+
+
+def test_server_report_diffs_histograms_across_the_run():
+    report = server_report(parse_metrics(""), parse_metrics(METRICS))
+    assert report["turn_ms"]["ok"] == {"count": 10, "mean": 750.0, "p95": 1000.0, "total": 7500.0}
+    assert server_report(parse_metrics(METRICS), parse_metrics(METRICS))["turn_ms"] == {}
+
+
+def test_percentiles_use_nearest_rank():
+    stats = percentiles([float(v) for v in range(1, 101)])
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (50.0, 95.0, 99.0, 100.0)
+    assert percentiles([]) == {"count": 0}
+
+
+def test_compare_flags_only_regressions_beyond_the_allowance():
+    baseline = {"latency_ms": {"loop": {"p50": 100, "p95": 200, "p99": 300}}, "throughput": {"turns_per_second": 10.0}}
+    same = {"latency_ms": {"loop": {"p50": 110, "p95": 230, "p99": 300}}, "throughput": {"turns_per_second": 9.0}}
+    assert compare(same, baseline, 0.2) == []
+    worse = {"latency_ms": {"loop": {"p50": 100, "p95": 300, "p99": 300}}, "throughput": {"turns_per_second": 7.0}}
+    assert compare(worse, baseline, 0.2) == ["loop p95 200ms -> 300ms", "throughput 10.00 -> 7.00 turns/s"]
+
+
+def test_harness_runs_calls_through_the_app_with_fakes(tmp_path):
+    # A separate process: the harness picks its own DATA_DIR and installs
+    # fake backends before the app is imported
+    output = tmp_path / "report.json"
+    subprocess.run(
+        [
+            sys.executable, "-m", "app.loadtest",
+            "--calls", "3", "--concurrency", "2", "--turns", "2",
+            "--llm-first-ms", "5", "--llm-tps", "1000", "--tts-rtf", "0.01",
+            "--ready-timeout", "60", "--request-timeout", "30",
+            "--data-dir", str(tmp_path / "data"), "--output", str(output),
+        ],
+        check=True,
+        capture_output=True,
+        timeout=120,
+    )
+    report = json.loads(output.read_text())
+    assert report["errors"] == {} and report["busy_turns"] == 0
+    assert report["latency_ms"]["answer"]["count"] == 3
+    assert report["latency_ms"]["loop"]["count"] == 6
+    assert report["server"]["turn_ms"]["ok"]["count"] == 6
@@ -0,0 +1,175 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from app import media_stream, sessions
+from app.inference import InferenceBusy, InferencePool
+
+STREAM_SID = "MZ00000000000000000000000000000000"
+
+
+class FakeMediaStreams:
+    # Twilio's side of a Media Streams socket: connected/start, inbound
+    # caller audio, echoing our mark back, and stop.
+    def __init__(self, ws):
+        self.ws = ws
+
+    def start(self, **params: str) -> None:
+        self.ws.send_text(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        self.ws.send_text(json.dumps({
+            "event": "start",
+            "sequenceNumber": "1",
+            "streamSid": STREAM_SID,
+            "start": {"streamSid": STREAM_SID, "callSid": "CA0", "customParameters": params},
+        }))
+
+    def send_caller_audio(self, frames: int = 3) -> None:
+        payload = base64.b64encode(b"\xff" * media_stream.FRAME_BYTES).decode("ascii")
+        for i in range(frames):
+            self.ws.send_text(json.dumps({
+                "event": "media",
+                "streamSid": STREAM_SID,
+                "media": {"track": "inbound", "chunk": str(i + 1), "payload": payload},
+            }))
+
+    def receive_until_mark(self):
+        # Returns (mu-law frames, mark name)
+        frames = []
+        while True:
+            msg = json.loads(self.ws.receive_text())
+            assert msg["streamSid"] == STREAM_SID
+            if msg["event"] == "media":
+                frames.append(base64.b64decode(msg["media"]["payload"]))
+            elif msg["event"] == "mark":
+                return frames, msg["mark"]["name"]
+
+    def echo_mark(self, name: str) -> None:
+        self.ws.send_text(json.dumps({"event": "mark", "streamSid": STREAM_SID, "mark": {"name": name}}))
+
+    def stop(self) -> None:
+        self.ws.send_text(json.dumps({"event": "stop", "streamSid": STREAM_SID}))
+
+    def closed(self) -> bool:
+        return self.ws.receive()["type"] == "websocket.close"
+
+
+def _sine(seconds: float, rate: int = 24000) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return (0.3 * np.sin(2 * np.pi * 300 * t)).astype(np.float32)
+
+
+@pytest.fixture
+def stream_app(monkeypatch):
+    session = sessions.CallSession(call_id="call-1", voice_name="v", ref_wav_path="ref.wav")
+    turns, turn_metrics = [], []
+
+    async def get_or_load(call_id):
+        return session if call_id == session.call_id else None
+
+    def synthesize(text, ref_wav_path, language="en", conditioning=None):
+        # Odd-sized chunks, so frames have to be re-cut at 160 bytes
+        for _ in range(3):
+            yield _sine(0.07), 24000
+
+    monkeypatch.setattr(media_stream.sessions, "get_or_load", get_or_load)
+    monkeypatch.setattr(media_stream.sessions, "record_turn", lambda s, role, text, **kw: turns.append((role, text)))
+    monkeypatch.setattr(media_stream.sessions, "record_metrics", turn_metrics.append)
+    monkeypatch.setattr(media_stream, "stream_synthesis", synthesize)
+    monkeypatch.setattr(media_stream, "tts_pool", InferencePool("tts-test", 1, 4))
+
+    app = FastAPI()
+
+    @app.websocket("/twilio/stream")
+    async def stream(websocket: WebSocket):
+        await media_stream.handle_stream(websocket)
+
+    client = TestClient(app)
+    client.turns, client.turn_metrics = turns, turn_metrics
+    return client
+
+
+def test_speaks_text_in_160_byte_mulaw_frames_then_marks_the_end(stream_app):
+    with stream_app.websocket_connect("/twilio/stream") as ws:
+        twilio = FakeMediaStreams(ws)
+        twilio.start(call_id="call-1", text="Hello there.")
+        twilio.send_caller_audio()
+        frames, mark = twilio.receive_until_mark()
+
+        assert mark == media_stream.END_MARK
+        assert frames and all(len(frame) == media_stream.FRAME_BYTES for frame in frames)
+        # 0.21 s of audio at 8 kHz, the last frame padded with mu-law silence
+        assert len(frames) == -(-int(0.21 * 8000) // media_stream.FRAME_BYTES)
+        assert frames[-1].endswith(media_stream.MULAW_SILENCE)
+
+        twilio.echo_mark(mark)
+        assert twilio.closed()
+
+
+def test_reply_turn_is_generated_spoken_and_recorded(stream_app, monkeypatch):
+    async def reply(context, session_id=None):
+        for sentence in ("Sure.", "Anything else?"):
+            yield sentence
+
+    monkeypatch.setattr(media_stream, "stream_context_chat", reply)
+    with stream_app.websocket_connect("/twilio/stream") as ws:
+        twilio = FakeMediaStreams(ws)
+        twilio.start(call_id="call-1")
+        frames, mark = twilio.receive_until_mark()
+        twilio.stop()
+
+    assert len(frames) > 0 and mark == media_stream.END_MARK
+    assert stream_app.turns == [("assistant", "Sure. Anything else?")]
+    assert [m["outcome"] for m in stream_app.turn_metrics] == ["ok"]
+
+
+def test_busy_reply_is_recorded_as_busy(stream_app, monkeypatch):
+    async def reply(context, session_id=None):
+        raise InferenceBusy("llm")
+        yield
+
+    monkeypatch.setattr(media_stream, "stream_context_chat", reply)
+    with stream_app.websocket_connect("/twilio/stream") as ws:
+        twilio = FakeMediaStreams(ws)
+        twilio.start(call_id="call-1")
+        frames, mark = twilio.receive_until_mark()
+        twilio.stop()
+
+    assert frames == [] and mark == media_stream.END_MARK
+    assert [m["outcome"] for m in stream_app.turn_metrics] == ["busy"]
+
+
+def test_unknown_call_still_gets_the_end_mark(stream_app):
+    with stream_app.websocket_connect("/twilio/stream") as ws:
+        twilio = FakeMediaStreams(ws)
+        twilio.start(call_id="nope", text="Hello")
+        frames, mark = twilio.receive_until_mark()
+        twilio.echo_mark(mark)
+        assert frames == [] and twilio.closed()
+
+
+def test_synthesis_error_and_malformed_frames_still_end_the_stream(stream_app, monkeypatch):
+    def broken(*args, **kwargs):
+        yield _sine(0.05), 24000
+        raise RuntimeError("XTTS fell over")
+
+    monkeypatch.setattr(media_stream, "stream_synthesis", broken)
+    with stream_app.websocket_connect("/twilio/stream") as ws:
+        twilio = FakeMediaStreams(ws)
+        ws.send_text("not json")
+        twilio.start(call_id="call-1", text="Hello there.")
+        frames, mark = twilio.receive_until_mark()
+        ws.send_text("[]")
+        twilio.echo_mark(mark)
+
+        assert len(frames) == 3 and mark == media_stream.END_MARK
+        assert twilio.closed()
+
+
+def test_stop_before_start_ends_quietly(stream_app):
+    with stream_app.websocket_connect("/twilio/stream") as ws:
+        FakeMediaStreams(ws).stop()
+        assert FakeMediaStreams(ws).closed()
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from multiprocessing.connection import Listener
+
+import pytest
+
+from app import model_client, sessions
+from app.model_client import ModelClient, RemoteModelError, _Worker, worker_authkey
+
+
+@pytest.mark.parametrize("key", [None, "", "change-me", "call-assistant-models", "short-secret"])
+def test_placeholder_or_short_authkeys_are_refused(monkeypatch, key):
+    monkeypatch.setattr(model_client.settings, "model_worker_authkey", key)
+    with pytest.raises(ValueError, match="MODEL_WORKER_AUTHKEY"):
+        worker_authkey()
+    with pytest.raises(ValueError):
+        ModelClient(["127.0.0.1:7901"])
+
+
+def test_real_secret_is_accepted(monkeypatch):
+    monkeypatch.setattr(model_client.settings, "model_worker_authkey", "a" * 32)
+    assert worker_authkey() == b"a" * 32
+
+
+def _client(n: int) -> ModelClient:
+    # Without the health thread, which would try to reach the addresses
+    client = ModelClient.__new__(ModelClient)
+    client.workers = [_Worker(f"127.0.0.1:{7901 + i}", b"k") for i in range(n)]
+    client._lock = threading.Lock()
+    return client
+
+
+def test_affinity_only_breaks_ties():
+    client = _client(3)
+    voice = "/data/voices/alice/reference.wav"
+    preferred = client._pick(None, affinity=voice)
+    client._done(preferred)
+    # An idle pool keeps sending the voice to the same worker...
+    assert client._pick(None, affinity=voice) is preferred
+
+    # ...but a busy voice spreads over the others instead of queueing there
+    picks = {client._pick(None, affinity=voice) for _ in range(2)}
+    assert preferred not in picks and len(picks) == 2
+
+
+def test_session_route_key_stays_sticky_under_load():
+    client = _client(3)
+    first = client._pick("call-1")
+    assert all(client._pick("call-1") is first for _ in range(3))
+
+
+def test_unhealthy_workers_are_skipped():
+    client = _client(2)
+    client.workers[0].healthy = False
+    assert all(client._pick(None, affinity=str(i)) is client.workers[1] for i in range(4))
+
+
+class SilentWorker:
+    # Accepts connections and reads requests but never answers, like a
+    # worker wedged inside a model call
+    def __init__(self, address: str, authkey: bytes):
+        self.listener = Listener(address, authkey=authkey)
+        self.conns = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return
+            self.conns.append(conn)
+
+
+def test_a_silent_worker_times_out_and_is_marked_down(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_client.settings, "model_worker_timeout_seconds", 0.3)
+    address = str(tmp_path / "worker.sock")
+    worker = SilentWorker(address, b"k" * 16)
+    client = _client(0)
+    client.workers = [_Worker(address, b"k" * 16)]
+
+    started = time.monotonic()
+    with pytest.raises(RemoteModelError, match="no reply"):
+        client.call("chat", [])
+    assert time.monotonic() - started < 5
+    assert not client.workers[0].healthy and client.workers[0].inflight == 0
+
+    with pytest.raises(RemoteModelError):
+        list(client.stream("stream_chat", []))
+
+    monkeypatch.setattr(model_client, "HEALTH_TIMEOUT_SECONDS", 0.3)
+    with pytest.raises(TimeoutError):
+        client.ping(client.workers[0])
+    worker.listener.close()
+
+
+def test_ending_a_session_does_not_block_the_event_loop(monkeypatch):
+    class SlowLLM:
+        def drop_session(self, session_id):
+            time.sleep(0.5)
+
+    monkeypatch.setattr(sessions, "loaded_llm", SlowLLM)
+
+    async def go():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        await sessions.end("no-such-call")
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(go()) > 10
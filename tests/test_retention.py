@@ -0,0 +1,49 @@
+import fcntl
+import os
+import threading
+import time
+import uuid
+import zipfile
+
+from app import retention
+from app.db import append_transcript, create_call, get_transcript
+from app.settings import AUDIO_OUT_DIR
+
+
+def _old_turn_audio(call_id: str, days: int = 30) -> str:
+    path = os.path.join(AUDIO_OUT_DIR, f"tts_{uuid.uuid4().hex}.wav")
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + os.urandom(64))
+    old = time.time() - days * 86400
+    os.utime(path, (old, old))
+    append_transcript(call_id, "assistant", "Hello.", audio_path=path)
+    return path
+
+
+def test_sweep_archives_old_turn_audio_per_call(database):
+    call_id = uuid.uuid4().hex
+    create_call(call_id, "+15550001111", "v", None)
+    paths = [_old_turn_audio(call_id) for _ in range(2)]
+
+    result = retention.sweep()
+
+    assert result["archived"] >= 2
+    assert not any(os.path.exists(p) for p in paths)
+    zip_path = os.path.join(retention.ARCHIVE_DIR, f"{call_id}.zip")
+    with zipfile.ZipFile(zip_path) as zf:
+        assert sorted(zf.namelist()) == sorted(os.path.basename(p) for p in paths)
+    assert all(t["audio_path"].startswith(zip_path + "#") for t in get_transcript(call_id))
+
+
+def test_sweep_waits_for_a_sweep_in_another_process(database):
+    # flock is per open file, so a second open in this process stands in
+    # for another app process holding the lock
+    with open(retention.LOCK_PATH, "a") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        sweeper = threading.Thread(target=retention.sweep)
+        sweeper.start()
+        time.sleep(0.2)
+        assert sweeper.is_alive()
+        fcntl.flock(held, fcntl.LOCK_UN)
+    sweeper.join(timeout=10)
+    assert not sweeper.is_alive()
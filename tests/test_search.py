@@ -0,0 +1,91 @@
+import uuid
+
+import pytest
+
+from app.db import (
+    append_transcript,
+    complete_call_with_summary,
+    create_call,
+    fts_query,
+    next_search_cursor,
+    search_calls,
+)
+from app.utils import escape_markdown
+
+
+def _word() -> str:
+    # A term no other test's rows contain
+    return "w" + uuid.uuid4().hex[:10]
+
+
+def _call(*lines: str) -> str:
+    call_id = uuid.uuid4().hex
+    create_call(call_id, "+15550001111", "v", None)
+    for line in lines:
+        append_transcript(call_id, "user", line)
+    return call_id
+
+
+def test_fts_query_quotes_every_word_and_prefixes_the_last():
+    assert fts_query('say "hi" OR NOT foo*') == '"say" "hi" "OR" "NOT" "foo"*'
+    assert fts_query("  café  ") == '"café"*'
+
+
+@pytest.mark.parametrize("text", ["", "   ", '"*-()^:'])
+def test_fts_query_rejects_input_without_words(text):
+    with pytest.raises(ValueError):
+        fts_query(text)
+
+
+def test_search_treats_operators_as_plain_words(database):
+    word = _word()
+    call_id = _call(f"{word} said NEAR the door")
+    assert [c["id"] for c in search_calls(f'{word} NEAR(")')] == [call_id]
+    # AND is a word to find, not a conjunction, and this line has none
+    assert search_calls(f"{word} AND") == []
+
+
+def test_search_matches_stems_prefixes_and_highlights(database):
+    word = _word()
+    call_id = _call(f"I want refunds for order {word}")
+    [hit] = search_calls(f"refund {word[:6]}", highlight=("[", "]"))
+    assert hit["id"] == call_id and hit["source"] == "transcript"
+    assert "[refunds]" in hit["snippet"] and f"[{word}]" in hit["snippet"]
+    assert hit["transcript_id"] is not None
+
+
+def test_search_follows_summary_updates(database):
+    old, new = _word(), _word()
+    call_id = _call("hello")
+    complete_call_with_summary(call_id, f"Caller asked about {old}")
+    assert [(c["id"], c["source"]) for c in search_calls(old)] == [(call_id, "summary")]
+
+    complete_call_with_summary(call_id, f"Caller asked about {new}")
+    assert search_calls(old) == []
+    assert [c["id"] for c in search_calls(new)] == [call_id]
+
+
+def test_search_pages_cover_every_call_once(database):
+    word = _word()
+    # Different line counts give different scores; equal ones tie on call id
+    call_ids = {_call(*([f"{word} again"] * (i % 3 + 1))) for i in range(5)}
+    seen, cursor = [], None
+    while True:
+        page = search_calls(word, limit=2, cursor=cursor)
+        seen.extend(c["id"] for c in page)
+        cursor = next_search_cursor(page, 2)
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(call_ids)
+
+
+def test_snippets_escape_the_text_around_highlights(database):
+    word = _word()
+    _call(f'<img src=x onerror="alert(1)"> {word} **bold** [link](http://x)')
+    [hit] = search_calls(word)
+    assert "<img" not in hit["snippet"] and "&lt;img" in hit["snippet"]
+    assert f"<mark>{word}</mark>" in hit["snippet"]
+
+    [md] = search_calls(word, highlight=("**", "**"), escape=escape_markdown)
+    assert f"**{word}**" in md["snippet"]
+    assert "\\*\\*bold\\*\\*" in md["snippet"] and "\\[link\\]" in md["snippet"] and "<img" not in md["snippet"]
@@ -0,0 +1,34 @@
+import uuid
+
+from app import sessions
+from app.db import create_call, get_transcript, list_calls
+
+
+def test_a_segmented_reply_is_one_turn(database):
+    call_id = uuid.uuid4().hex
+    create_call(call_id, "+15550001111", "v", None)
+    session = sessions.start(call_id, None, None)
+    sessions.record_turn(session, "user", "When do you open?")
+    sessions.record_turn(
+        session,
+        "assistant",
+        "We open at nine. See you then.",
+        segments=[("We open at nine.", "a.wav"), ("See you then.", "b.wav")],
+    )
+    sessions.flush()
+
+    rows = get_transcript(call_id)
+    assert [(r["text"], r["audio_path"], r["segment"]) for r in rows[1:]] == [
+        ("We open at nine.", "a.wav", 0),
+        ("See you then.", "b.wav", 1),
+    ]
+    assert next(c for c in list_calls() if c["id"] == call_id)["turn_count"] == 2
+
+    # Reloaded elsewhere (another process, or after a restart)
+    with sessions._sessions_lock:
+        del sessions._sessions[call_id]
+    reloaded = sessions.load(call_id)
+    assert reloaded.context.messages()[1:] == [
+        {"role": "user", "content": "When do you open?"},
+        {"role": "assistant", "content": "We open at nine. See you then."},
+    ]
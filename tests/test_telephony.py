@@ -0,0 +1,129 @@
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from app import telephony
+from app.db import get_call, run_db
+from app.telephony import TwilioError, TwilioRestClient
+
+ACCOUNT_SID = "AC00000000000000000000000000000000"
+CALLS_PATH = f"/2010-04-01/Accounts/{ACCOUNT_SID}/Calls.json"
+REAL_BACKOFF = TwilioRestClient._backoff
+
+
+class FakeTwilio:
+    # Answers Calls.json from a script: each entry is a status code, or an
+    # exception to raise as if the network failed. The last entry repeats.
+    def __init__(self, *script):
+        self.script = list(script)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        step = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if isinstance(step, Exception):
+            raise step
+        if step < 400:
+            return httpx.Response(step, json={"sid": "CA123", "status": "queued"})
+        return httpx.Response(step, json={"code": 20000 + step, "message": f"error {step}"})
+
+    def client(self, max_retries: int = 3) -> TwilioRestClient:
+        return TwilioRestClient(ACCOUNT_SID, "token", "https://api.twilio.test", max_retries, transport=httpx.MockTransport(self))
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    delays = []
+
+    def backoff(self, attempt, response):
+        delays.append(REAL_BACKOFF(self, attempt, response))
+        return 0.0
+
+    monkeypatch.setattr(TwilioRestClient, "_backoff", backoff)
+    return delays
+
+
+def _create_call(client: TwilioRestClient):
+    async def go():
+        try:
+            return await client.create_call("+15550001111", "+15550002222", "https://x/answer", "https://x/status", ["completed"])
+        finally:
+            await client.aclose()
+
+    return asyncio.run(go())
+
+
+def test_retries_429_and_503_then_returns_the_call(no_backoff):
+    twilio = FakeTwilio(429, 503, 201)
+    assert _create_call(twilio.client())["sid"] == "CA123"
+    assert len(twilio.requests) == 3 and len(no_backoff) == 2
+
+    request = twilio.requests[-1]
+    assert request.url.path == CALLS_PATH
+    assert request.headers["authorization"].startswith("Basic ")
+    form = parse_qs(request.content.decode())
+    assert form["To"] == ["+15550001111"] and form["StatusCallbackEvent"] == ["completed"]
+
+
+def test_retries_connect_errors():
+    twilio = FakeTwilio(httpx.ConnectError("refused"), httpx.ConnectTimeout("slow"), 201)
+    assert _create_call(twilio.client())["sid"] == "CA123"
+    assert len(twilio.requests) == 3
+
+
+@pytest.mark.parametrize("status", [400, 401, 404, 500])
+def test_does_not_retry_other_errors(status):
+    twilio = FakeTwilio(status)
+    with pytest.raises(TwilioError) as exc:
+        _create_call(twilio.client())
+    assert exc.value.status_code == status
+    assert str(exc.value) == f"error {status}"
+    assert len(twilio.requests) == 1
+
+
+def test_does_not_retry_once_the_request_may_have_reached_twilio():
+    twilio = FakeTwilio(httpx.ReadTimeout("no answer"))
+    with pytest.raises(TwilioError, match="request failed"):
+        _create_call(twilio.client())
+    assert len(twilio.requests) == 1
+
+
+def test_gives_up_after_max_retries():
+    twilio = FakeTwilio(503)
+    with pytest.raises(TwilioError) as exc:
+        _create_call(twilio.client(max_retries=2))
+    assert exc.value.status_code == 503 and len(twilio.requests) == 3
+
+    unreachable = FakeTwilio(httpx.ConnectError("refused"))
+    with pytest.raises(TwilioError, match="Could not reach Twilio"):
+        _create_call(unreachable.client(max_retries=1))
+    assert len(unreachable.requests) == 2
+
+
+def test_backoff_honours_retry_after_and_caps_the_delay():
+    client = FakeTwilio(201).client()
+    assert REAL_BACKOFF(client, 0, httpx.Response(429, headers={"Retry-After": "2"})) == 2.0
+    assert REAL_BACKOFF(client, 0, httpx.Response(429, headers={"Retry-After": "120"})) == telephony.BACKOFF_MAX_SECONDS
+    first = REAL_BACKOFF(client, 0, None)
+    assert telephony.BACKOFF_BASE_SECONDS / 2 <= first <= telephony.BACKOFF_BASE_SECONDS
+    late = REAL_BACKOFF(client, 10, httpx.Response(503))
+    assert telephony.BACKOFF_MAX_SECONDS / 2 <= late <= telephony.BACKOFF_MAX_SECONDS
+    asyncio.run(client.aclose())
+
+
+def test_dial_marks_the_call_failed_when_twilio_refuses(database, monkeypatch):
+    twilio = FakeTwilio(400)
+
+    async def go():
+        client = twilio.client()
+        monkeypatch.setattr(telephony, "get_client", lambda: client)
+        try:
+            with pytest.raises(TwilioError):
+                await telephony.dial("+15550001111", "nobody", None)
+        finally:
+            await client.aclose()
+        return await run_db(get_call, parse_qs(twilio.requests[0].content.decode())["Url"][0].rsplit("=", 1)[1])
+
+    assert asyncio.run(go())["status"] == "failed"
@@ -0,0 +1,45 @@
+import threading
+import time
+
+import pytest
+
+from app.tts_scheduler import TTSScheduler
+
+
+def test_a_lone_request_starts_at_once():
+    scheduler = TTSScheduler(lambda request: request.text.upper())
+    assert scheduler.submit("hi", "en", None).result(timeout=5) == "HI"
+    assert scheduler.stats()["wait_p95_ms"] < 50
+
+
+def test_requests_run_one_at_a_time_in_order():
+    running, order, lock = [], [], threading.Lock()
+
+    def run_one(request):
+        with lock:
+            running.append(request.text)
+            assert len(running) == 1
+        time.sleep(0.01)
+        order.append(request.text)
+        with lock:
+            running.remove(request.text)
+        return request.text
+
+    scheduler = TTSScheduler(run_one)
+    futures = [scheduler.submit(str(i), "en", None) for i in range(5)]
+    assert [f.result(timeout=5) for f in futures] == [str(i) for i in range(5)]
+    assert order == [str(i) for i in range(5)]
+    assert scheduler.stats()["requests"] == 5
+
+
+def test_a_failed_request_fails_only_its_caller():
+    def run_one(request):
+        if request.text == "bad":
+            raise RuntimeError("model error")
+        return request.text
+
+    scheduler = TTSScheduler(run_one)
+    bad, good = scheduler.submit("bad", "en", None), scheduler.submit("good", "en", None)
+    with pytest.raises(RuntimeError):
+        bad.result(timeout=5)
+    assert good.result(timeout=5) == "good"
@@ -0,0 +1,75 @@
+import asyncio
+import time
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app import greetings, inference, sessions, twilio_routes
+from app.db import create_call
+from app.inference import InferencePool
+
+RENDER_SECONDS = 2.0
+
+
+@pytest.fixture
+def twilio_app(database, monkeypatch):
+    # One TTS worker, as by default, and a greeting render that holds it
+    monkeypatch.setattr(inference, "tts_pool", InferencePool("tts-test", 1, 4))
+    monkeypatch.setattr(inference, "synthesize_cached", lambda *a, **kw: time.sleep(RENDER_SECONDS))
+    monkeypatch.setattr(twilio_routes.settings, "twilio_media_streams", False)
+    monkeypatch.setattr(twilio_routes.settings, "greeting_wait_ms", 300)
+    app = FastAPI()
+    app.include_router(twilio_routes.router, prefix="/twilio")
+    return app
+
+
+def _call(greeting: str) -> str:
+    call_id = uuid.uuid4().hex
+    create_call(call_id, "+15550001111", "v", greeting)
+    sessions.start(call_id, {"name": "v", "ref_wav_path": "ref.wav"}, greeting)
+    return call_id
+
+
+def test_answer_falls_back_to_say_within_the_greeting_wait(twilio_app):
+    call_id = _call("Hello from the test.")
+
+    async def go():
+        greetings.start(call_id, "Hello from the test.", {"name": "v", "ref_wav_path": "ref.wav"})
+        # Twilio answers well after dial; let the render take the TTS worker
+        await asyncio.sleep(0.1)
+        transport = httpx.ASGITransport(app=twilio_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.perf_counter()
+            response = await client.post(f"/twilio/answer?call_id={call_id}")
+            return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(go())
+    assert response.status_code == 200
+    assert "<Say>Hello from the test.</Say>" in response.text and "<Gather" in response.text
+    assert elapsed < RENDER_SECONDS / 2
+
+
+def test_loop_asks_again_when_the_reply_fails_midway(twilio_app, monkeypatch):
+    call_id = _call(None)
+    recorded = []
+
+    async def reply(context, session_id=None):
+        yield "Sure, one moment."
+        raise RuntimeError("cache went bad")
+
+    monkeypatch.setattr(inference, "stream_context_chat", reply)
+    monkeypatch.setattr(inference, "synthesize_to_wav", lambda *a, **kw: ("x.wav", "/audio/x.wav"))
+    monkeypatch.setattr(sessions, "record_metrics", recorded.append)
+
+    async def go():
+        transport = httpx.ASGITransport(app=twilio_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(f"/twilio/loop?call_id={call_id}", data={"SpeechResult": "Is it open?"})
+
+    response = asyncio.run(go())
+    assert response.status_code == 200
+    assert f"<Say>{twilio_routes.BUSY_MESSAGE}</Say>" in response.text and "<Gather" in response.text
+    assert "one moment" not in response.text
+    assert [m["outcome"] for m in recorded] == ["error"]
@@ -0,0 +1,64 @@
+import asyncio
+import io
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.voice_ingest import REFERENCE_FILENAME, VoiceSampleError, incoming_path, ingest_upload
+
+
+class FakeUpload:
+    # Enough of Starlette's UploadFile for ingest_upload; fail_after makes
+    # the read raise once that many bytes have gone out, like a dropped client
+    def __init__(self, data: bytes, filename: str = "sample.wav", fail_after=None):
+        self.filename = filename
+        self._body = io.BytesIO(data)
+        self._fail_after = fail_after
+
+    async def read(self, size: int) -> bytes:
+        if self._fail_after is not None and self._body.tell() >= self._fail_after:
+            raise ConnectionResetError("client went away")
+        return self._body.read(size if self._fail_after is None else min(size, 1024))
+
+
+def _wav_bytes(seconds: float, rate: int = 16000, amplitude: float = 0.3) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    buf = io.BytesIO()
+    sf.write(buf, (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32), rate, format="WAV")
+    return buf.getvalue()
+
+
+def test_ingest_keeps_reference_and_original(tmp_path):
+    voice_dir = str(tmp_path / "alice")
+    ref = asyncio.run(ingest_upload(FakeUpload(_wav_bytes(5)), voice_dir))
+    assert ref == os.path.join(voice_dir, REFERENCE_FILENAME)
+    assert not [n for n in os.listdir(voice_dir) if n.startswith("incoming")]
+    assert "original.wav" in os.listdir(voice_dir)
+
+
+@pytest.mark.parametrize("upload, error", [
+    (FakeUpload(_wav_bytes(1)), VoiceSampleError),
+    (FakeUpload(_wav_bytes(5), fail_after=4096), ConnectionResetError),
+])
+def test_failed_ingest_of_a_new_voice_leaves_nothing(tmp_path, upload, error):
+    voice_dir = str(tmp_path / "bob")
+    with pytest.raises(error):
+        asyncio.run(ingest_upload(upload, voice_dir))
+    assert not os.path.exists(voice_dir)
+
+
+def test_failed_ingest_keeps_an_existing_voice(tmp_path):
+    voice_dir = str(tmp_path / "carol")
+    asyncio.run(ingest_upload(FakeUpload(_wav_bytes(5)), voice_dir))
+    before = sorted(os.listdir(voice_dir))
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(ingest_upload(FakeUpload(_wav_bytes(5), fail_after=4096), voice_dir))
+    assert sorted(os.listdir(voice_dir)) == before
+
+
+def test_concurrent_uploads_get_their_own_incoming_file(tmp_path):
+    first, second = incoming_path(str(tmp_path), "a.WAV"), incoming_path(str(tmp_path), "a.WAV")
+    assert first != second
+    assert all(p.endswith(".wav") and os.path.exists(p) for p in (first, second))